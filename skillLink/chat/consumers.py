@@ -1,13 +1,40 @@
 import json
+import math
 from decimal import Decimal, InvalidOperation
 
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.db import transaction
 
+from projects import payments
+from skillLink import ratelimit
+
 from .models import ChatRoom, AuctionItem
 
-class ChatConsumer(AsyncWebsocketConsumer):
+
+class RateLimitedConsumerMixin:
+    """Drop incoming frames beyond ``rate_limit`` per connected user."""
+    rate_limit_scope = None
+    rate_limit = None
+
+    async def frame_allowed(self):
+        wait = await sync_to_async(ratelimit.check)(
+            self.rate_limit_scope, self.rate_limit, ratelimit.scope_identities(self.scope, ('user',))
+        )
+        if not wait:
+            return True
+        await self.send(text_data=json.dumps({
+            "type": "rate_limited",
+            "retry_after": max(math.ceil(wait), 1),
+        }))
+        return False
+
+
+class ChatConsumer(RateLimitedConsumerMixin, AsyncWebsocketConsumer):
+    rate_limit_scope = 'chat-frame'
+    rate_limit = '20/10s'
+
     async def connect(self):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
         self.user = self.scope['user'] # User from AuthMiddlewareStack
@@ -38,6 +65,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
             return False
 
     async def receive(self, text_data):
+        if not await self.frame_allowed():
+            return
+
         data = json.loads(text_data)
         message = data['message']
 
@@ -75,7 +105,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
 
 
-class AuctionConsumer(AsyncWebsocketConsumer):
+class AuctionConsumer(RateLimitedConsumerMixin, AsyncWebsocketConsumer):
+    rate_limit_scope = 'auction-bid'
+    rate_limit = '5/s'
+
     async def connect(self):
         self.user = self.scope.get("user")
         if not self.user or not self.user.is_authenticated:
@@ -98,6 +131,9 @@ class AuctionConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
 
     async def receive(self, text_data):
+        if not await self.frame_allowed():
+            return
+
         data = json.loads(text_data)
         if data.get("type") != "place_bid":
             return
@@ -170,3 +206,43 @@ class AuctionConsumer(AsyncWebsocketConsumer):
                 "current_price": item.current_price,
                 "winner": user.username,
             }
+
+
+class PaymentStatusConsumer(AsyncWebsocketConsumer):
+    """Pushes a project's payment status changes to its client and freelancer."""
+
+    async def connect(self):
+        self.project_id = self.scope['url_route']['kwargs']['project_id']
+        self.user = self.scope.get("user")
+        if not self.user or not self.user.is_authenticated:
+            await self.close()
+            return
+
+        payment = await self.get_payment()
+        if payment is False:
+            await self.close()
+            return
+
+        self.group_name = payments.group_name(self.project_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        if payment is not None:
+            await self.send(text_data=json.dumps(payments.status_event(payment)))
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def payment_status(self, event):
+        await self.send(text_data=json.dumps(event))
+
+    @database_sync_to_async
+    def get_payment(self):
+        """The project's payment (or ``None``); ``False`` when the user may not follow it."""
+        from projects.models import Payment, Project
+
+        project = Project.objects.filter(pk=self.project_id).values('client_id', 'freelancer_id').first()
+        if project is None or self.user.pk not in (project['client_id'], project['freelancer_id']):
+            return False
+        return Payment.objects.filter(project_id=self.project_id).first()
@@ -18,6 +18,9 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['room', 'timestamp'], name='message_room_timestamp_idx'),
+        ]
 
     def __str__(self):
         return f"{self.sender.username}: {self.content[:20]}"
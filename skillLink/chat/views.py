@@ -3,11 +3,14 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.decorators import method_decorator
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from .models import ChatRoom, Message
 from projects.models import Project
 from .serializers import MessageSerializer
+from skillLink.idempotency import idempotent
+from skillLink.ratelimit import ratelimit
 
 
 class ChatRoomListAPIView(generics.ListAPIView):
@@ -38,6 +41,8 @@ class SendMessageAPIView(generics.CreateAPIView):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @method_decorator(ratelimit('send-message', '60/m'))
+    @idempotent
     def create(self, request, *args, **kwargs):
         project_id = self.kwargs.get('project_id')
         project = get_object_or_404(Project, id=project_id)
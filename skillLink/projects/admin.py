@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Project, Bid, Escrow, WorkCompletion, Review, Payment
+from .models import Project, Bid, Escrow, WorkCompletion, Review, Payment, LedgerEntry, PayoutBatch, PayoutLine
 
 class BidInline(admin.TabularInline):
     model = Bid
@@ -11,17 +11,17 @@ class ReviewInline(admin.TabularInline):
 
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
-    list_display = ['title', 'client', 'freelancer', 'status', 'budget', 'payment_status', 'created_at']
+    list_display = ['title', 'client', 'freelancer', 'status', 'budget', 'bid_count', 'payment_status', 'created_at']
     list_filter = ['status', 'payment_status', 'created_at']
     search_fields = ['title', 'description', 'client__username', 'freelancer__username']
-    readonly_fields = ['created_at', 'updated_at', 'completed_at']
+    readonly_fields = ['created_at', 'updated_at', 'completed_at', 'bid_count', 'pending_bid_count']
     inlines = [BidInline, ReviewInline]
     fieldsets = (
         ('Project Details', {
             'fields': ('title', 'description', 'budget', 'client', 'freelancer')
         }),
         ('Status', {
-            'fields': ('status', 'payment_status')
+            'fields': ('status', 'payment_status', 'bid_count', 'pending_bid_count')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at', 'completed_at'),
@@ -143,3 +143,46 @@ class PaymentAdmin(admin.ModelAdmin):
     def get_project(self, obj):
         return obj.project.title
     get_project.short_description = 'Project'
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['journal_id', 'kind', 'account', 'user', 'amount', 'currency', 'project', 'created_at']
+    list_filter = ['kind', 'account', 'currency']
+    search_fields = ['journal_id', 'user__username', 'project__title']
+    list_select_related = ['user', 'project']
+
+    # Append-only: corrections are new entries, posted through projects.ledger
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class PayoutLineInline(admin.TabularInline):
+    model = PayoutLine
+    extra = 0
+    fields = ['payment', 'amount']
+    readonly_fields = ['payment', 'amount']
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PayoutBatch)
+class PayoutBatchAdmin(admin.ModelAdmin):
+    list_display = ['payee', 'period', 'currency', 'total_amount', 'payment_count', 'status', 'paid_at']
+    list_filter = ['status', 'currency', 'period']
+    search_fields = ['payee__username']
+    list_select_related = ['payee']
+    readonly_fields = ['payee', 'currency', 'period', 'total_amount', 'payment_count', 'created_at']
+    inlines = [PayoutLineInline]
+
+    # Batches are written by projects.settlement; only their transfer status is edited here
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,186 @@
+"""
+Auto-approval of work the client never reviewed.
+
+Work that stays ``pending`` for ``WORK_AUTO_APPROVE_DAYS`` after it was
+submitted is approved on the client's behalf, the same end state as the
+``approve_work`` transition. Where the client's money is already collected in
+a ``held`` escrow, that escrow is released with it: the escrow is marked
+``released``, a ``completed`` ``Payment`` is recorded for it so settlement
+pays it out like any other, the release journals are posted to the ledger
+against that payment and the project's payment is ``released``, as
+``release_payment`` would leave it. Where nothing was collected no money
+moves; the payment stays ``escrowed`` and the client pays through the normal
+payment flow.
+
+Candidates are read oldest first from the partial
+``work_pending_submitted_idx`` index in keyset-ordered batches of
+``WORK_AUTO_APPROVE_BATCH_SIZE`` rows, so only one batch is ever held in
+memory. Each batch is one transaction: its rows are written with bulk
+``update``/``bulk_create`` and the ``SweepCheckpoint`` position is saved with
+them, so a run that dies part-way resumes after its last committed batch and
+two overlapping runs queue up on the checkpoint row instead of approving the
+same work twice.
+
+Bulk writes skip model signals; the project status counters, global and
+those of the clients and freelancers involved, are invalidated once per batch
+instead, and ``workflow.transition_applied`` is sent for each
+approved project (and each release) once the batch commits.
+"""
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .models import Project, Bid, Escrow, LedgerEntry, Payment, WorkCompletion, SweepCheckpoint
+from . import ledger, stats, workflow
+
+CHECKPOINT = 'work_auto_approval'
+
+DEFAULT_DAYS = 14
+DEFAULT_BATCH_SIZE = 500
+
+
+def get_cutoff(now=None):
+    """Work submitted at or before this time is due for auto-approval."""
+    days = getattr(settings, 'WORK_AUTO_APPROVE_DAYS', DEFAULT_DAYS)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def approve_batch(cutoff, batch_size, now=None, checkpoint_name=CHECKPOINT, work=None):
+    """
+    Approve the next ``batch_size`` due submissions after the checkpoint.
+
+    Returns ``(scanned, approved)``; ``scanned`` is 0 once nothing is left.
+    Rows whose project has moved on (approved, cancelled or paid in the
+    meantime) are skipped but still move the checkpoint forward. ``work``
+    narrows the sweep to a ``WorkCompletion`` queryset; a narrowed sweep
+    should keep its own ``checkpoint_name``.
+    """
+    now = now or timezone.now()
+    work = WorkCompletion.objects.all() if work is None else work
+    with transaction.atomic():
+        checkpoint, _ = SweepCheckpoint.objects.select_for_update().get_or_create(name=checkpoint_name)
+        rows = list(
+            work.filter(status='pending', submitted_at__lte=cutoff)
+            .filter(checkpoint.after('submitted_at'))
+            .order_by('submitted_at', 'pk')
+            .values_list('pk', 'submitted_at', 'project_id', 'bid_id')[:batch_size]
+        )
+        if not rows:
+            return 0, 0
+
+        parties = {
+            project_id: (client_id, freelancer_id)
+            for project_id, client_id, freelancer_id in Project.objects.select_for_update()
+            .filter(
+                pk__in=[project_id for _, _, project_id, _ in rows],
+                status='work_submitted',
+                payment_status__in=('not_started', 'escrowed'),
+            )
+            .values_list('pk', 'client_id', 'freelancer_id')
+        }
+        rows_due = [row for row in rows if row[2] in parties]
+        if rows_due:
+            released = _approve(rows_due, parties, now)
+            transaction.on_commit(lambda: _announce([project_id for _, _, project_id, _ in rows_due], released))
+
+        checkpoint.position_at, checkpoint.position_id = rows[-1][1], rows[-1][0]
+        checkpoint.save()
+        users = {user_id for _, _, project_id, _ in rows_due for user_id in parties[project_id] if user_id}
+        transaction.on_commit(lambda: stats.invalidate(users))
+    return len(rows), len(rows_due)
+
+
+def _approve(rows, parties, now):
+    """Approve ``rows`` and release their held escrows. Returns the ids of the projects released."""
+    work_ids = [work_id for work_id, _, _, _ in rows]
+    project_ids = [project_id for _, _, project_id, _ in rows]
+    bid_ids = [bid_id for _, _, _, bid_id in rows]
+
+    escrows = list(
+        Escrow.objects.select_for_update()
+        .filter(project_id__in=project_ids, status='held')
+        .values_list('project_id', 'bid_id', 'amount', 'transaction_id')
+    )
+    held = [project_id for project_id, _, _, _ in escrows]
+    Escrow.objects.filter(project_id__in=held, status='held').update(status='released', released_at=now)
+    payments = Payment.objects.bulk_create([
+        _released_payment(project_id, bid_id, amount, transaction_id, *parties[project_id], now)
+        for project_id, bid_id, amount, transaction_id in escrows
+    ])
+    LedgerEntry.objects.bulk_create([
+        entry
+        for payment in payments
+        for entry in ledger.release_entries(
+            payment.project_id, payment.payer_id, payment.payee_id, payment.amount, payment.currency, payment.pk
+        )
+    ])
+
+    WorkCompletion.objects.filter(pk__in=work_ids).update(
+        status='approved', reviewed_at=now, approved_at=now
+    )
+    Bid.objects.filter(pk__in=bid_ids).update(work_status='completed', updated_at=now)
+    Project.objects.filter(pk__in=project_ids).update(
+        status='completed', completed_at=now, updated_at=now, version=F('version') + 1,
+        payment_status=Case(
+            When(pk__in=held, then=Value('released')), default=Value('escrowed')
+        ),
+    )
+    return set(held)
+
+
+def _released_payment(project_id, bid_id, amount, transaction_id, client_id, freelancer_id, now):
+    """
+    The ``completed`` payment a released escrow turns into, as ``payments.process``
+    leaves a charged one, keeping the escrow's transaction id when it has one.
+    """
+    payment = Payment(
+        project_id=project_id, bid_id=bid_id, payer_id=client_id, payee_id=freelancer_id, amount=amount,
+        status='completed', reference_number=f"SKL-{uuid4().hex[:8].upper()}",
+        transaction_id=transaction_id or f"TXN-{uuid4().hex[:12].upper()}",
+        initiated_at=now, completed_at=now, notes='Released from escrow on auto-approval.',
+    )
+    payment.calculate_net_amount()
+    return payment
+
+
+def _announce(project_ids, released):
+    """
+    Send ``transition_applied`` for each approved project, as ``approve_work``
+    does, followed by ``release_payment`` for those whose escrow was released.
+    """
+    bids = {
+        bid.project_id: bid
+        for bid in Bid.objects.filter(project_id__in=project_ids, status='accepted').select_related('freelancer')
+    }
+    for project in Project.objects.filter(pk__in=project_ids).select_related('client'):
+        transitions = ('approve_work', 'release_payment') if project.pk in released else ('approve_work',)
+        for transition in transitions:
+            workflow.transition_applied.send(
+                sender=Project, project=project, transition=transition, user=project.client,
+                bid=bids.get(project.pk),
+            )
+
+
+def run(max_batches=None, batch_size=None, now=None, checkpoint_name=CHECKPOINT, work=None):
+    """
+    Approve due work batch by batch until none is left or ``max_batches``
+    batches have run. Returns ``{'scanned', 'approved', 'batches', 'done'}``.
+    ``checkpoint_name`` and ``work`` are passed on to ``approve_batch``.
+    """
+    now = now or timezone.now()
+    cutoff = get_cutoff(now)
+    batch_size = batch_size or getattr(settings, 'WORK_AUTO_APPROVE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    result = {'scanned': 0, 'approved': 0, 'batches': 0, 'done': False}
+    while max_batches is None or result['batches'] < max_batches:
+        scanned, approved = approve_batch(cutoff, batch_size, now, checkpoint_name, work)
+        if not scanned:
+            result['done'] = True
+            break
+        result['scanned'] += scanned
+        result['approved'] += approved
+        result['batches'] += 1
+    return result
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Bid
+
+# Entries are dropped when the freelancer's bids change, but only in the
+# process that wrote the bid: with a per-process cache every other worker
+# keeps its copy until it expires. The timeout bounds that staleness.
+DEFAULT_TIMEOUT = 60
+
+# Per-request copy, so one request reads the cache at most once
+REQUEST_ATTR = '_bid_project_ids'
+
+
+def _key(user_id):
+    return f'bid_membership:{user_id}'
+
+
+def load(user_id):
+    """IDs of every project ``user_id`` has bid on, whatever the bid's status."""
+    project_ids = cache.get(_key(user_id))
+    if project_ids is None:
+        project_ids = frozenset(
+            Bid.objects.filter(freelancer_id=user_id).order_by().values_list('project_id', flat=True)
+        )
+        cache.set(_key(user_id), project_ids, getattr(settings, 'BID_MEMBERSHIP_TIMEOUT', DEFAULT_TIMEOUT))
+    return project_ids
+
+
+def get_project_ids(request):
+    """Projects the requesting user has bid on; empty for anonymous users."""
+    project_ids = getattr(request, REQUEST_ATTR, None)
+    if project_ids is None:
+        user = request.user
+        project_ids = load(user.pk) if user.is_authenticated else frozenset()
+        setattr(request, REQUEST_ATTR, project_ids)
+    return project_ids
+
+
+def invalidate(*user_ids):
+    cache.delete_many([_key(user_id) for user_id in user_ids])
@@ -0,0 +1,76 @@
+import numpy as np
+from django.core.cache import cache
+
+from .models import Bid
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Entries are dropped on every bid write, so the timeout only bounds how long
+# an idle project's numbers occupy the cache.
+BID_STATS_TIMEOUT = 60 * 60 * 24
+
+
+def _key(project_id):
+    return f'bid_stats:{project_id}'
+
+
+def _summary(values):
+    quantiles = np.percentile(values, PERCENTILES)
+    summary = {
+        'min': round(float(values.min()), 2),
+        'max': round(float(values.max()), 2),
+        'mean': round(float(values.mean()), 2),
+    }
+    summary.update({f'p{p}': round(float(q), 2) for p, q in zip(PERCENTILES, quantiles)})
+    summary['median'] = summary['p50']
+    return summary
+
+
+def _percentile_ranks(values):
+    """Percentile rank of every value among ``values``; ties share the midpoint."""
+    ordered = np.sort(values)
+    below = np.searchsorted(ordered, values, side='left')
+    at_or_below = np.searchsorted(ordered, values, side='right')
+    return (below + at_or_below) / 2 / len(values) * 100
+
+
+def compute_bid_stats(project_id):
+    rows = list(
+        Bid.objects.filter(project_id=project_id).exclude(status='withdrawn').order_by().values_list(
+            'pk', 'amount', 'delivery_days'
+        )
+    )
+    if not rows:
+        return {'count': 0, 'amount': None, 'delivery_days': None, 'bids': {}}
+
+    ids = [pk for pk, _, _ in rows]
+    amounts = np.array([float(amount) for _, amount, _ in rows])
+    days = np.array([delivery_days for _, _, delivery_days in rows], dtype=float)
+    amount_ranks = _percentile_ranks(amounts)
+    days_ranks = _percentile_ranks(days)
+
+    return {
+        'count': len(rows),
+        'amount': _summary(amounts),
+        'delivery_days': _summary(days),
+        'bids': {
+            pk: {'amount_percentile': round(float(a), 1), 'delivery_percentile': round(float(d), 1)}
+            for pk, a, d in zip(ids, amount_ranks, days_ranks)
+        },
+    }
+
+
+def get_bid_stats(project_id):
+    """
+    Price and delivery-time distribution of a project's bids (withdrawn bids
+    excluded), plus each bid's percentile rank within it. Cached per project.
+    """
+    stats = cache.get(_key(project_id))
+    if stats is None:
+        stats = compute_bid_stats(project_id)
+        cache.set(_key(project_id), stats, BID_STATS_TIMEOUT)
+    return stats
+
+
+def invalidate(*project_ids):
+    cache.delete_many([_key(project_id) for project_id in project_ids])
@@ -0,0 +1,199 @@
+"""
+Bid lifecycle operations that touch several rows at once.
+
+Each operation runs in one transaction, locks the project row first so
+concurrent operations on the same project serialize, and saves only the
+fields it changes.
+"""
+import logging
+from collections import Counter
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+from rest_framework import status
+
+from chat.models import ChatRoom
+from .models import Project, Bid
+from . import bid_stats, counters
+
+logger = logging.getLogger(__name__)
+
+# A rejected bid can still be accepted if the client changes their mind
+ACCEPTABLE_STATUSES = Bid.OPEN_STATUSES + ('rejected',)
+
+# action -> (new status, statuses it applies to, who may perform it)
+BULK_ACTIONS = {
+    'reject': ('rejected', Bid.OPEN_STATUSES, 'client'),
+    'shortlist': ('shortlisted', ('pending',), 'client'),
+    'withdraw': ('withdrawn', Bid.OPEN_STATUSES, 'freelancer'),
+}
+MAX_BULK_BIDS = 500
+
+
+class BidActionError(Exception):
+    """A bid operation that is not allowed; carries the API error message and status."""
+
+    def __init__(self, detail, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def place_bid(project_id, freelancer, amount, delivery_days, proposal):
+    """
+    Create ``freelancer``'s bid on a project in one statement.
+
+    The INSERT only selects its row when the project is open and not owned by
+    the freelancer, and relies on the (project, freelancer) unique constraint
+    to turn a duplicate or concurrent second submission into an error rather
+    than a second row. The reason for a refusal is only looked up when the
+    insert did not happen.
+    """
+    now = timezone.now()
+    bid = Bid(
+        project_id=project_id, freelancer=freelancer, amount=amount,
+        delivery_days=delivery_days, proposal=proposal, created_at=now, updated_at=now,
+    )
+    columns = [
+        'freelancer_id', 'amount', 'delivery_days', 'proposal',
+        'status', 'work_status', 'created_at', 'updated_at',
+    ]
+    fields = [Bid._meta.get_field(column.removesuffix('_id')) for column in columns]
+    params = [field.get_db_prep_save(getattr(bid, field.attname), connection) for field in fields]
+
+    bid_table = connection.ops.quote_name(Bid._meta.db_table)
+    project_table = connection.ops.quote_name(Project._meta.db_table)
+    sql = (
+        f"INSERT INTO {bid_table} (project_id, {', '.join(connection.ops.quote_name(f.column) for f in fields)}) "
+        f"SELECT id, {', '.join(['%s'] * len(params))} FROM {project_table} "
+        f"WHERE id = %s AND status = 'open' AND client_id <> %s "
+        f"RETURNING id"
+    )
+
+    with transaction.atomic():
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params + [project_id, freelancer.pk])
+                row = cursor.fetchone()
+        except IntegrityError:
+            # Leaving the block with an exception rolls the failed insert back
+            raise BidActionError('You have already placed a bid on this project.')
+
+        if row is None:
+            project = Project.objects.filter(pk=project_id).values('status', 'client_id').first()
+            if project is None:
+                raise BidActionError('Not found.', status.HTTP_404_NOT_FOUND)
+            if project['client_id'] == freelancer.pk:
+                raise BidActionError('You cannot bid on your own project.')
+            raise BidActionError('This project is no longer accepting bids.')
+
+        bid.pk = row[0]
+        bid._state.adding = False
+        bid._state.db = connection.alias
+        # The row was written with raw SQL; let the usual receivers (bid
+        # counters, statistics cache) see it as a regular create.
+        post_save.send(
+            sender=Bid, instance=bid, created=True, update_fields=None,
+            raw=False, using=connection.alias,
+        )
+    return bid
+
+
+def accept_bid(bid, user):
+    """
+    Hire ``bid``'s freelancer on behalf of the project owner ``user``.
+
+    Assigns the project, rejects the other pending bids with one UPDATE,
+    opens the project chat room and queues a single batch of rejection
+    emails once the transaction commits. Returns the accepted bid.
+    """
+    with transaction.atomic():
+        project = Project.objects.select_for_update().get(pk=bid.project_id)
+        if project.client_id != user.pk:
+            raise BidActionError('Only the project owner can accept bids.', status.HTTP_403_FORBIDDEN)
+        if project.status != 'open' or project.freelancer_id is not None:
+            raise BidActionError('A bid has already been accepted for this project.', status.HTTP_409_CONFLICT)
+
+        # Re-read under the project lock; the caller's copy may be stale
+        bid = Bid.objects.select_related('freelancer').get(pk=bid.pk)
+        if bid.status not in ACCEPTABLE_STATUSES:
+            raise BidActionError(f'A {bid.status} bid cannot be accepted.', status.HTTP_409_CONFLICT)
+
+        now = timezone.now()
+        project.freelancer_id = bid.freelancer_id
+        project.status = 'in_progress'
+        project.save(update_fields=['freelancer', 'status', 'updated_at'])
+
+        others = dict(
+            Bid.objects.filter(project=project, status__in=Bid.OPEN_STATUSES).exclude(
+                pk=bid.pk
+            ).values_list('pk', 'status')
+        )
+        rejected_ids = list(others)
+        if rejected_ids:
+            Bid.objects.filter(pk__in=rejected_ids).update(status='rejected', updated_at=now)
+        closed = list(others.values()).count('pending') + (bid.status == 'pending')
+        counters.pending_bids_closed(project.pk, closed)
+
+        bid.status = 'accepted'
+        bid.accepted_at = now
+        bid.save(update_fields=['status', 'accepted_at', 'updated_at'])
+
+        ChatRoom.objects.get_or_create(project=project)
+
+        if rejected_ids:
+            transaction.on_commit(lambda: notify_rejected_bids(rejected_ids))
+    return bid
+
+
+def moderate_bids(bid_ids, action, user):
+    """
+    Apply a ``BULK_ACTIONS`` action to many bids with one UPDATE.
+
+    Ownership and state of every bid are checked from a single locked read.
+    Returns ``{bid_id: result}`` where result is the new status, or one of
+    ``'not_found'``, ``'forbidden'`` or ``'invalid_status'`` for bids left
+    untouched.
+    """
+    new_status, from_statuses, actor = BULK_ACTIONS[action]
+    results = dict.fromkeys(bid_ids, 'not_found')
+
+    with transaction.atomic():
+        rows = Bid.objects.select_for_update(of=('self',)).filter(pk__in=bid_ids).order_by().values_list(
+            'pk', 'project_id', 'project__client_id', 'freelancer_id', 'status'
+        )
+        allowed = []
+        touched_projects = set()
+        pending_closed = Counter()
+        for pk, project_id, client_id, freelancer_id, current in rows:
+            owner_id = client_id if actor == 'client' else freelancer_id
+            if owner_id != user.pk:
+                results[pk] = 'forbidden'
+            elif current not in from_statuses:
+                results[pk] = 'invalid_status'
+            else:
+                results[pk] = new_status
+                allowed.append(pk)
+                touched_projects.add(project_id)
+                if current == 'pending':
+                    pending_closed[project_id] += 1
+
+        if allowed:
+            Bid.objects.filter(pk__in=allowed).update(status=new_status, updated_at=timezone.now())
+            for project_id, count in pending_closed.items():
+                counters.pending_bids_closed(project_id, count)
+            if new_status == 'withdrawn':
+                # Withdrawn bids leave the price distribution
+                transaction.on_commit(lambda: bid_stats.invalidate(*touched_projects))
+    return results
+
+
+def notify_rejected_bids(bid_ids):
+    from .tasks import send_bid_rejection_emails_task
+
+    try:
+        send_bid_rejection_emails_task.delay(bid_ids)
+    except Exception as e:
+        # Losing the courtesy emails must not fail the acceptance
+        logger.error(f"Failed to queue bid rejection emails: {e}")
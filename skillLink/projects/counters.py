@@ -0,0 +1,43 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Project, Bid
+
+
+def bid_added(bid):
+    Project.objects.filter(pk=bid.project_id).update(
+        bid_count=F('bid_count') + 1,
+        pending_bid_count=F('pending_bid_count') + (1 if bid.status == 'pending' else 0),
+    )
+
+
+def bid_removed(bid):
+    Project.objects.filter(pk=bid.project_id).update(
+        bid_count=F('bid_count') - 1,
+        pending_bid_count=F('pending_bid_count') - (1 if bid.status == 'pending' else 0),
+    )
+
+
+def pending_bids_closed(project_id, count=1):
+    """Record ``count`` pending bids leaving the pending state (reject, withdraw, accept)."""
+    if count:
+        Project.objects.filter(pk=project_id).update(
+            pending_bid_count=F('pending_bid_count') - count
+        )
+
+
+def _bid_count_subquery(**filters):
+    counts = Bid.objects.filter(project=OuterRef('pk'), **filters).order_by().values(
+        'project'
+    ).annotate(total=Count('id')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def rebuild_bid_counters(queryset=None):
+    """Recompute the stored counters from the bids table in a single UPDATE."""
+    if queryset is None:
+        queryset = Project.objects.all()
+    return queryset.update(
+        bid_count=_bid_count_subquery(),
+        pending_bid_count=_bid_count_subquery(status='pending'),
+    )
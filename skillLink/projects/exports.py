@@ -0,0 +1,156 @@
+"""
+Streaming exports of the financial tables for the finance team.
+
+``stream`` turns one dataset (payments, escrows or reviews) into CSV or JSON
+Lines, optionally gzipped, as an iterator of byte chunks. Rows are read with
+a ``values_list`` projection through ``.iterator(chunk_size=...)``, so no
+model instances are built and only ``EXPORT_CHUNK_SIZE`` rows are held at a
+time however large the table; the encoded lines are gathered into chunks of
+about ``BUFFER_SIZE`` bytes before they are handed to the response or file.
+
+Served by ``ExportView`` and the ``export_data`` management command.
+"""
+import csv
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Escrow, Payment, Review
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Bytes of encoded rows gathered before a chunk is written out
+BUFFER_SIZE = 64 * 1024
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+
+
+@dataclass(frozen=True)
+class Dataset:
+    model: type
+    fields: tuple
+    statuses: tuple = ()
+
+    @property
+    def columns(self):
+        return [field.replace('__', '_') for field in self.fields]
+
+
+DATASETS = {
+    'payments': Dataset(
+        Payment,
+        (
+            'id', 'reference_number', 'transaction_id', 'project_id', 'payer__username', 'payee__username',
+            'amount', 'platform_fee', 'net_amount', 'currency', 'payment_method', 'status',
+            'created_at', 'initiated_at', 'completed_at',
+        ),
+        Payment.STATUS_CHOICES,
+    ),
+    'escrows': Dataset(
+        Escrow,
+        (
+            'id', 'project_id', 'bid_id', 'project__client__username', 'bid__freelancer__username',
+            'amount', 'status', 'transaction_id', 'created_at', 'held_at', 'released_at',
+        ),
+        Escrow.STATUS_CHOICES,
+    ),
+    'reviews': Dataset(
+        Review,
+        (
+            'id', 'project_id', 'reviewer__username', 'reviewee__username', 'review_type', 'rating',
+            'quality', 'communication', 'professionalism', 'timeliness', 'title', 'comment', 'created_at',
+        ),
+    ),
+}
+
+
+def get_rows(dataset, since=None, until=None, status=None, chunk_size=None):
+    """
+    Rows of ``dataset`` created on or after the date ``since`` and up to and
+    including the date ``until``, in id order, as an iterator of tuples.
+    """
+    queryset = dataset.model.objects.order_by('pk')
+    if since:
+        queryset = queryset.filter(created_at__gte=timezone.make_aware(datetime.combine(since, time.min)))
+    if until:
+        queryset = queryset.filter(
+            created_at__lt=timezone.make_aware(datetime.combine(until + timedelta(days=1), time.min))
+        )
+    if status:
+        queryset = queryset.filter(status=status)
+    chunk_size = chunk_size or getattr(settings, 'EXPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    return queryset.values_list(*dataset.fields).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object handing back what ``csv.writer`` writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(dataset, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(dataset.columns)
+    for row in rows:
+        yield writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+
+
+def _jsonl_lines(dataset, rows):
+    columns = dataset.columns
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + '\n'
+
+
+def _buffered(lines):
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(name, fmt='csv', gzip=False, **filters):
+    """Encoded export of the dataset ``name`` as an iterator of byte chunks; see ``get_rows`` for ``filters``."""
+    dataset = DATASETS[name]
+    lines = _csv_lines if fmt == 'csv' else _jsonl_lines
+    chunks = _buffered(lines(dataset, get_rows(dataset, **filters)))
+    return _gzipped(chunks) if gzip else chunks
+
+
+def filename(name, fmt, gzip=False):
+    return f"{name}-{timezone.localdate():%Y%m%d}.{FORMATS[fmt][1]}{'.gz' if gzip else ''}"
+
+
+async def aiter_chunks(chunks):
+    """
+    Serve ``chunks`` from an ASGI response one at a time. Django would read a
+    synchronous iterator into a list before sending any of it; every step runs
+    on the same thread so the database cursor stays with its connection.
+    """
+    step = sync_to_async(next, thread_sensitive=True)
+    chunks = iter(chunks)
+    while (chunk := await step(chunks, None)) is not None:
+        yield chunk
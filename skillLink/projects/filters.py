@@ -0,0 +1,31 @@
+import django_filters
+from rest_framework.filters import SearchFilter
+
+from .models import Project
+from .search import get_search_backend
+
+
+class ProjectFilter(django_filters.FilterSet):
+    """Status and inclusive budget range filters shared by the list and facets APIs."""
+
+    min_budget = django_filters.NumberFilter(field_name='budget', lookup_expr='gte')
+    max_budget = django_filters.NumberFilter(field_name='budget', lookup_expr='lte')
+
+    class Meta:
+        model = Project
+        fields = ['status', 'budget']
+
+
+class ProjectSearchFilter(SearchFilter):
+    """SearchFilter that answers ``?search=`` from the project full-text index."""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+
+        results = get_search_backend().search(queryset, query)
+        # An explicit ?ordering= wins over relevance ranking
+        if request.query_params.get('ordering'):
+            return results.order_by(*queryset.query.order_by)
+        return results
@@ -183,3 +183,24 @@ class QuickApproveForm(forms.Form):
         widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         label='I confirm that the work meets my requirements and I approve this project for payment'
     )
+
+
+class ExportForm(forms.Form):
+    """Filters of a finance export; ``status`` takes the statuses of the exported dataset."""
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('jsonl', 'JSON Lines')], required=False)
+    since = forms.DateField(required=False, help_text='First day to include (YYYY-MM-DD)')
+    until = forms.DateField(required=False, help_text='Last day to include (YYYY-MM-DD)')
+    status = forms.ChoiceField(required=False)
+    gzip = forms.BooleanField(required=False)
+
+    def __init__(self, *args, statuses=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['status'].choices = [('', 'Any')] + list(statuses)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        cleaned_data['format'] = cleaned_data.get('format') or 'csv'
+        since, until = cleaned_data.get('since'), cleaned_data.get('until')
+        if since and until and since > until:
+            raise ValidationError('The export must start on or before the day it ends.')
+        return cleaned_data
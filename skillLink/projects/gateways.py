@@ -0,0 +1,90 @@
+"""
+Payment gateways.
+
+``get_gateway()`` returns the gateway named by ``PAYMENT_GATEWAY``. A gateway
+charges a payment's amount and returns a ``ChargeResult``; it raises
+``GatewayUnavailable`` when the charge may not have gone through and is safe
+to retry. Charges carry the payment's reference as an idempotency key, so a
+retried charge never takes the money twice.
+
+``LocalGateway`` settles everything in memory. It is the default for
+development, tests and the payments benchmark.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from uuid import uuid4
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_GATEWAY = 'projects.gateways.LocalGateway'
+
+
+class GatewayUnavailable(Exception):
+    """The gateway could not be reached or timed out; the charge can be retried."""
+
+
+@dataclass(frozen=True)
+class ChargeResult:
+    approved: bool
+    transaction_id: str = ''
+    error: str = ''
+
+
+class PaymentGateway:
+    def charge(self, reference, amount, currency, method):
+        """Take ``amount`` for the payment ``reference``; returns a ``ChargeResult``."""
+        raise NotImplementedError
+
+    def refund(self, transaction_id):
+        """Give back a charge that could not be applied."""
+        raise NotImplementedError
+
+
+class LocalGateway(PaymentGateway):
+    """
+    In-memory gateway: approves every charge after ``PAYMENT_GATEWAY_LATENCY``
+    seconds, except references passed to ``decline``.
+    """
+
+    def __init__(self):
+        self.latency = getattr(settings, 'PAYMENT_GATEWAY_LATENCY', 0)
+        self._lock = threading.Lock()
+        self._charges = {}
+        self._declined = {}
+        self.refunded = set()
+
+    def decline(self, reference, error='Card declined.'):
+        with self._lock:
+            self._declined[reference] = error
+
+    def charge(self, reference, amount, currency, method):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if reference in self._declined:
+                return ChargeResult(approved=False, error=self._declined[reference])
+            if reference not in self._charges:
+                self._charges[reference] = f'LOCAL-{uuid4().hex[:16].upper()}'
+            return ChargeResult(approved=True, transaction_id=self._charges[reference])
+
+    def refund(self, transaction_id):
+        with self._lock:
+            self.refunded.add(transaction_id)
+
+    def clear(self):
+        with self._lock:
+            self._charges.clear()
+            self._declined.clear()
+            self.refunded.clear()
+
+
+@lru_cache(maxsize=None)
+def _load_gateway(path):
+    return import_string(path)()
+
+
+def get_gateway():
+    return _load_gateway(getattr(settings, 'PAYMENT_GATEWAY', DEFAULT_GATEWAY))
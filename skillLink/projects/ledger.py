@@ -0,0 +1,233 @@
+"""
+Double-entry payment ledger.
+
+Every movement of money is a journal of ``LedgerEntry`` legs summing to zero
+across three kinds of account: a user's balance, the escrow pool and the
+platform's fee account. Entries are only ever inserted.
+
+Balances are read from ``BalanceSnapshot`` rows plus the entries written
+since. ``take_snapshots`` (run periodically by Celery beat) folds every
+entry up to the newest committed one into fresh snapshots of the accounts
+it touched and moves the ``ledger_snapshots`` checkpoint to that entry;
+readers use the checkpoint as the boundary between "in a snapshot" and "add
+it up", so a balance costs the same three queries however long the history
+is.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+from uuid import uuid4
+
+from django.db import connection, transaction
+from django.db.models import Max, OuterRef, Q, Subquery, Sum
+
+from .models import BalanceSnapshot, LedgerEntry, Payment, SweepCheckpoint
+
+SNAPSHOT_CHECKPOINT = 'ledger_snapshots'
+
+# Accounts folded into the snapshots of one round per query
+SNAPSHOT_CHUNK = 1000
+
+ZERO = Decimal('0.00')
+
+
+@dataclass
+class Balance:
+    credits: Decimal = ZERO
+    debits: Decimal = ZERO
+    # Payouts for work, already counted in credits
+    earnings: Decimal = ZERO
+
+    @property
+    def balance(self):
+        return self.credits - self.debits
+
+    def __add__(self, other):
+        return Balance(
+            self.credits + other.credits, self.debits + other.debits, self.earnings + other.earnings
+        )
+
+
+def journal(kind, legs, currency='USD', project_id=None, payment_id=None):
+    """
+    Unsaved entries for one journal. ``legs`` are ``(account, user_id, amount)``
+    tuples; positive amounts are credits and the legs must sum to zero.
+    """
+    if sum(amount for _, _, amount in legs) != 0:
+        raise ValueError(f"Unbalanced {kind} journal: {legs!r}")
+    journal_id = uuid4()
+    return [
+        LedgerEntry(
+            journal_id=journal_id, kind=kind, account=account, user_id=user_id, amount=amount,
+            currency=currency, project_id=project_id, payment_id=payment_id,
+        )
+        for account, user_id, amount in legs
+    ]
+
+
+def release_entries(project_id, client_id, freelancer_id, amount, currency='USD', payment_id=None):
+    """
+    Journals for paying a project out: the client funds escrow with
+    ``amount``, the platform fee goes to the platform and the rest to the
+    freelancer.
+    """
+    amount = Decimal(amount)
+    fee, net = Payment.split_fee(amount)
+    refs = {'currency': currency, 'project_id': project_id, 'payment_id': payment_id}
+    entries = journal('escrow_funded', [('user', client_id, -amount), ('escrow', None, amount)], **refs)
+    if fee:
+        entries += journal('fee', [('escrow', None, -fee), ('platform', None, fee)], **refs)
+    entries += journal('payout', [('escrow', None, -net), ('user', freelancer_id, net)], **refs)
+    return entries
+
+
+def record_release(project_id, client_id, freelancer_id, amount, currency='USD', payment_id=None):
+    return LedgerEntry.objects.bulk_create(
+        release_entries(project_id, client_id, freelancer_id, amount, currency, payment_id)
+    )
+
+
+def record_refund(project_id, client_id, amount, currency='USD', payment_id=None):
+    """
+    Journals for a charge the gateway took and handed back: the client funds
+    escrow with ``amount`` and escrow returns it, leaving both balances where
+    they were.
+    """
+    amount = Decimal(amount)
+    refs = {'currency': currency, 'project_id': project_id, 'payment_id': payment_id}
+    return LedgerEntry.objects.bulk_create(
+        journal('escrow_funded', [('user', client_id, -amount), ('escrow', None, amount)], **refs)
+        + journal('refund', [('escrow', None, -amount), ('user', client_id, amount)], **refs)
+    )
+
+
+def _totals():
+    return {
+        'credits': Sum('amount', filter=Q(amount__gt=0), default=ZERO),
+        'debits': -Sum('amount', filter=Q(amount__lt=0), default=ZERO),
+        'earnings': Sum('amount', filter=Q(kind='payout', amount__gt=0), default=ZERO),
+    }
+
+
+def _owner_filter(user_ids):
+    """Match the accounts of ``user_ids``; ``None`` stands for the platform's own account."""
+    condition = Q(user_id__in=[user_id for user_id in user_ids if user_id is not None])
+    if None in user_ids:
+        condition |= Q(user__isnull=True)
+    return condition
+
+
+def _latest_snapshots(account, currency, user_ids, watermark):
+    snapshots = BalanceSnapshot.objects.filter(
+        account=account, currency=currency, last_entry_id__lte=watermark
+    )
+    latest = {}
+    if None in user_ids:
+        snapshot = snapshots.filter(user__isnull=True).order_by('-last_entry_id').first()
+        if snapshot:
+            latest[None] = snapshot
+    newest = snapshots.filter(user_id=OuterRef('user_id')).order_by('-last_entry_id').values('pk')[:1]
+    for snapshot in snapshots.filter(_owner_filter([u for u in user_ids if u is not None]), pk=Subquery(newest)):
+        latest[snapshot.user_id] = snapshot
+    return latest
+
+
+def _watermark():
+    return SweepCheckpoint.objects.filter(name=SNAPSHOT_CHECKPOINT).values_list('position_id', flat=True).first() or 0
+
+
+def balances(user_ids, account='user', currency='USD'):
+    """Return ``{user_id: Balance}`` for the ``account`` of each of ``user_ids``."""
+    user_ids = list(user_ids)
+    # Snapshots cover entries up to the watermark and no further, even if
+    # a snapshot round commits while this runs
+    watermark = _watermark()
+    result = {user_id: Balance() for user_id in user_ids}
+    for user_id, snapshot in _latest_snapshots(account, currency, user_ids, watermark).items():
+        result[user_id] = Balance(snapshot.credits, snapshot.debits, snapshot.earnings)
+
+    recent = LedgerEntry.objects.filter(
+        _owner_filter(user_ids), account=account, currency=currency, pk__gt=watermark
+    ).order_by().values('user_id').annotate(**_totals())
+    for row in recent:
+        result[row['user_id']] += Balance(row['credits'], row['debits'], row['earnings'])
+    return result
+
+
+def balance(user_id, account='user', currency='USD'):
+    """``Balance`` of one account; ``user_id=None`` for the escrow and platform accounts."""
+    return balances([user_id], account, currency)[user_id]
+
+
+def earnings(user_id, currency='USD'):
+    """Total paid out to ``user_id`` for their work, leaving out refunds they got as a client."""
+    return balance(user_id, currency=currency).earnings
+
+
+def _committed_watermark():
+    """
+    Id of the newest ledger entry, read once no transaction that could still
+    commit an entry with a lower id is in progress.
+
+    Ids are handed out at insert time, so an entry below ``Max(pk)`` may
+    belong to a transaction that hasn't committed yet; snapshotting past it
+    would leave it out of every balance for good. On PostgreSQL a SHARE lock
+    waits for the transactions inserting entries to finish and is released
+    as soon as the id is read; SQLite runs with ``transaction_mode
+    IMMEDIATE``, so opening the transaction already waits for every writer.
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {connection.ops.quote_name(LedgerEntry._meta.db_table)} IN SHARE MODE')
+        return LedgerEntry.objects.aggregate(newest=Max('pk'))['newest']
+
+
+def take_snapshots():
+    """
+    Snapshot every account with entries since the last round. Returns the
+    number of snapshots written.
+    """
+    newest = _committed_watermark()
+    with transaction.atomic():
+        checkpoint, _ = SweepCheckpoint.objects.select_for_update().get_or_create(name=SNAPSHOT_CHECKPOINT)
+        previous = checkpoint.position_id
+        if newest is None or newest <= previous:
+            return 0
+
+        changed = LedgerEntry.objects.filter(pk__gt=previous, pk__lte=newest).values(
+            'account', 'currency', 'user_id'
+        ).annotate(**_totals()).order_by('account', 'currency', 'user_id')
+        written = 0
+        chunk = []
+        for row in changed.iterator(chunk_size=SNAPSHOT_CHUNK):
+            chunk.append(row)
+            if len(chunk) >= SNAPSHOT_CHUNK:
+                written += _write_snapshots(chunk, previous, newest)
+                chunk = []
+        if chunk:
+            written += _write_snapshots(chunk, previous, newest)
+
+        checkpoint.position_id = newest
+        checkpoint.save()
+    return written
+
+
+def _write_snapshots(rows, previous, newest):
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['account'], row['currency']), []).append(row)
+
+    snapshots = []
+    for (account, currency), group in groups.items():
+        before = _latest_snapshots(account, currency, [row['user_id'] for row in group], previous)
+        for row in group:
+            total = Balance(row['credits'], row['debits'], row['earnings'])
+            if row['user_id'] in before:
+                snapshot = before[row['user_id']]
+                total += Balance(snapshot.credits, snapshot.debits, snapshot.earnings)
+            snapshots.append(BalanceSnapshot(
+                account=account, user_id=row['user_id'], currency=currency,
+                credits=total.credits, debits=total.debits, earnings=total.earnings, last_entry_id=newest,
+            ))
+    BalanceSnapshot.objects.bulk_create(snapshots)
+    return len(snapshots)
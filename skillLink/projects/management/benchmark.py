@@ -0,0 +1,109 @@
+"""
+Shared scaffolding for the ``benchmark_*`` management commands.
+
+Every run tags the users it creates with ``bench-<tag>-`` so they (and the
+projects, bids and payments hanging off them) can be told apart from real
+data and deleted afterwards unless ``--keep`` is given. Subclasses implement
+``benchmark`` and use the helpers here to time attempts, report latency and
+throughput, and check their invariants.
+"""
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from projects.models import LedgerEntry
+
+User = get_user_model()
+
+# Rows per bulk_create while building large fixtures
+FIXTURE_CHUNK = 5000
+
+
+class BenchmarkCommand(BaseCommand):
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', action='store_true', help='Keep the generated users and their data')
+
+    def handle(self, *args, **options):
+        self.tag = uuid4().hex[:8]
+        try:
+            self.benchmark(**options)
+        finally:
+            if not options['keep']:
+                self.clean_up()
+
+    def benchmark(self, **options):
+        raise NotImplementedError
+
+    @property
+    def prefix(self):
+        return f'bench-{self.tag}-'
+
+    def create_user(self, name, role):
+        return User.objects.create_user(
+            username=f'{self.prefix}{name}', email=f'{self.prefix}{name}@example.com',
+            password=uuid4().hex, role=role
+        )
+
+    def clean_up(self):
+        # Ledger entries outlive their project and users; drop them first
+        LedgerEntry.objects.filter(project__client__username__startswith=self.prefix).delete()
+        User.objects.filter(username__startswith=self.prefix).delete()
+
+    def attempt(self, action, *args):
+        """
+        Run ``action(*args)`` as one worker would and return its outcome with
+        the time it took. ``action`` returns its outcome; anything it raises is
+        reported as an error. The thread's connections are closed afterwards.
+        """
+        started = time.perf_counter()
+        try:
+            outcome = action(*args)
+        except Exception as e:
+            outcome = f'error: {type(e).__name__}: {e}'
+        finally:
+            connections.close_all()
+        return outcome, time.perf_counter() - started
+
+    def report_attempts(self, label, results, elapsed):
+        """Print outcome counts and p50/p95/max latency for ``attempt`` results."""
+        outcomes = Counter(outcome for outcome, _ in results)
+        latencies = sorted(duration * 1000 for _, duration in results)
+        self.stdout.write(f"{len(results)} {label} in {elapsed:.2f}s ({len(results) / elapsed:.0f}/s)")
+        for outcome, count in sorted(outcomes.items()):
+            self.stdout.write(f"  {outcome}: {count}")
+        self.stdout.write(
+            f"  latency ms: p50={statistics.median(latencies):.1f} "
+            f"p95={latencies[int(len(latencies) * 0.95) - 1]:.1f} max={latencies[-1]:.1f}"
+        )
+
+    def traced(self, runs):
+        """
+        Call each of ``runs`` in turn, tracing memory. Returns their results,
+        the total elapsed seconds and the peak traced memory in bytes.
+        """
+        tracemalloc.start()
+        try:
+            started = time.perf_counter()
+            results = [run() for run in runs]
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return results, elapsed, peak
+
+    def report_throughput(self, summary, count, elapsed, peak):
+        self.stdout.write(f"{summary}, {elapsed:.2f}s ({count / elapsed:.0f}/s)")
+        self.stdout.write(f"  peak traced memory: {peak / 1024 / 1024:.1f} MiB")
+
+    def verify(self, problems, success):
+        """Fail the command with ``problems``, or print ``success`` if there are none."""
+        if problems:
+            raise CommandError("Invariant violations:\n  " + "\n  ".join(problems))
+        self.stdout.write(self.style.SUCCESS(success))
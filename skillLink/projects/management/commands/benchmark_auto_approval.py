@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+from projects import auto_approval, ledger
+from projects.management.benchmark import FIXTURE_CHUNK, BenchmarkCommand
+from projects.models import Project, Bid, Escrow, LedgerEntry, Payment, WorkCompletion, SweepCheckpoint
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Build a backlog of unreviewed work submissions, run the auto-approval "
+        "sweeper over it and check that every submission was approved exactly once "
+        "and every held escrow released exactly once"
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--interrupt-after', type=int, default=0,
+            help='Stop the first run after this many batches and resume in a second run'
+        )
+
+    def benchmark(self, **options):
+        self.stdout.write(f"Creating {options['rows']} unreviewed submissions...")
+        client = self.create_fixtures(options['rows'])
+
+        # A private checkpoint over the fixture rows only: the live sweeper's
+        # position and everyone else's work are left alone
+        scope = {
+            'checkpoint_name': f'bench-{self.tag}',
+            'work': WorkCompletion.objects.filter(project__client=client),
+            'batch_size': options['batch_size'],
+        }
+        runs = [lambda: auto_approval.run(**scope)]
+        if options['interrupt_after']:
+            runs.insert(0, lambda: auto_approval.run(max_batches=options['interrupt_after'], **scope))
+        try:
+            results, elapsed, peak = self.traced(runs)
+        finally:
+            SweepCheckpoint.objects.filter(name=scope['checkpoint_name']).delete()
+
+        approved = sum(result['approved'] for result in results)
+        batches = sum(result['batches'] for result in results)
+        self.report_throughput(
+            f"{approved} submissions approved in {batches} batches over {len(results)} run(s)",
+            approved, elapsed, peak,
+        )
+        self.check_invariants(client, options['rows'])
+
+    def create_fixtures(self, rows):
+        client = self.create_user('client', 'client')
+        freelancer = self.create_user('freelancer', 'freelancer')
+        for start in range(0, rows, FIXTURE_CHUNK):
+            count = min(FIXTURE_CHUNK, rows - start)
+            projects = Project.objects.bulk_create([
+                Project(
+                    title=f'Benchmark project {start + i}', description='Auto-approval benchmark',
+                    budget=100, client=client, freelancer=freelancer, status='work_submitted', bid_count=1
+                )
+                for i in range(count)
+            ])
+            bids = Bid.objects.bulk_create([
+                Bid(
+                    project=project, freelancer=freelancer, amount=90, delivery_days=3,
+                    proposal='Benchmark bid', status='accepted', work_status='submitted'
+                )
+                for project in projects
+            ])
+            WorkCompletion.objects.bulk_create([
+                WorkCompletion(bid=bid, project=bid.project, submission_notes='Benchmark work')
+                for bid in bids
+            ])
+            # Every other client paid into escrow up front
+            Escrow.objects.bulk_create([
+                Escrow(project=bid.project, bid=bid, amount=bid.amount, status='held')
+                for bid in bids[::2]
+            ])
+        # submitted_at is set on insert; age the whole backlog past the window
+        WorkCompletion.objects.filter(project__client=client).update(
+            submitted_at=auto_approval.get_cutoff() - timedelta(days=1)
+        )
+        return client
+
+    def check_invariants(self, client, rows):
+        problems = []
+        projects = Project.objects.filter(client=client)
+        funded = projects.filter(escrow__isnull=False)
+        unfunded = projects.filter(escrow__isnull=True)
+        left = (
+            funded.exclude(status='completed', payment_status='released').count()
+            + unfunded.exclude(status='completed', payment_status='escrowed').count()
+        )
+        if left:
+            problems.append(f"{left} projects not completed and released or awaiting payment")
+        pending = WorkCompletion.objects.filter(project__client=client).exclude(status='approved').count()
+        if pending:
+            problems.append(f"{pending} submissions not approved")
+        held = Escrow.objects.filter(project__client=client).exclude(status='released').count()
+        if held:
+            problems.append(f"{held} escrows not released")
+        # One set of release journals per funded project, none for the rest
+        expected = funded.count() * len(ledger.release_entries(None, client.pk, None, 90))
+        entries = LedgerEntry.objects.filter(project__client=client)
+        if entries.count() != expected or entries.filter(project__escrow__isnull=True).exists():
+            problems.append(f"{entries.count()} ledger entries for {funded.count()} released escrows")
+        # One completed payment per released escrow, for settlement to pay out
+        payments = Payment.objects.filter(project__client=client)
+        paid = payments.filter(status='completed', project__escrow__isnull=False).count()
+        if paid != funded.count() or payments.count() != paid:
+            problems.append(f"{payments.count()} payments ({paid} completed) for {funded.count()} released escrows")
+        if entries.filter(payment__isnull=True).exists():
+            problems.append("release journals without their payment")
+        bumped = projects.exclude(version=1).count()
+        if bumped:
+            problems.append(f"{bumped} projects approved zero or several times")
+
+        self.verify(problems, f"All {rows} submissions approved exactly once.")
@@ -0,0 +1,91 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core import mail
+from django.test.utils import override_settings
+
+from chat.models import ChatRoom
+from projects.bidding import BidActionError, accept_bid
+from projects.management.benchmark import BenchmarkCommand
+from projects.models import Project, Bid
+from skillLink.celery import app as celery_app
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Hammer bid acceptance from parallel threads and check that every project "
+        "ends up with exactly one accepted bid and one chat room"
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--projects', type=int, default=20)
+        parser.add_argument('--bids', type=int, default=10, help='Bids per project')
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=5, help='Accept attempts per project')
+
+    def benchmark(self, **options):
+        self.stdout.write(f"Creating {options['projects']} projects with {options['bids']} bids each...")
+        client, project_ids = self.create_fixtures(options['projects'], options['bids'])
+
+        bid_ids = {
+            project_id: list(Bid.objects.filter(project_id=project_id).values_list('pk', flat=True))
+            for project_id in project_ids
+        }
+        jobs = [
+            random.choice(bid_ids[project_id])
+            for project_id in project_ids for _ in range(options['attempts'])
+        ]
+        random.shuffle(jobs)
+
+        # Rejection emails are sent inline and kept in memory
+        celery_app.conf.task_always_eager = True
+        mail.outbox = []
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                results = list(pool.map(lambda bid_id: self.attempt(self.accept, bid_id, client), jobs))
+            elapsed = time.perf_counter() - started
+
+        self.report_attempts('accept attempts', results, elapsed)
+        self.stdout.write(f"  rejection emails sent: {len(mail.outbox)}")
+        self.check_invariants(project_ids)
+
+    def create_fixtures(self, project_count, bids_per_project):
+        client = self.create_user('client', 'client')
+        freelancers = [self.create_user(f'freelancer{i}', 'freelancer') for i in range(bids_per_project)]
+        project_ids = []
+        for i in range(project_count):
+            project = Project.objects.create(
+                title=f'Benchmark project {i}', description='Concurrency benchmark', budget=100, client=client
+            )
+            for freelancer in freelancers:
+                Bid.objects.create(
+                    project=project, freelancer=freelancer, amount=50,
+                    delivery_days=3, proposal='Benchmark bid'
+                )
+            project_ids.append(project.pk)
+        return client, project_ids
+
+    def accept(self, bid_id, client):
+        try:
+            accept_bid(Bid.objects.get(pk=bid_id), client)
+        except BidActionError:
+            return 'conflict'
+        return 'accepted'
+
+    def check_invariants(self, project_ids):
+        problems = []
+        for project in Project.objects.filter(pk__in=project_ids):
+            accepted = list(project.bids.filter(status='accepted').values_list('freelancer_id', flat=True))
+            if len(accepted) != 1:
+                problems.append(f"project {project.pk}: {len(accepted)} accepted bids")
+            elif project.freelancer_id != accepted[0] or project.status != 'in_progress':
+                problems.append(f"project {project.pk}: not assigned to the accepted freelancer")
+            if project.bids.filter(status='pending').exists() or project.pending_bid_count:
+                problems.append(f"project {project.pk}: pending bids left over")
+            if ChatRoom.objects.filter(project=project).count() != 1:
+                problems.append(f"project {project.pk}: expected exactly one chat room")
+
+        self.verify(problems, f"All {len(project_ids)} projects consistent.")
@@ -0,0 +1,78 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db.models import Count, Q
+
+from projects.bidding import BidActionError, place_bid
+from projects.management.benchmark import BenchmarkCommand
+from projects.models import Project
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Submit bids from parallel threads, including duplicate submissions, and "
+        "check that every freelancer ends up with exactly one bid per project"
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--projects', type=int, default=20)
+        parser.add_argument('--freelancers', type=int, default=10)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--duplicates', type=int, default=2, help='Submissions per (project, freelancer) pair')
+
+    def benchmark(self, **options):
+        self.stdout.write(
+            f"Creating {options['projects']} projects and {options['freelancers']} freelancers..."
+        )
+        project_ids, freelancers = self.create_fixtures(options['projects'], options['freelancers'])
+
+        jobs = [
+            (project_id, freelancer)
+            for project_id in project_ids for freelancer in freelancers
+            for _ in range(options['duplicates'])
+        ]
+        random.shuffle(jobs)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(lambda job: self.attempt(self.submit, *job), jobs))
+        elapsed = time.perf_counter() - started
+
+        self.report_attempts('submissions', results, elapsed)
+        self.check_invariants(project_ids, len(freelancers))
+
+    def create_fixtures(self, project_count, freelancer_count):
+        client = self.create_user('client', 'client')
+        freelancers = [self.create_user(f'freelancer{i}', 'freelancer') for i in range(freelancer_count)]
+        project_ids = [
+            Project.objects.create(
+                title=f'Benchmark project {i}', description='Bid submission benchmark', budget=100, client=client
+            ).pk
+            for i in range(project_count)
+        ]
+        return project_ids, freelancers
+
+    def submit(self, project_id, freelancer):
+        try:
+            place_bid(project_id, freelancer, amount=50, delivery_days=3, proposal='Benchmark bid')
+        except BidActionError:
+            return 'duplicate'
+        return 'created'
+
+    def check_invariants(self, project_ids, freelancer_count):
+        problems = []
+        projects = Project.objects.filter(pk__in=project_ids).annotate(
+            rows=Count('bids'), pending_rows=Count('bids', filter=Q(bids__status='pending'))
+        )
+        for project in projects:
+            if project.rows != freelancer_count:
+                problems.append(f"project {project.pk}: {project.rows} bids for {freelancer_count} freelancers")
+            if (project.bid_count, project.pending_bid_count) != (project.rows, project.pending_rows):
+                problems.append(
+                    f"project {project.pk}: counters ({project.bid_count}, {project.pending_bid_count}) "
+                    f"disagree with rows ({project.rows}, {project.pending_rows})"
+                )
+
+        self.verify(problems, f"All {len(project_ids)} projects consistent.")
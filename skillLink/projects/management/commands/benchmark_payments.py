@@ -0,0 +1,106 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import CommandError
+from django.db.models import Count, Sum
+
+from projects import gateways, ledger, payments, workflow
+from projects.management.benchmark import BenchmarkCommand
+from projects.models import Project, Bid, LedgerEntry, Payment
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Queue payments for completed projects the way the payment view does, "
+        "process them from parallel workers through the local gateway and check "
+        "that every payment settled once with balanced ledger entries. Queued task "
+        "messages go to the configured broker; run with CELERY_BROKER_URL=memory:// "
+        "to keep them in memory"
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--payments', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds the local gateway takes per charge')
+
+    def handle(self, *args, **options):
+        gateway = gateways.get_gateway()
+        if not isinstance(gateway, gateways.LocalGateway):
+            raise CommandError("The payments benchmark only runs against projects.gateways.LocalGateway.")
+        gateway.latency = options['latency']
+        super().handle(*args, **options)
+
+    def benchmark(self, **options):
+        self.stdout.write(f"Creating {options['payments']} completed projects...")
+        client, project_ids = self.create_fixtures(options['payments'])
+
+        # The workers below play the Celery workers
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            started = time.perf_counter()
+            queued = list(pool.map(lambda project_id: self.attempt(self.queue, project_id, client), project_ids))
+            queue_elapsed = time.perf_counter() - started
+
+            payment_ids = list(Payment.objects.filter(project_id__in=project_ids).values_list('pk', flat=True))
+            started = time.perf_counter()
+            processed = list(pool.map(lambda payment_id: self.attempt(payments.process, payment_id), payment_ids))
+            process_elapsed = time.perf_counter() - started
+
+        self.report_attempts('payments queued', queued, queue_elapsed)
+        self.report_attempts('payments processed', processed, process_elapsed)
+        self.check_invariants(project_ids)
+
+    def create_fixtures(self, count):
+        client = self.create_user('client', 'client')
+        freelancer = self.create_user('freelancer', 'freelancer')
+        projects = Project.objects.bulk_create([
+            Project(
+                title=f'Benchmark project {i}', description='Payments benchmark', budget=100, client=client,
+                freelancer=freelancer, status='completed', payment_status='escrowed', bid_count=1
+            )
+            for i in range(count)
+        ])
+        Bid.objects.bulk_create([
+            Bid(
+                project=project, freelancer=freelancer, amount=Decimal('99.95') - i % 7, delivery_days=3,
+                proposal='Benchmark bid', status='accepted', work_status='completed'
+            )
+            for i, project in enumerate(projects)
+        ])
+        return client, [project.pk for project in projects]
+
+    def queue(self, project_id, client):
+        workflow.apply_transition(
+            'initiate_payment', project_id, client,
+            effect=lambda project, bid: payments.queue_payment(project, bid, client, 'card'),
+        )
+        return 'queued'
+
+    def check_invariants(self, project_ids):
+        problems = []
+        unpaid = Project.objects.filter(pk__in=project_ids).exclude(payment_status='released').count()
+        if unpaid:
+            problems.append(f"{unpaid} projects not released")
+        unsettled = Payment.objects.filter(project_id__in=project_ids).exclude(status='completed').count()
+        if unsettled:
+            problems.append(f"{unsettled} payments not completed")
+
+        entries = LedgerEntry.objects.filter(project_id__in=project_ids)
+        unbalanced = entries.order_by().values('journal_id').annotate(total=Sum('amount')).exclude(total=0).count()
+        if unbalanced:
+            problems.append(f"{unbalanced} unbalanced ledger journals")
+        posted = Counter(
+            entries.order_by().values('payment_id').annotate(journals=Count('journal_id', distinct=True))
+            .values_list('journals', flat=True)
+        )
+        if set(posted) != {3} or sum(posted.values()) != len(project_ids):
+            problems.append(f"journals per payment: {dict(posted)}")
+
+        freelancer_id = Project.objects.filter(pk=project_ids[0]).values_list('freelancer_id', flat=True).get()
+        net = Payment.objects.filter(project_id__in=project_ids).aggregate(total=Sum('net_amount'))['total']
+        if ledger.balance(freelancer_id).credits != net:
+            problems.append(f"freelancer credited {ledger.balance(freelancer_id).credits}, payments net {net}")
+
+        self.verify(problems, f"All {len(project_ids)} payments settled once.")
@@ -0,0 +1,124 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Sum
+
+from projects import settlement
+from projects.management.benchmark import FIXTURE_CHUNK, BenchmarkCommand
+from projects.models import Project, Bid, Payment, PayoutBatch, PayoutLine, SweepCheckpoint
+
+User = get_user_model()
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Build a day of completed payments spread over many freelancers, settle "
+        "them into payout batches and check that every payment landed in exactly "
+        "one batch with matching totals"
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--payments', type=int, default=100000)
+        parser.add_argument('--payees', type=int, default=1000)
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument(
+            '--interrupt-after', type=int, default=0,
+            help='Stop the first run after this many chunks and resume in a second run'
+        )
+
+    def benchmark(self, **options):
+        period = settlement.default_period()
+        self.stdout.write(f"Creating {options['payments']} payments to {options['payees']} freelancers...")
+        client = self.create_fixtures(options['payments'], options['payees'], period)
+
+        # A private checkpoint over the fixture payments only: the live
+        # settlement's position and everyone else's payouts are left alone
+        scope = {
+            'checkpoint_name': f'bench-{self.tag}',
+            'payments': Payment.objects.filter(payer=client),
+            'chunk_size': options['chunk_size'],
+        }
+        runs = [lambda: settlement.settle(period, **scope)]
+        if options['interrupt_after']:
+            runs.insert(0, lambda: settlement.settle(period, max_chunks=options['interrupt_after'], **scope))
+        try:
+            results, elapsed, peak = self.traced(runs)
+        finally:
+            SweepCheckpoint.objects.filter(name=scope['checkpoint_name']).delete()
+
+        settled = sum(result['payments'] for result in results)
+        chunks = sum(result['chunks'] for result in results)
+        batches = sum(result['batches'] for result in results)
+        self.report_throughput(
+            f"{settled} payments settled into {batches} batches in {chunks} chunks over {len(results)} run(s)",
+            settled, elapsed, peak,
+        )
+        self.check_invariants(client, period, options['payments'], options['payees'])
+
+    def create_fixtures(self, count, payees, period):
+        client = self.create_user('client', 'client')
+        freelancers = User.objects.bulk_create([
+            User(
+                username=f'{self.prefix}freelancer-{i}', email=f'{self.prefix}freelancer-{i}@example.com',
+                role='freelancer'
+            )
+            for i in range(payees)
+        ])
+        completed_at = settlement.get_cutoff(period) - timedelta(hours=12)
+        for start in range(0, count, FIXTURE_CHUNK):
+            size = min(FIXTURE_CHUNK, count - start)
+            projects = Project.objects.bulk_create([
+                Project(
+                    title=f'Benchmark project {start + i}', description='Settlement benchmark', budget=100,
+                    client=client, freelancer=freelancers[(start + i) % payees], status='completed',
+                    payment_status='released', bid_count=1
+                )
+                for i in range(size)
+            ])
+            bids = Bid.objects.bulk_create([
+                Bid(
+                    project=project, freelancer_id=project.freelancer_id, amount=Decimal('99.95') - i % 7,
+                    delivery_days=3, proposal='Benchmark bid', status='accepted', work_status='completed'
+                )
+                for i, project in enumerate(projects)
+            ])
+            payments = []
+            for bid in bids:
+                payment = Payment(
+                    project_id=bid.project_id, bid=bid, payer=client, payee_id=bid.freelancer_id,
+                    amount=bid.amount, payment_method='card', status='completed', completed_at=completed_at,
+                    reference_number=f'BENCH-{self.tag}-{bid.pk}', transaction_id=f'BENCH-{self.tag}-{bid.pk}',
+                )
+                payment.calculate_net_amount()
+                payments.append(payment)
+            Payment.objects.bulk_create(payments)
+        return client
+
+    def check_invariants(self, client, period, count, payees):
+        problems = []
+        payments = Payment.objects.filter(payer=client)
+        unsettled = payments.filter(payout_line__isnull=True).count()
+        if unsettled:
+            problems.append(f"{unsettled} payments not settled")
+
+        batches = PayoutBatch.objects.filter(period=period, payee__username__startswith=self.prefix)
+        if batches.count() != payees:
+            problems.append(f"{batches.count()} batches for {payees} payees")
+        # Compared in Python: SQLite sums decimals as floats
+        mismatched = sum(
+            1 for total, payment_count, lines_total, line_count in batches.annotate(
+                lines_total=Sum('lines__amount'), line_count=Count('lines')
+            ).values_list('total_amount', 'payment_count', 'lines_total', 'line_count')
+            if (total, payment_count) != (lines_total, line_count)
+        )
+        if mismatched:
+            problems.append(f"{mismatched} batches whose totals don't match their lines")
+
+        net = payments.aggregate(total=Sum('net_amount'))['total']
+        settled = PayoutLine.objects.filter(payment__payer=client).aggregate(total=Sum('amount'))['total']
+        if settled != net:
+            problems.append(f"lines total {settled}, payments net {net}")
+
+        self.verify(problems, f"All {count} payments settled exactly once.")
@@ -0,0 +1,115 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.test import force_authenticate
+
+from chat.models import ChatRoom
+from projects import views
+from projects.models import Project
+
+User = get_user_model()
+
+# A plan line is a full scan when it walks a table without an index.
+# Virtual tables (the FTS index) and constant rows are fine.
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?(?P<table>\w+)(?!.*\b(?:USING|VIRTUAL TABLE)\b)')
+POSTGRES_FULL_SCAN = re.compile(r'\bSeq Scan on (?P<table>\w+)')
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the querysets built by the project and chat views and fail on full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+
+    def handle(self, *args, **options):
+        self.factory = RequestFactory()
+        failures = []
+
+        for label, queryset in self.view_querysets():
+            plan = queryset.explain()
+            scanned = self.full_scans(plan)
+            if scanned:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {label}: {', '.join(scanned)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok         {label}"))
+            if scanned or options['verbose_plans']:
+                self.stdout.write(self.indent(plan))
+
+        if failures:
+            raise CommandError(f"{len(failures)} view queryset(s) do a full table scan.")
+
+    def full_scans(self, plan):
+        pattern = POSTGRES_FULL_SCAN if connection.vendor == 'postgresql' else SQLITE_FULL_SCAN
+        return [match.group('table') for match in pattern.finditer(plan)
+                if match.group('table') != 'CONSTANT']
+
+    def indent(self, plan):
+        return '\n'.join(f'    {line}' for line in plan.splitlines())
+
+    def request(self, path, user, **params):
+        request = self.factory.get(path, params)
+        request.user = user
+        return request
+
+    def list_view_queryset(self, view_class, request, **kwargs):
+        view = view_class()
+        view.setup(request, **kwargs)
+        return view.get_queryset()[:view.paginate_by]
+
+    def api_view_queryset(self, view_class, request, **kwargs):
+        view = view_class()
+        view.setup(request, **kwargs)
+        force_authenticate(request, user=request.user)
+        view.request = Request(request)
+        view.format_kwarg = None
+        queryset = view.filter_queryset(view.get_queryset())
+        page_size = view.pagination_class.page_size if view.pagination_class else 100
+        return queryset[:page_size + 1]
+
+    def view_querysets(self):
+        # Unsaved users are enough to build the querysets; the plans do not
+        # depend on whether the ids exist.
+        client = User(pk=1, username='explain-client', role='client')
+        freelancer = User(pk=2, username='explain-freelancer', role='freelancer')
+
+        yield 'ProjectListView', self.list_view_queryset(
+            views.ProjectListView, self.request('/projects/', client))
+        yield 'ProjectListView ?status=open', self.list_view_queryset(
+            views.ProjectListView, self.request('/projects/', client, status='open'))
+        yield 'ProjectListView ?search=', self.list_view_queryset(
+            views.ProjectListView, self.request('/projects/', client, search='logo design'))
+        yield 'MyProjectsView (client)', self.list_view_queryset(
+            views.MyProjectsView, self.request('/projects/my-projects/', client))
+        yield 'MyProjectsView (freelancer)', self.list_view_queryset(
+            views.MyProjectsView, self.request('/projects/my-projects/', freelancer))
+
+        for ordering in ('-created_at', 'budget', '-bid_count'):
+            yield f'AvailableProjectsListView ?ordering={ordering}', self.api_view_queryset(
+                views.AvailableProjectsListView,
+                self.request('/projects/api/available/', freelancer, ordering=ordering))
+        yield 'AvailableProjectsListView ?search=', self.api_view_queryset(
+            views.AvailableProjectsListView,
+            self.request('/projects/api/available/', freelancer, search='logo design'))
+
+        yield 'RecommendedProjectsView', self.api_view_queryset(
+            views.RecommendedProjectsView, self.request('/projects/api/recommended/', freelancer))
+
+        yield 'UserBidsListView', self.api_view_queryset(
+            views.UserBidsListView, self.request('/projects/api/my-bids/', freelancer))
+
+        project = Project.objects.select_related('client').order_by('pk').first()
+        if project is not None:
+            yield 'BidListView', self.api_view_queryset(
+                views.BidListView, self.request('/', project.client), project_id=project.pk)
+        else:
+            self.stdout.write(self.style.WARNING("skipped    BidListView (no projects in the database)"))
+
+        # ChatRoomListAPIView.get_queryset() creates the room it reads, so its
+        # queryset is rebuilt here the way the view builds it: every message of
+        # the room, newest first, unpaginated.
+        yield 'ChatRoomListAPIView', ChatRoom(pk=1).messages.all().order_by('-timestamp')
@@ -0,0 +1,45 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects import exports
+
+
+class Command(BaseCommand):
+    help = "Stream payments, escrows or reviews to a CSV or JSON Lines file, the same export staff download"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(exports.DATASETS))
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--since', type=date.fromisoformat, help='First day to include (YYYY-MM-DD)')
+        parser.add_argument('--until', type=date.fromisoformat, help='Last day to include (YYYY-MM-DD)')
+        parser.add_argument('--status')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows fetched per database round trip')
+        parser.add_argument('-o', '--output', default='-', help='File to write; standard output by default')
+
+    def handle(self, *args, **options):
+        dataset = exports.DATASETS[options['dataset']]
+        statuses = [value for value, _ in dataset.statuses]
+        if options['status'] and options['status'] not in statuses:
+            raise CommandError(
+                f"--status for {options['dataset']} must be one of: {', '.join(statuses) or 'none'}"
+            )
+
+        chunks = exports.stream(
+            options['dataset'], options['format'], options['gzip'], since=options['since'],
+            until=options['until'], status=options['status'], chunk_size=options['chunk_size'],
+        )
+        if options['output'] == '-':
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
+            return
+
+        written = 0
+        with open(options['output'], 'wb') as out:
+            for chunk in chunks:
+                written += out.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}."))
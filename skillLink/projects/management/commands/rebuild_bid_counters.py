@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from projects.counters import rebuild_bid_counters
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = "Recompute Project.bid_count and Project.pending_bid_count from the bids table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--project', type=int, action='append', dest='project_ids',
+            help='Only rebuild the given project id (can be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Project.objects.all()
+        if options['project_ids']:
+            queryset = queryset.filter(pk__in=options['project_ids'])
+
+        updated = rebuild_bid_counters(queryset)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt bid counters for {updated} project(s)."))
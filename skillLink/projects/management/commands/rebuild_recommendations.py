@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from projects import recommendations
+
+
+class Command(BaseCommand):
+    help = "Refit the recommendation index and recompute every freelancer's recommended projects feed"
+
+    def handle(self, *args, **options):
+        count = recommendations.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt recommendation feeds for {count} freelancer(s)."))
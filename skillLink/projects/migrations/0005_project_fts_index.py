@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS projects_project_fts "
+        "USING fts5(title, description, tokenize='porter unicode61')"
+    )
+    schema_editor.execute(
+        "INSERT INTO projects_project_fts (rowid, title, description) "
+        "SELECT id, title, description FROM projects_project"
+    )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS projects_project_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_bid_accepted_at_bid_submitted_at_bid_work_status_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:21
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_bid_counters(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Bid = apps.get_model('projects', 'Bid')
+
+    def count_bids(**filters):
+        counts = Bid.objects.filter(project=OuterRef('pk'), **filters).order_by().values(
+            'project'
+        ).annotate(total=Count('id')).values('total')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    Project.objects.update(
+        bid_count=count_bids(),
+        pending_bid_count=count_bids(status='pending'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_project_fts_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='pending_bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_bid_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_project_bid_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['project', 'status', '-created_at'], name='bid_project_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['freelancer', '-created_at'], name='bid_freelancer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['-created_at'], name='project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', '-created_at'], name='project_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['client', 'status'], name='project_client_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['freelancer', 'status'], name='project_freelancer_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', 'budget'], name='project_status_budget_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', '-bid_count'], name='project_status_bid_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('status', 'open')), fields=['-created_at'], name='project_open_created_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_marketplace_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectRecommendation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('freelancer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_recommendations', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='projects.project')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['freelancer', '-score'], name='recommendation_feed_idx')],
+                'unique_together': {('freelancer', 'project')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_project_recommendation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bid',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('shortlisted', 'Shortlisted'), ('accepted', 'Accepted'), ('rejected', 'Rejected'), ('withdrawn', 'Withdrawn')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_bid_shortlisted_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_project_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SweepCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('position_at', models.DateTimeField(blank=True, null=True)),
+                ('position_id', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='workcompletion',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['submitted_at', 'id'], name='work_pending_submitted_idx'),
+        ),
+    ]
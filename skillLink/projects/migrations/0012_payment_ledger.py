@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:01
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_work_auto_approval'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(choices=[('user', 'User Balance'), ('escrow', 'Escrow'), ('platform', 'Platform Fees')], max_length=20)),
+                ('currency', models.CharField(default='USD', max_length=3)),
+                ('credits', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('debits', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('last_entry_id', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-last_entry_id'],
+                'indexes': [models.Index(fields=['account', 'user', 'currency', '-last_entry_id'], name='snapshot_latest_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('journal_id', models.UUIDField(db_index=True, default=uuid.uuid4)),
+                ('kind', models.CharField(choices=[('escrow_funded', 'Escrow Funded'), ('fee', 'Platform Fee'), ('payout', 'Payout'), ('refund', 'Refund')], max_length=20)),
+                ('account', models.CharField(choices=[('user', 'User Balance'), ('escrow', 'Escrow'), ('platform', 'Platform Fees')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('currency', models.CharField(default='USD', max_length=3)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='projects.payment')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='projects.project')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['account', 'user', 'currency', 'id'], name='ledger_account_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_payment_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutBatch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(default='USD', max_length=3)),
+                ('period', models.DateField(help_text='Day whose completed payments the batch settles')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payment_count', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'Pending Transfer'), ('paid', 'Paid'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-period', 'payee'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PayoutLine',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('status', 'completed')), fields=['completed_at', 'id'], name='payment_completed_idx'),
+        ),
+        migrations.AddField(
+            model_name='payoutbatch',
+            name='payee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payout_batches', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='payoutline',
+            name='batch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='projects.payoutbatch'),
+        ),
+        migrations.AddField(
+            model_name='payoutline',
+            name='payment',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='payout_line', to='projects.payment'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='payoutbatch',
+            unique_together={('payee', 'currency', 'period')},
+        ),
+    ]
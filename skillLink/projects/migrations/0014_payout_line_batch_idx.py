@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0013_payout_settlement'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payoutline',
+            index=models.Index(fields=['batch', 'id'], name='payout_line_batch_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_payout_line_batch_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField()),
+                ('freelancer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendation_terms', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term'], name='profile_term_idx')],
+                'unique_together': {('freelancer', 'term')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField()),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendation_terms', to='projects.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term'], name='project_term_idx')],
+                'unique_together': {('project', 'term')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:07
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_snapshot_earnings(apps, schema_editor):
+    BalanceSnapshot = apps.get_model('projects', 'BalanceSnapshot')
+    LedgerEntry = apps.get_model('projects', 'LedgerEntry')
+
+    payouts = LedgerEntry.objects.filter(
+        account='user', user_id=OuterRef('user_id'), currency=OuterRef('currency'),
+        pk__lte=OuterRef('last_entry_id'), kind='payout', amount__gt=0,
+    ).order_by().values('user_id').annotate(total=Sum('amount')).values('total')
+    BalanceSnapshot.objects.filter(account='user').update(
+        earnings=Coalesce(Subquery(payouts, output_field=DecimalField()), Value(Decimal('0.00')))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0015_recommendation_terms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='balancesnapshot',
+            name='earnings',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.RunPython(populate_snapshot_earnings, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,8 @@
+from decimal import Decimal, ROUND_HALF_UP
+from uuid import uuid4
+
 from django.db import models
+from django.db.models import Q
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -31,22 +35,56 @@ class Project(models.Model):
         ],
         default='not_started'
     )
+    # Denormalized from Bid rows, maintained by projects.counters
+    bid_count = models.PositiveIntegerField(default=0)
+    pending_bid_count = models.PositiveIntegerField(default=0)
+    # Bumped by every projects.workflow transition, for optimistic concurrency checks
+    version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded state so signal handlers can tell what changed
+        loaded = dict(zip(field_names, values))
+        if {'status', 'client_id', 'freelancer_id', 'budget'} <= loaded.keys():
+            instance._stats_state = (
+                loaded['status'], loaded['client_id'], loaded['freelancer_id'], loaded['budget']
+            )
+        return instance
+
+    def stats_state(self):
+        return (self.status, self.client_id, self.freelancer_id, self.budget)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='project_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='project_status_created_idx'),
+            models.Index(fields=['client', 'status'], name='project_client_status_idx'),
+            models.Index(fields=['freelancer', 'status'], name='project_freelancer_status_idx'),
+            # Open-project listings filter on status and sort by one of the
+            # marketplace ordering fields
+            models.Index(fields=['status', 'budget'], name='project_status_budget_idx'),
+            models.Index(fields=['status', '-bid_count'], name='project_status_bid_count_idx'),
+            models.Index(fields=['-created_at'], name='project_open_created_idx', condition=Q(status='open')),
+        ]
 
 
 class Bid(models.Model):
     BID_STATUS_CHOICES = (
         ('pending', 'Pending'),
+        ('shortlisted', 'Shortlisted'),
         ('accepted', 'Accepted'),
         ('rejected', 'Rejected'),
         ('withdrawn', 'Withdrawn'),
     )
     
+    # Bids the client can still act on
+    OPEN_STATUSES = ('pending', 'shortlisted')
+    
     WORK_STATUS_CHOICES = (
         ('not_started', 'Not Started'),
         ('in_progress', 'In Progress'),
@@ -70,11 +108,64 @@ class Bid(models.Model):
     class Meta:
         unique_together = ('project', 'freelancer')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['project', 'status', '-created_at'], name='bid_project_status_created_idx'),
+            models.Index(fields=['freelancer', '-created_at'], name='bid_freelancer_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.freelancer.username} - {self.project.title} - {self.amount}"
 
 
+class ProjectRecommendation(models.Model):
+    """One entry of a freelancer's precomputed feed, maintained by projects.recommendations."""
+    freelancer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='project_recommendations')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='recommendations')
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('freelancer', 'project')
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['freelancer', '-score'], name='recommendation_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.freelancer_id} -> {self.project_id} ({self.score:.3f})"
+
+
+class ProjectTerm(models.Model):
+    """How often a term appears in an open project, for projects.recommendations."""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='recommendation_terms')
+    term = models.CharField(max_length=100)
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('project', 'term')
+        indexes = [
+            models.Index(fields=['term'], name='project_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id}: {self.term} x{self.count}"
+
+
+class ProfileTerm(models.Model):
+    """Weighted count of a term in a freelancer's profile, for projects.recommendations."""
+    freelancer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='recommendation_terms')
+    term = models.CharField(max_length=100)
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('freelancer', 'term')
+        indexes = [
+            models.Index(fields=['term'], name='profile_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.freelancer_id}: {self.term} x{self.count}"
+
+
 class Escrow(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending - Awaiting Freelancer'),
@@ -126,6 +217,33 @@ class WorkCompletion(models.Model):
     
     class Meta:
         ordering = ['-submitted_at']
+        indexes = [
+            # Work still awaiting review, oldest first, for the auto-approval sweeper
+            models.Index(
+                fields=['submitted_at', 'id'], name='work_pending_submitted_idx', condition=Q(status='pending')
+            ),
+        ]
+
+
+class SweepCheckpoint(models.Model):
+    """
+    How far a batch job has got through its keyset-ordered rows, saved in the
+    same transaction as each batch so an interrupted run resumes after the
+    last committed batch.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    position_at = models.DateTimeField(null=True, blank=True)
+    position_id = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} at {self.position_at} / {self.position_id}"
+
+    def after(self, field):
+        """Filter for rows past this position in ``(field, pk)`` order."""
+        if self.position_at is None:
+            return Q()
+        return Q(**{f'{field}__gt': self.position_at}) | Q(**{field: self.position_at, 'pk__gt': self.position_id})
 
 
 class Review(models.Model):
@@ -206,11 +324,152 @@ class Payment(models.Model):
     def __str__(self):
         return f"Payment - {self.project.title} - {self.amount} - {self.status}"
     
+    # Share of every payment kept by SkillLink
+    PLATFORM_FEE_RATE = Decimal('0.10')
+
+    @classmethod
+    def split_fee(cls, amount):
+        """Return ``(platform_fee, net_amount)`` for ``amount``, the fee rounded to the cent."""
+        amount = Decimal(amount)
+        fee = (amount * cls.PLATFORM_FEE_RATE).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        return fee, amount - fee
+    
     def calculate_net_amount(self):
-        platform_fee_percentage = 0.10
-        self.platform_fee = self.amount * platform_fee_percentage
-        self.net_amount = self.amount - self.platform_fee
+        self.platform_fee, self.net_amount = self.split_fee(self.amount)
         return self.net_amount
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Completed payments in completion order, for payout settlement
+            models.Index(
+                fields=['completed_at', 'id'], name='payment_completed_idx', condition=Q(status='completed')
+            ),
+        ]
+
+
+class PayoutBatch(models.Model):
+    """One transfer to a payee covering all their payments settled for ``period``."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending Transfer'),
+        ('paid', 'Paid'),
+        ('failed', 'Failed'),
+    )
+
+    payee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='payout_batches')
+    currency = models.CharField(max_length=3, default='USD')
+    period = models.DateField(help_text="Day whose completed payments the batch settles")
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payment_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Payout - {self.payee_id} - {self.period} - {self.total_amount} {self.currency}"
+
+    class Meta:
+        ordering = ['-period', 'payee']
+        unique_together = ('payee', 'currency', 'period')
+
+
+class PayoutLine(models.Model):
+    batch = models.ForeignKey(PayoutBatch, on_delete=models.CASCADE, related_name='lines')
+    # One line per payment: a payment can never be settled twice
+    payment = models.OneToOneField(Payment, on_delete=models.CASCADE, related_name='payout_line')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.batch} - payment {self.payment_id} - {self.amount}"
+
+    class Meta:
+        indexes = [
+            # A batch's lines in insertion order, for adding one chunk to its totals
+            models.Index(fields=['batch', 'id'], name='payout_line_batch_idx'),
+        ]
+
+
+class LedgerEntryQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise TypeError("Ledger entries are append-only; post a correcting entry instead.")
+
+
+class LedgerEntry(models.Model):
+    """
+    One leg of a double-entry posting. The legs sharing a ``journal_id`` sum
+    to zero: money leaves one account (negative ``amount``) and arrives in
+    another (positive). Rows are only ever inserted, through projects.ledger.
+    """
+    KIND_CHOICES = (
+        ('escrow_funded', 'Escrow Funded'),
+        ('fee', 'Platform Fee'),
+        ('payout', 'Payout'),
+        ('refund', 'Refund'),
+    )
+
+    ACCOUNT_CHOICES = (
+        ('user', 'User Balance'),
+        ('escrow', 'Escrow'),
+        ('platform', 'Platform Fees'),
+    )
+
+    journal_id = models.UUIDField(default=uuid4, db_index=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    account = models.CharField(max_length=20, choices=ACCOUNT_CHOICES)
+    # Owner of a 'user' account; empty for the platform's own accounts
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries'
+    )
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    currency = models.CharField(max_length=3, default='USD')
+    project = models.ForeignKey(
+        Project, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries'
+    )
+    payment = models.ForeignKey(
+        'Payment', on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = LedgerEntryQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.account} - {self.amount} {self.currency}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError("Ledger entries are append-only; post a correcting entry instead.")
+        super().save(*args, **kwargs)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Entries of one account after its latest snapshot
+            models.Index(fields=['account', 'user', 'currency', 'id'], name='ledger_account_idx'),
+        ]
+
+
+class BalanceSnapshot(models.Model):
+    """
+    Running totals of one ledger account over every entry up to and including
+    ``last_entry_id``; the balance is ``credits - debits``. ``earnings`` is the
+    part of ``credits`` paid out for work.
+    """
+    account = models.CharField(max_length=20, choices=LedgerEntry.ACCOUNT_CHOICES)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='balance_snapshots'
+    )
+    currency = models.CharField(max_length=3, default='USD')
+    credits = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    debits = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    last_entry_id = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.account} {self.user_id} @ {self.last_entry_id}: {self.credits - self.debits} {self.currency}"
+
+    class Meta:
+        ordering = ['-last_entry_id']
+        indexes = [
+            models.Index(fields=['account', 'user', 'currency', '-last_entry_id'], name='snapshot_latest_idx'),
+        ]
@@ -0,0 +1,136 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the queryset's primary ordering field plus ``id``.
+
+    Each page is fetched with a ``(field, id)`` range condition rather than an
+    OFFSET, and no COUNT(*) is run, so page cost stays flat however deep the
+    client scrolls. The ordering is taken from the queryset itself, which means
+    ``OrderingFilter`` and search ranking keep working unchanged.
+    """
+
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    default_ordering = ('-created_at',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(queryset)
+
+        position, reverse = self.decode_cursor(request)
+
+        # Paging backwards walks the same keyset in the opposite direction
+        descending = self.descending != reverse
+        queryset = queryset.order_by(*self.order_by_for(descending))
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(position, descending))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        ordering = [o for o in queryset.query.order_by if o.lstrip('-') not in ('id', 'pk')]
+        if not ordering:
+            ordering = self.default_ordering
+        primary = ordering[0]
+        return primary.lstrip('-'), primary.startswith('-')
+
+    def order_by_for(self, descending):
+        prefix = '-' if descending else ''
+        return [f'{prefix}{self.field}', f'{prefix}id']
+
+    def position_filter(self, position, descending):
+        value, pk = position
+        op = 'lt' if descending else 'gt'
+        return Q(**{f'{self.field}__{op}': value}) | Q(**{self.field: value, f'id__{op}': pk})
+
+    def get_position(self, obj):
+        value = getattr(obj, self.field)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = str(value)
+        return [value, obj.pk]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if payload['f'] != self.field:
+                raise ValueError('cursor was issued for a different ordering')
+            position = payload['p']
+            if not isinstance(position, list) or len(position) != 2:
+                raise ValueError('malformed position')
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'f': self.field, 'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
@@ -0,0 +1,204 @@
+"""
+Asynchronous payment processing.
+
+``queue_payment`` runs inside the client's request: it writes one pending
+``Payment`` row and hands its id to ``process_payment_task`` once the
+transaction commits, so the request returns without waiting on the gateway.
+The worker then calls ``process``:
+
+    pending -> processing -> completed  (charge approved, project released,
+                                         ledger journals posted)
+                          -> failed     (charge declined, or the project can
+                                         no longer be paid and the charge is
+                                         refunded and journalled; a client may
+                                         pay again, which re-arms the same row)
+
+Each status change is pushed to the ``payments_<project id>`` channel group,
+which ``PaymentStatusConsumer`` forwards to the client and freelancer.
+"""
+import logging
+from datetime import timedelta
+from uuid import uuid4
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .gateways import get_gateway
+from .models import Payment
+from .workflow import TransitionError, apply_transition
+from . import ledger
+
+logger = logging.getLogger(__name__)
+
+# Payments the worker should be on
+ACTIVE_STATUSES = ('pending', 'processing')
+
+# Pending payments older than this were probably never handed to a worker,
+# and processing ones initiated this long ago lost theirs
+REQUEUE_AFTER = timedelta(minutes=5)
+
+
+def group_name(project_id):
+    return f'payments_{project_id}'
+
+
+def status_event(payment):
+    return {
+        'type': 'payment_status',
+        'reference': payment.reference_number,
+        'status': payment.status,
+        'amount': str(payment.amount),
+        'error': payment.error_message,
+    }
+
+
+def push_status(payment):
+    """
+    Tell the project's WebSocket listeners where ``payment`` stands now,
+    once the current transaction commits.
+    """
+    event = status_event(payment)
+    transaction.on_commit(lambda: _send(payment.project_id, event))
+
+
+def _send(project_id, event):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(group_name(project_id), event)
+    except Exception as e:
+        # A missed notification must not fail the payment
+        logger.error(f"Failed to push payment status {event['reference']}: {e}")
+
+
+def enqueue(payment_id):
+    from .tasks import process_payment_task
+
+    try:
+        process_payment_task.delay(payment_id)
+    except Exception as e:
+        # Left pending; requeue_stale picks it up again
+        logger.error(f"Failed to queue payment {payment_id}: {e}")
+
+
+def queue_payment(project, bid, payer, payment_method, notes=''):
+    """
+    Record a pending payment for ``project`` and queue it for processing.
+
+    Call inside the transaction holding the project's row lock. A payment that
+    failed earlier is re-armed with a fresh reference; one that is still in
+    flight or done is refused with ``TransitionError``.
+    """
+    payment = Payment.objects.filter(project=project).first()
+    if payment is not None and payment.status != 'failed':
+        raise TransitionError('A payment for this project is already being processed.')
+
+    fields = {
+        'bid': bid,
+        'payer': payer,
+        'payee_id': project.freelancer_id,
+        'amount': bid.amount,
+        'payment_method': payment_method,
+        'notes': notes,
+        'reference_number': f"SKL-{uuid4().hex[:8].upper()}",
+        'transaction_id': f"TXN-{uuid4().hex[:12].upper()}",
+        'status': 'pending',
+        'error_message': '',
+        'initiated_at': None,
+        'completed_at': None,
+    }
+    if payment is None:
+        payment = Payment(project=project, **fields)
+        payment.calculate_net_amount()
+        payment.save()
+    else:
+        for name, value in fields.items():
+            setattr(payment, name, value)
+        payment.calculate_net_amount()
+        payment.save(update_fields=[*fields, 'platform_fee', 'net_amount'])
+
+    push_status(payment)
+    transaction.on_commit(lambda: enqueue(payment.pk))
+    return payment
+
+
+def _set_status(payment, status, **fields):
+    """Move ``payment`` to ``status`` with one UPDATE and push the change."""
+    fields['status'] = status
+    Payment.objects.filter(pk=payment.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(payment, name, value)
+    push_status(payment)
+
+
+def process(payment_id):
+    """
+    Charge a queued payment and settle it. Returns the final status.
+
+    Safe to run more than once for the same payment: the charge is keyed by
+    the payment reference and the settlement only happens once. Raises
+    ``GatewayUnavailable`` when the charge should be retried later.
+    """
+    payment = Payment.objects.select_related('payer').get(pk=payment_id)
+    if payment.status not in ACTIVE_STATUSES:
+        return payment.status
+    if payment.payer_id is None:
+        _set_status(payment, 'failed', error_message='The paying account no longer exists.')
+        return payment.status
+    if payment.status == 'pending':
+        _set_status(payment, 'processing', initiated_at=timezone.now())
+
+    result = get_gateway().charge(
+        payment.reference_number, payment.amount, payment.currency, payment.payment_method
+    )
+    if not result.approved:
+        _set_status(payment, 'failed', error_message=result.error)
+        return payment.status
+
+    def settle(project, bid):
+        _set_status(payment, 'completed', transaction_id=result.transaction_id, completed_at=timezone.now())
+        ledger.record_release(
+            project.pk, project.client_id, project.freelancer_id, payment.amount, payment.currency, payment.pk
+        )
+
+    try:
+        apply_transition('release_payment', payment.project_id, payment.payer, effect=settle)
+    except TransitionError as e:
+        if Payment.objects.filter(pk=payment.pk, status='completed').exists():
+            # Another delivery of this task settled it first
+            return 'completed'
+        get_gateway().refund(result.transaction_id)
+        with transaction.atomic():
+            _set_status(payment, 'failed', transaction_id=result.transaction_id, error_message=e.detail)
+            ledger.record_refund(
+                payment.project_id, payment.payer_id, payment.amount, payment.currency, payment.pk
+            )
+    return payment.status
+
+
+def fail(payment_id, error):
+    """Give up on a payment the gateway kept refusing to answer for."""
+    payment = Payment.objects.get(pk=payment_id)
+    if payment.status in ACTIVE_STATUSES:
+        _set_status(payment, 'failed', error_message=error)
+
+
+def requeue_stale():
+    """
+    Queue again pending payments that never reached a worker, and processing
+    ones whose worker died before settling them. Returns how many.
+
+    Requeueing a payment that is still being worked on is harmless: ``process``
+    charges by reference and settles only once.
+    """
+    cutoff = timezone.now() - REQUEUE_AFTER
+    stale = list(Payment.objects.filter(
+        Q(status='pending', created_at__lt=cutoff) | Q(status='processing', initiated_at__lt=cutoff)
+    ).order_by('pk').values_list('pk', flat=True))
+    for payment_id in stale:
+        enqueue(payment_id)
+    return len(stale)
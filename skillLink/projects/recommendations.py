@@ -0,0 +1,375 @@
+"""
+Skill-based project recommendations for freelancers.
+
+Open projects and freelancer profiles are term-count vectors compared by
+TF-IDF cosine similarity. The index lives in the database, one
+``ProjectTerm`` or ``ProfileTerm`` row per term of a project or profile, so
+every web and worker process sees the same index and a change rewrites only
+the rows of the project or profile it concerns. Document frequencies are
+counted from the ``ProjectTerm`` rows of the terms being scored, so the IDF
+weights never go stale. The number of projects in the index is kept in the
+cache and adjusted as projects enter and leave it, so scoring never counts
+the whole table.
+
+Each freelancer's best ``FEED_SIZE`` matches are stored as
+``ProjectRecommendation`` rows, so reading a feed is one indexed query:
+
+* a newly posted project is scored against the profiles sharing a term with
+  it and merged into the feeds it beats;
+* a changed profile (skills, category, a newly won project) is rescored
+  against the open projects sharing a term with it and its feed replaced;
+* a project leaving the open state is dropped from the index and the feeds.
+
+Scoring loads only those candidates' vectors, as CSR-style NumPy arrays, so
+it is a couple of vectorized passes. The updates run on a Celery worker
+(``enqueue``), never in the request that caused them; each one holds the row
+lock of its project or user while it rewrites their terms.
+
+``rebuild()`` (the ``rebuild_recommendations`` command) rewrites the index
+and recomputes every feed from the database.
+"""
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Project, Bid, ProjectRecommendation, ProjectTerm, ProfileTerm
+
+logger = logging.getLogger(__name__)
+
+FEED_SIZE = 20
+# Matches below this similarity are noise rather than recommendations
+MIN_SCORE = 0.05
+
+TERM_MAX_LENGTH = ProjectTerm._meta.get_field('term').max_length
+# Terms per query when counting document frequencies
+TERM_BATCH_SIZE = 500
+
+# Projects in the index, for the IDF weights. The timeout bounds any drift
+# from projects deleted without leaving the index first; the count is then
+# simply taken again.
+PROJECT_COUNT_KEY = 'recommendations:project_count'
+PROJECT_COUNT_TIMEOUT = 60 * 60
+
+# Column holding the project or freelancer id of each index table
+OWNER_FIELDS = {ProjectTerm: 'project_id', ProfileTerm: 'freelancer_id'}
+
+# Declared skills say more about a freelancer than their category blurb or
+# the titles of projects they have won.
+SKILL_WEIGHT = 3
+CATEGORY_WEIGHT = 1
+HISTORY_WEIGHT = 1
+
+TOKEN_RE = re.compile(r'[^\W_]+', re.UNICODE)
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from has have in is it of on or our the this '
+    'to we will with you your etc'.split()
+)
+
+
+def tokenize(text):
+    return [
+        token for token in (t.lower() for t in TOKEN_RE.findall(text or ''))
+        if 1 < len(token) <= TERM_MAX_LENGTH and token not in STOP_WORDS
+    ]
+
+
+def project_terms(title, description):
+    return Counter(tokenize(f'{title} {description}'))
+
+
+def profile_terms(skills, category, won_titles=()):
+    """Term counts describing a freelancer."""
+    if isinstance(skills, str):
+        skills = skills.split(',')
+    terms = Counter()
+    for skill in skills or ():
+        for token in tokenize(str(skill)):
+            terms[token] += SKILL_WEIGHT
+    if category:
+        label = dict(get_user_model().CATEGORY_CHOICES).get(category, category)
+        for token in tokenize(label):
+            terms[token] += CATEGORY_WEIGHT
+    for title in won_titles:
+        for token in tokenize(title):
+            terms[token] += HISTORY_WEIGHT
+    return terms
+
+
+def _idf(df, n):
+    """IDF weight of every term, from the document frequencies ``df`` over ``n`` open projects."""
+    weights = defaultdict(lambda: math.log(1 + n) + 1)
+    weights.update((term, math.log((1 + n) / (1 + count)) + 1) for term, count in df.items())
+    return weights
+
+
+def _load_idf(terms):
+    """IDF weights of ``terms`` over the open projects in the index."""
+    terms = list(terms)
+    df = {}
+    for start in range(0, len(terms), TERM_BATCH_SIZE):
+        df.update(
+            ProjectTerm.objects.filter(term__in=terms[start:start + TERM_BATCH_SIZE])
+            .order_by().values('term').annotate(df=Count('pk')).values_list('term', 'df')
+        )
+    return _idf(df, _project_count())
+
+
+def _project_count():
+    count = cache.get(PROJECT_COUNT_KEY)
+    if count is None:
+        count = ProjectTerm.objects.order_by().values('project_id').distinct().count()
+        cache.add(PROJECT_COUNT_KEY, count, PROJECT_COUNT_TIMEOUT)
+    return count
+
+
+def _projects_indexed(delta):
+    """Adjust the cached project count by ``delta`` once the transaction commits."""
+    if delta:
+        transaction.on_commit(lambda: _adjust_project_count(delta))
+
+
+def _adjust_project_count(delta):
+    try:
+        cache.incr(PROJECT_COUNT_KEY, delta)
+    except ValueError:
+        # Not cached; the next read counts afresh
+        pass
+
+
+class Vectors:
+    """Term-count vectors of projects or profiles as CSR-style arrays over their own vocabulary."""
+
+    def __init__(self, rows):
+        """``rows`` are ``(owner_id, term, count)`` tuples, grouped by owner."""
+        self.ids = []
+        self.vocabulary = {}
+        indptr, indices, data = [0], [], []
+        for owner_id, term, count in rows:
+            if not self.ids or self.ids[-1] != owner_id:
+                self.ids.append(owner_id)
+                indptr.append(indptr[-1])
+            indptr[-1] += 1
+            indices.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+            data.append(count)
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int64)
+        self.data = np.array(data, dtype=float)
+        self.rows = np.repeat(np.arange(len(self.ids)), np.diff(self.indptr))
+
+    @classmethod
+    def load(cls, model, sharing):
+        """Vectors of the ``model`` owners (projects or profiles) sharing a term with ``sharing``."""
+        owner = OWNER_FIELDS[model]
+        candidates = model.objects.filter(term__in=list(sharing)).values(owner)
+        return cls(
+            model.objects.filter(**{f'{owner}__in': candidates})
+            .order_by(owner).values_list(owner, 'term', 'count')
+        )
+
+    def weigh(self, idf):
+        """Use the ``idf`` weights (``term -> weight``) for scoring."""
+        self.idf = idf
+        self.weights = self.data * np.array([idf[term] for term in self.vocabulary], dtype=float)[self.indices]
+        self.norms = np.sqrt(np.bincount(self.rows, weights=self.weights ** 2, minlength=len(self.ids)))
+        return self
+
+    def score(self, terms):
+        """Cosine similarity of the TF-IDF vector of ``terms`` against every vector."""
+        query = np.zeros(len(self.vocabulary))
+        query_norm = 0.0
+        for term, count in terms.items():
+            weight = count * self.idf[term]
+            query_norm += weight ** 2
+            column = self.vocabulary.get(term)
+            if column is not None:
+                query[column] = weight
+        if not self.ids or not query_norm:
+            return np.zeros(len(self.ids))
+
+        dots = np.bincount(self.rows, weights=self.weights * query[self.indices], minlength=len(self.ids))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores = dots / (self.norms * math.sqrt(query_norm))
+        return np.nan_to_num(scores)
+
+
+def _write_terms(model, owner_id, terms):
+    """
+    Replace the index rows of one project or profile with ``terms``. Returns
+    whether it had any before.
+    """
+    owner = OWNER_FIELDS[model]
+    replaced, _ = model.objects.filter(**{owner: owner_id}).delete()
+    model.objects.bulk_create([
+        model(**{owner: owner_id}, term=term, count=count) for term, count in terms.items()
+    ])
+    return bool(replaced)
+
+
+def _load_profiles(user_ids=None):
+    freelancers = get_user_model().objects.filter(role='freelancer')
+    won = Bid.objects.filter(status='accepted')
+    if user_ids is not None:
+        freelancers = freelancers.filter(pk__in=user_ids)
+        won = won.filter(freelancer_id__in=user_ids)
+
+    won_titles = {}
+    for freelancer_id, title in won.order_by().values_list('freelancer_id', 'project__title'):
+        won_titles.setdefault(freelancer_id, []).append(title)
+
+    return {
+        pk: profile_terms(skills, category, won_titles.get(pk, ()))
+        for pk, skills, category in freelancers.values_list('pk', 'skills', 'category')
+    }
+
+
+def _top_k(keys, scores, k=FEED_SIZE):
+    keep = np.flatnonzero(scores >= MIN_SCORE)
+    if len(keep) > k:
+        keep = keep[np.argpartition(scores[keep], -k)[-k:]]
+    return [(keys[i], float(scores[i])) for i in keep]
+
+
+def project_posted(project_id):
+    """Add an open project to the index and merge it into the feeds it ranks in."""
+    with transaction.atomic():
+        project = Project.objects.select_for_update().filter(pk=project_id, status='open').values(
+            'title', 'description'
+        ).first()
+        if project is None:
+            return
+        terms = project_terms(project['title'], project['description'])
+        was_indexed = _write_terms(ProjectTerm, project_id, terms)
+        _projects_indexed(bool(terms) - was_indexed)
+
+    profiles = Vectors.load(ProfileTerm, terms)
+    scores = profiles.weigh(_load_idf(set(terms) | set(profiles.vocabulary))).score(terms)
+    matches = [
+        (profiles.ids[i], float(scores[i])) for i in np.flatnonzero(scores >= MIN_SCORE)
+    ]
+    with transaction.atomic():
+        ProjectRecommendation.objects.filter(project_id=project_id).delete()
+        if not matches:
+            return
+        ProjectRecommendation.objects.bulk_create([
+            ProjectRecommendation(freelancer_id=user_id, project_id=project_id, score=score)
+            for user_id, score in matches
+        ])
+        _trim_feeds([user_id for user_id, _ in matches])
+
+
+def _trim_feeds(user_ids):
+    """Drop entries beyond ``FEED_SIZE`` from the given freelancers' feeds."""
+    seen = Counter()
+    overflow = []
+    rows = ProjectRecommendation.objects.filter(freelancer_id__in=user_ids).order_by(
+        'freelancer_id', '-score', '-project_id'
+    ).values_list('pk', 'freelancer_id')
+    for pk, freelancer_id in rows:
+        seen[freelancer_id] += 1
+        if seen[freelancer_id] > FEED_SIZE:
+            overflow.append(pk)
+    if overflow:
+        ProjectRecommendation.objects.filter(pk__in=overflow).delete()
+
+
+def project_closed(project_id):
+    """Forget a project that is no longer open for bidding."""
+    with transaction.atomic():
+        removed, _ = ProjectTerm.objects.filter(project_id=project_id).delete()
+        _projects_indexed(-bool(removed))
+        ProjectRecommendation.objects.filter(project_id=project_id).delete()
+
+
+def _replace_feed(user_id, feed):
+    ProjectRecommendation.objects.filter(freelancer_id=user_id).delete()
+    ProjectRecommendation.objects.bulk_create([
+        ProjectRecommendation(freelancer_id=user_id, project_id=project_id, score=score)
+        for project_id, score in feed
+    ])
+
+
+def refresh_freelancer(user_id):
+    """
+    Rebuild one freelancer's profile vector and recompute their feed. A user
+    who is no longer a freelancer leaves the index and loses their feed.
+    """
+    with transaction.atomic():
+        list(get_user_model().objects.select_for_update().filter(pk=user_id).values_list('pk'))
+        terms = _load_profiles([user_id]).get(user_id) or Counter()
+        _write_terms(ProfileTerm, user_id, terms)
+
+    projects = Vectors.load(ProjectTerm, terms)
+    scores = projects.weigh(_load_idf(set(terms) | set(projects.vocabulary))).score(terms)
+    feed = _top_k(projects.ids, scores)
+    with transaction.atomic():
+        _replace_feed(user_id, feed)
+    return feed
+
+
+def rebuild():
+    """Rewrite the index from the database and recompute every feed."""
+    projects = {
+        pk: project_terms(title, description)
+        for pk, title, description in Project.objects.filter(status='open').order_by('pk').values_list(
+            'pk', 'title', 'description'
+        )
+    }
+    profiles = {user_id: terms for user_id, terms in _load_profiles().items() if terms}
+    vectors = Vectors(
+        (project_id, term, count) for project_id, terms in projects.items() for term, count in terms.items()
+    )
+    vectors.weigh(_idf(Counter(term for terms in projects.values() for term in terms), len(projects)))
+
+    with transaction.atomic():
+        ProjectTerm.objects.all().delete()
+        ProjectTerm.objects.bulk_create([
+            ProjectTerm(project_id=project_id, term=term, count=count)
+            for project_id, terms in projects.items() for term, count in terms.items()
+        ], batch_size=5000)
+        ProfileTerm.objects.all().delete()
+        ProfileTerm.objects.bulk_create([
+            ProfileTerm(freelancer_id=user_id, term=term, count=count)
+            for user_id, terms in profiles.items() for term, count in terms.items()
+        ], batch_size=5000)
+        ProjectRecommendation.objects.all().delete()
+        ProjectRecommendation.objects.bulk_create([
+            ProjectRecommendation(freelancer_id=user_id, project_id=project_id, score=score)
+            for user_id, terms in profiles.items()
+            for project_id, score in _top_k(vectors.ids, vectors.score(terms))
+        ], batch_size=5000)
+        indexed = sum(1 for terms in projects.values() if terms)
+        transaction.on_commit(lambda: cache.set(PROJECT_COUNT_KEY, indexed, PROJECT_COUNT_TIMEOUT))
+    return len(profiles)
+
+
+def get_feed(user):
+    """Open projects recommended to ``user``, best match first."""
+    return Project.objects.filter(
+        recommendations__freelancer=user, status='open'
+    ).order_by('-recommendations__score', '-id')
+
+
+# Index updates the signal handlers hand to ``update_recommendations_task``
+ACTIONS = {
+    'project_posted': project_posted,
+    'project_closed': project_closed,
+    'refresh_freelancer': refresh_freelancer,
+}
+
+
+def enqueue(action, object_id):
+    """Run ``ACTIONS[action](object_id)`` on a Celery worker."""
+    from .tasks import update_recommendations_task
+
+    try:
+        update_recommendations_task.delay(action, object_id)
+    except Exception as e:
+        # The feeds catch up at the next rebuild()
+        logger.error(f"Failed to queue recommendation update {action} {object_id}: {e}")
@@ -0,0 +1,126 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+
+FTS_TABLE = 'projects_project_fts'
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+# Search terms are reduced to plain word tokens before they reach the FTS5
+# MATCH syntax, so user input can never produce a query syntax error.
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class BaseSearchBackend:
+    """Interface for keeping a full-text index of projects and querying it."""
+
+    def index(self, project):
+        raise NotImplementedError
+
+    def remove(self, project_id):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, queryset, query):
+        """Restrict ``queryset`` to projects matching ``query``, best match first."""
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Fallback backend using plain ``icontains`` lookups. Keeps no index."""
+
+    def index(self, project):
+        pass
+
+    def remove(self, project_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) | Q(description__icontains=query)
+        )
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 index over project titles and descriptions.
+
+    Results are ranked by BM25 (title matches weigh more than description
+    matches) with an exponential recency decay. The score is computed in log
+    space as ``ln(bm25) + created_at / decay``, which orders results exactly
+    like ``bm25 * exp(-age / decay)`` but does not depend on the current time,
+    so a project's rank is stable across requests and safe to paginate on.
+    """
+
+    title_weight = 10.0
+    description_weight = 1.0
+    recency_decay_days = 30.0
+
+    def index(self, project):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [project.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)',
+                [project.pk, project.title, project.description]
+            )
+
+    def remove(self, project_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [project_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description) '
+                f'SELECT id, title, description FROM projects_project'
+            )
+
+    def build_match_expression(self, query):
+        tokens = TOKEN_RE.findall(query)
+        # Every token must match; the last one is treated as a prefix so
+        # search-as-you-type finds partially typed words.
+        terms = [f'"{token}"' for token in tokens]
+        if terms:
+            terms[-1] += '*'
+        return ' '.join(terms)
+
+    def search(self, queryset, query):
+        match = self.build_match_expression(query)
+        if not match:
+            return queryset
+
+        project_table = queryset.model._meta.db_table
+        matching_ids = RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]
+        )
+        # The rowid constraint lets FTS5 seek straight to the project's entry
+        # in each term's doclist, so ranking costs one lookup per hit.
+        rank = RawSQL(
+            f'SELECT LN(-bm25({FTS_TABLE}, %s, %s)) '
+            f'+ (julianday({project_table}.created_at) - {UNIX_EPOCH_JULIAN_DAY}) / %s '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = {project_table}.id',
+            [self.title_weight, self.description_weight, self.recency_decay_days, match],
+            output_field=FloatField(),
+        )
+        return queryset.filter(id__in=matching_ids).annotate(
+            search_rank=rank
+        ).order_by('-search_rank', '-id')
+
+
+def get_search_backend():
+    backend_path = getattr(settings, 'PROJECT_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSSearchBackend()
+    return DatabaseSearchBackend()
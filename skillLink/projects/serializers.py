@@ -1,5 +1,8 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import Project, Bid
+from .bidding import BULK_ACTIONS, MAX_BULK_BIDS
+from . import bid_membership
 from users.models import User
 
 
@@ -23,6 +26,21 @@ class BidSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['freelancer', 'status', 'created_at', 'updated_at']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('freelancer')
+
+
+class BulkBidActionSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_BULK_BIDS
+    )
+    action = serializers.ChoiceField(choices=sorted(BULK_ACTIONS))
+
+    def validate_ids(self, value):
+        # Keep the caller's order, drop repeats
+        return list(dict.fromkeys(value))
+
 
 class ProjectSerializer(serializers.ModelSerializer):
     client_name = serializers.ReadOnlyField(source='client.get_full_name')
@@ -30,7 +48,6 @@ class ProjectSerializer(serializers.ModelSerializer):
     freelancer_name = serializers.ReadOnlyField(source='freelancer.get_full_name')
     freelancer_details = FreelancerBasicSerializer(source='freelancer', read_only=True)
     bids = serializers.SerializerMethodField()
-    bid_count = serializers.SerializerMethodField()
     user_has_bid = serializers.SerializerMethodField()
 
     class Meta:
@@ -39,20 +56,35 @@ class ProjectSerializer(serializers.ModelSerializer):
             'id', 'title', 'description', 'budget', 'status', 
             'client', 'client_name', 'client_details',
             'freelancer', 'freelancer_name', 'freelancer_details',
-            'bids', 'bid_count', 'user_has_bid', 'created_at', 'updated_at'
+            'bids', 'bid_count', 'pending_bid_count', 'user_has_bid', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['client', 'freelancer', 'created_at', 'updated_at']
+        read_only_fields = [
+            'client', 'freelancer', 'bid_count', 'pending_bid_count', 'created_at', 'updated_at'
+        ]
+
+    @staticmethod
+    def setup_eager_loading(queryset, include_bids=False):
+        """
+        Load everything the serializer reads in a fixed number of queries:
+        client/freelancer are joined in and bids (when included) are
+        prefetched with their freelancer. ``user_has_bid`` is answered from
+        the requesting user's cached bid membership.
+        """
+        queryset = queryset.select_related('client', 'freelancer')
+
+        if include_bids:
+            queryset = queryset.prefetch_related(
+                Prefetch('bids', queryset=BidSerializer.setup_eager_loading(Bid.objects.all()))
+            )
+        return queryset
 
     def get_bids(self, obj):
         if self.context.get('include_bids'):
             return BidSerializer(obj.bids.all(), many=True).data
         return None
 
-    def get_bid_count(self, obj):
-        return obj.bids.count()
-
     def get_user_has_bid(self, obj):
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.bids.filter(freelancer=request.user).exists()
-        return False
\ No newline at end of file
+        if request is None:
+            return False
+        return obj.pk in bid_membership.get_project_ids(request)
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Payout settlement.
+
+Once a day ``settle`` groups the payments completed up to the end of the
+settlement period into one ``PayoutBatch`` per payee and currency, with a
+``PayoutLine`` for every payment it covers. A batch is what gets transferred
+to the freelancer; paying it out is left to the payout provider.
+
+Payments are read oldest first from the partial ``payment_completed_idx``
+index in keyset-ordered chunks of ``PAYOUT_SETTLEMENT_CHUNK`` rows. Each chunk
+is one transaction: its lines and any missing batches are written with
+``bulk_create``, the lines are added to their batches' totals by a single
+``UPDATE`` with a grouped subquery over just those lines, and the
+``payout_settlement`` checkpoint is saved with them. Batch totals therefore
+always match the lines committed so far.
+
+A run that dies part-way resumes after its last committed chunk, running the
+same period again settles nothing new, and the one-to-one ``PayoutLine``
+payment column refuses to settle a payment twice whatever happens to the
+checkpoint.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Payment, PayoutBatch, PayoutLine, SweepCheckpoint
+
+CHECKPOINT = 'payout_settlement'
+
+DEFAULT_CHUNK = 10000
+
+
+def default_period(now=None):
+    """The settlement period a run at ``now`` covers: the day before."""
+    return timezone.localdate(now or timezone.now()) - timedelta(days=1)
+
+
+def get_cutoff(period):
+    """Payments completed before this time are settled for ``period``."""
+    return timezone.make_aware(datetime.combine(period + timedelta(days=1), time.min))
+
+
+def _settleable(cutoff, payments=None):
+    payments = Payment.objects.all() if payments is None else payments
+    return payments.filter(status='completed', completed_at__lt=cutoff, payee__isnull=False)
+
+
+def settle_chunk(period, cutoff, chunk_size, checkpoint_name=CHECKPOINT, payments=None):
+    """
+    Settle the next ``chunk_size`` payments after the checkpoint into the
+    batches of ``period``, creating the batches that don't exist yet. Returns
+    ``(payments, batches_created)``; ``payments`` is 0 once nothing is left.
+    ``payments`` narrows the run to a ``Payment`` queryset; a narrowed run
+    should keep its own ``checkpoint_name``.
+    """
+    with transaction.atomic():
+        checkpoint, _ = SweepCheckpoint.objects.select_for_update().get_or_create(name=checkpoint_name)
+        rows = list(
+            _settleable(cutoff, payments).filter(checkpoint.after('completed_at'))
+            .order_by('completed_at', 'pk')
+            .values_list('pk', 'completed_at', 'payee_id', 'currency', 'net_amount')[:chunk_size]
+        )
+        if not rows:
+            return 0, 0
+
+        keys = {(payee_id, currency) for _, _, payee_id, currency, _ in rows}
+        batch_ids = {
+            (payee_id, currency): pk
+            for pk, payee_id, currency in PayoutBatch.objects.filter(
+                period=period, payee_id__in={payee_id for payee_id, _ in keys}
+            ).values_list('pk', 'payee_id', 'currency')
+        }
+        created = PayoutBatch.objects.bulk_create([
+            PayoutBatch(payee_id=payee_id, currency=currency, period=period)
+            for payee_id, currency in keys if (payee_id, currency) not in batch_ids
+        ])
+        batch_ids.update({(batch.payee_id, batch.currency): batch.pk for batch in created})
+
+        lines = PayoutLine.objects.bulk_create([
+            PayoutLine(batch_id=batch_ids[payee_id, currency], payment_id=payment_id, amount=net_amount)
+            for payment_id, _, payee_id, currency, net_amount in rows
+        ])
+        _add_to_totals([batch_ids[key] for key in keys], lines[0].pk, lines[-1].pk)
+
+        checkpoint.position_at, checkpoint.position_id = rows[-1][1], rows[-1][0]
+        checkpoint.save()
+    return len(rows), len(created)
+
+
+def _add_to_totals(batch_ids, first_line_id, last_line_id):
+    """
+    Add the lines ``first_line_id`` to ``last_line_id`` to the totals of
+    ``batch_ids``. Only ``settle_chunk`` writes lines, one chunk at a time
+    under the checkpoint lock, so that id range is exactly the chunk's lines;
+    a batch given without lines among them is left as it is.
+    """
+    lines = PayoutLine.objects.filter(
+        batch=OuterRef('pk'), pk__range=(first_line_id, last_line_id)
+    ).order_by().values('batch')
+    PayoutBatch.objects.filter(pk__in=batch_ids).update(
+        total_amount=F('total_amount') + Coalesce(
+            Subquery(lines.annotate(total=Sum('amount')).values('total')), Decimal('0.00')
+        ),
+        payment_count=F('payment_count') + Coalesce(
+            Subquery(lines.annotate(count=Count('pk')).values('count')), 0
+        ),
+    )
+
+
+def settle(period=None, chunk_size=None, max_chunks=None, checkpoint_name=CHECKPOINT, payments=None):
+    """
+    Settle payments completed before the end of ``period`` (yesterday by
+    default) chunk by chunk until none is left or ``max_chunks`` chunks have
+    run. Returns ``{'period', 'payments', 'batches', 'chunks', 'done'}``.
+    ``checkpoint_name`` and ``payments`` are passed on to ``settle_chunk``.
+    """
+    period = period or default_period()
+    cutoff = get_cutoff(period)
+    chunk_size = chunk_size or getattr(settings, 'PAYOUT_SETTLEMENT_CHUNK', DEFAULT_CHUNK)
+    result = {'period': period, 'payments': 0, 'batches': 0, 'chunks': 0, 'done': False}
+    while max_chunks is None or result['chunks'] < max_chunks:
+        settled, batches = settle_chunk(period, cutoff, chunk_size, checkpoint_name, payments)
+        if not settled:
+            result['done'] = True
+            break
+        result['payments'] += settled
+        result['batches'] += batches
+        result['chunks'] += 1
+    return result
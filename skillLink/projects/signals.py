@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Project, Bid
+from .search import get_search_backend
+from . import bid_membership, bid_stats, counters, recommendations, stats
+
+SEARCH_FIELDS = {'title', 'description'}
+PROFILE_FIELDS = {'role', 'skills', 'category'}
+BID_STATS_FIELDS = {'amount', 'delivery_days', 'status'}
+
+
+@receiver(post_save, sender=Project)
+def index_project(sender, instance, created, update_fields=None, **kwargs):
+    # Status-only saves don't touch the searchable text, skip the reindex
+    if update_fields and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Project)
+def unindex_project(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Project)
+def update_status_stats(sender, instance, created, **kwargs):
+    new = instance.stats_state()
+    if created:
+        old = None
+    elif hasattr(instance, '_stats_state'):
+        old = instance._stats_state
+    else:
+        # Saved without having been loaded (or loaded with deferred fields):
+        # the previous state is unknown, so let the next read recount.
+        transaction.on_commit(stats.invalidate)
+        return
+    instance._stats_state = new
+    transaction.on_commit(lambda: stats.record_transition(old, new))
+
+
+@receiver(post_delete, sender=Project)
+def remove_from_status_stats(sender, instance, **kwargs):
+    old = instance.stats_state()
+    transaction.on_commit(lambda: stats.record_transition(old, None))
+
+
+@receiver(post_save, sender=Project)
+def update_recommendations(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields and not ({'status'} | SEARCH_FIELDS).intersection(update_fields):
+        return
+    project_id = instance.pk
+    if instance.status == 'open':
+        transaction.on_commit(lambda: recommendations.enqueue('project_posted', project_id))
+    elif not created:
+        transaction.on_commit(lambda: recommendations.enqueue('project_closed', project_id))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_recommendation_profile(sender, instance, created, update_fields=None, **kwargs):
+    # Existing users are refreshed whatever their role, so one who stops
+    # being a freelancer is dropped from the index
+    if created and instance.role != 'freelancer':
+        return
+    if update_fields and not PROFILE_FIELDS.intersection(update_fields):
+        return
+    user_id = instance.pk
+    transaction.on_commit(lambda: recommendations.enqueue('refresh_freelancer', user_id))
+
+
+@receiver(post_save, sender=Bid)
+def refresh_recommendations_for_winner(sender, instance, created, update_fields=None, **kwargs):
+    # Won projects feed into the freelancer's profile
+    if instance.status != 'accepted' or (update_fields and 'status' not in update_fields):
+        return
+    freelancer_id = instance.freelancer_id
+    transaction.on_commit(lambda: recommendations.enqueue('refresh_freelancer', freelancer_id))
+
+
+@receiver(post_save, sender=Bid)
+def count_new_bid(sender, instance, created, **kwargs):
+    if created:
+        counters.bid_added(instance)
+
+
+@receiver(post_delete, sender=Bid)
+def uncount_deleted_bid(sender, instance, **kwargs):
+    counters.bid_removed(instance)
+
+
+@receiver(post_save, sender=Bid)
+@receiver(post_delete, sender=Bid)
+def invalidate_bid_stats(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not BID_STATS_FIELDS.intersection(update_fields):
+        return
+    project_id = instance.project_id
+    transaction.on_commit(lambda: bid_stats.invalidate(project_id))
+
+
+@receiver(post_save, sender=Bid)
+@receiver(post_delete, sender=Bid)
+def invalidate_bid_membership(sender, instance, **kwargs):
+    # Saving an existing bid (withdraw, reject, accept) keeps the row, and
+    # with it the membership
+    if kwargs.get('created') is False:
+        return
+    freelancer_id = instance.freelancer_id
+    transaction.on_commit(lambda: bid_membership.invalidate(freelancer_id))
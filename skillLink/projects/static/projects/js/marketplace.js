@@ -6,6 +6,15 @@
 // ============ CONFIGURATION ============
 const API_BASE_URL = '/projects/api';
 const PROJECTS_PER_PAGE = 12;
+const SEARCH_DEBOUNCE_MS = 250;
+
+// ============ STATE ============
+// Cursor URL for the next page of results; null once the feed is exhausted
+let nextProjectsUrl = null;
+let isLoadingMore = false;
+// Aborts the requests of the current search, including any "load more" page,
+// once a newer search supersedes it
+let projectsController = null;
 
 // ============ UTILITY FUNCTIONS ============
 
@@ -55,6 +64,17 @@ function formatDate(dateString) {
     return new Date(dateString).toLocaleDateString('en-IN', options);
 }
 
+/**
+ * Delay calls to fn until the user stops triggering it for `wait` ms
+ */
+function debounce(fn, wait) {
+    let timeoutId = null;
+    return function(...args) {
+        clearTimeout(timeoutId);
+        timeoutId = setTimeout(() => fn.apply(this, args), wait);
+    };
+}
+
 /**
  * Show toast notification
  */
@@ -89,31 +109,51 @@ function showToast(message, type = 'info') {
 // ============ API FUNCTIONS ============
 
 /**
- * Fetch available projects with optional filters
+ * Fetch available projects with optional filters.
+ * Pass `cursorUrl` (the `next` link of a previous response) to fetch the following page,
+ * and `signal` to be able to abort the request.
  */
-async function fetchAvailableProjects(filters = {}) {
+async function fetchAvailableProjects(filters = {}, cursorUrl = null, signal = undefined) {
     try {
-        const queryParams = new URLSearchParams();
-        
-        if (filters.search) queryParams.append('search', filters.search);
-        if (filters.status) queryParams.append('status', filters.status);
-        if (filters.minBudget) queryParams.append('min_budget', filters.minBudget);
-        if (filters.maxBudget) queryParams.append('max_budget', filters.maxBudget);
-        if (filters.ordering) queryParams.append('ordering', filters.ordering);
-        if (filters.page) queryParams.append('page', filters.page);
-
-        const url = `${API_BASE_URL}/available/?${queryParams.toString()}`;
-        const response = await fetch(url);
+        let url = cursorUrl;
+        if (!url) {
+            const queryParams = new URLSearchParams();
+
+            if (filters.search) queryParams.append('search', filters.search);
+            if (filters.status) queryParams.append('status', filters.status);
+            if (filters.minBudget) queryParams.append('min_budget', filters.minBudget);
+            if (filters.maxBudget) queryParams.append('max_budget', filters.maxBudget);
+            if (filters.ordering) queryParams.append('ordering', filters.ordering);
+            queryParams.append('page_size', PROJECTS_PER_PAGE);
+
+            url = `${API_BASE_URL}/available/?${queryParams.toString()}`;
+        }
+        const response = await fetch(url, { signal });
         
         if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
         
         return await response.json();
     } catch (error) {
-        console.error('Error fetching projects:', error);
+        if (error.name !== 'AbortError') console.error('Error fetching projects:', error);
         throw error;
     }
 }
 
+/**
+ * Fetch status and budget histograms for the current filters
+ */
+async function fetchProjectFacets(filters = {}, signal = undefined) {
+    const queryParams = new URLSearchParams();
+    if (filters.search) queryParams.append('search', filters.search);
+    if (filters.status) queryParams.append('status', filters.status);
+    if (filters.minBudget) queryParams.append('min_budget', filters.minBudget);
+    if (filters.maxBudget) queryParams.append('max_budget', filters.maxBudget);
+
+    const response = await fetch(`${API_BASE_URL}/available/facets/?${queryParams.toString()}`, { signal });
+    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+    return await response.json();
+}
+
 /**
  * Fetch single project details
  */
@@ -254,11 +294,13 @@ async function rejectBid(bidId) {
 // ============ UI RENDERING FUNCTIONS ============
 
 /**
- * Render project cards
+ * Render project cards. With `append` the cards are added after the existing ones.
  */
-function renderProjectCards(projects, container) {
+function renderProjectCards(projects, container, append = false) {
     if (!projects || projects.length === 0) {
-        container.innerHTML = '<div class="col-12"><p class="text-center text-muted">No projects found</p></div>';
+        if (!append) {
+            container.innerHTML = '<div class="col-12"><p class="text-center text-muted">No projects found</p></div>';
+        }
         return;
     }
 
@@ -302,14 +344,20 @@ function renderProjectCards(projects, container) {
         </div>
     `).join('');
 
-    container.innerHTML = cardsHtml;
+    if (append) {
+        container.insertAdjacentHTML('beforeend', cardsHtml);
+    } else {
+        container.innerHTML = cardsHtml;
+    }
 
-    // Add event listeners
-    container.querySelectorAll('.view-project-btn').forEach(btn => {
+    // Add event listeners (only to cards that don't have them yet)
+    container.querySelectorAll('.view-project-btn:not([data-bound])').forEach(btn => {
+        btn.dataset.bound = 'true';
         btn.addEventListener('click', handleViewProject);
     });
 
-    container.querySelectorAll('.submit-bid-btn').forEach(btn => {
+    container.querySelectorAll('.submit-bid-btn:not([data-bound])').forEach(btn => {
+        btn.dataset.bound = 'true';
         btn.addEventListener('click', handleSubmitBid);
     });
 }
@@ -518,7 +566,7 @@ async function handleBidFormSubmit(projectId, modal) {
  * Handle search form submission
  */
 function handleSearch(event) {
-    event.preventDefault();
+    if (event) event.preventDefault();
     const searchQuery = document.getElementById('projectSearch')?.value || '';
     const statusFilter = document.getElementById('statusFilter')?.value || '';
     const minBudget = document.getElementById('minBudget')?.value || '';
@@ -532,34 +580,149 @@ function handleSearch(event) {
     });
 }
 
+/**
+ * Render the facet counts under the filter form. Clicking a budget bucket
+ * fills in the budget range and reruns the search.
+ */
+function renderFacets(facets) {
+    const container = document.getElementById('projectFacets');
+    if (!container) return;
+
+    const statusItems = facets.status
+        .filter(item => item.count > 0)
+        .map(item => `
+            <li class="d-flex justify-content-between">
+                <span>${item.label}</span><span class="badge bg-light text-dark">${item.count}</span>
+            </li>`)
+        .join('');
+
+    const budgetItems = facets.budget
+        .map(item => {
+            const label = item.max === null
+                ? `${formatCurrency(item.min)}+`
+                : `${formatCurrency(item.min)} - ${formatCurrency(item.max)}`;
+            return `
+            <li>
+                <a href="#" class="budget-facet d-flex justify-content-between text-decoration-none ${item.count ? '' : 'text-muted'}"
+                   data-min="${item.min}" data-max="${item.max === null ? '' : item.max}">
+                    <span>${label}</span><span class="badge bg-light text-dark">${item.count}</span>
+                </a>
+            </li>`;
+        })
+        .join('');
+
+    container.innerHTML = `
+        <h6 class="small text-uppercase text-muted">Status</h6>
+        <ul class="list-unstyled small mb-3">${statusItems || '<li class="text-muted">No matches</li>'}</ul>
+        <h6 class="small text-uppercase text-muted">Budget</h6>
+        <ul class="list-unstyled small mb-0">${budgetItems}</ul>
+    `;
+
+    container.querySelectorAll('.budget-facet').forEach(link => {
+        link.addEventListener('click', event => {
+            event.preventDefault();
+            document.getElementById('minBudget').value = link.dataset.min || '';
+            // Buckets exclude their upper edge; the max_budget filter is inclusive
+            document.getElementById('maxBudget').value =
+                link.dataset.max ? (Number(link.dataset.max) - 0.01).toFixed(2) : '';
+            handleSearch();
+        });
+    });
+}
+
+/**
+ * Refresh the facet counts; failures only leave the previous counts in place
+ */
+async function loadFacets(filters = {}, signal = undefined) {
+    try {
+        renderFacets(await fetchProjectFacets(filters, signal));
+    } catch (error) {
+        if (error.name !== 'AbortError') console.error('Error loading facets:', error);
+    }
+}
+
 // ============ MAIN LOAD FUNCTION ============
 
 /**
- * Load and display projects
+ * Load and display projects. Starting a new load aborts the one in flight,
+ * so a slow earlier search can't overwrite the results of a newer one.
  */
 async function loadProjects(filters = {}) {
+    const projectsContainer = document.getElementById('projectsContainer');
+    if (!projectsContainer) return;
+
+    if (projectsController) projectsController.abort();
+    const controller = new AbortController();
+    projectsController = controller;
+
     try {
-        const projectsContainer = document.getElementById('projectsContainer');
-        if (!projectsContainer) return;
+        loadFacets(filters, controller.signal);
 
         // Show loading state
         projectsContainer.innerHTML = '<div class="col-12 text-center"><div class="spinner-border" role="status"></div></div>';
 
-        const data = await fetchAvailableProjects(filters);
+        nextProjectsUrl = null;
+        isLoadingMore = false;
+        const data = await fetchAvailableProjects(filters, null, controller.signal);
+        if (controller !== projectsController) return;
         renderProjectCards(data.results || data, projectsContainer);
+        nextProjectsUrl = data.next || null;
     } catch (error) {
+        if (controller !== projectsController || error.name === 'AbortError') return;
         console.error('Error loading projects:', error);
         document.getElementById('projectsContainer').innerHTML = 
             '<div class="col-12"><div class="alert alert-danger">Error loading projects. Please try again later.</div></div>';
     }
 }
 
+/**
+ * Append the next page of projects (infinite scroll). The page belongs to the
+ * current search; a new search aborts it rather than let it append to the new list.
+ */
+async function loadMoreProjects() {
+    if (!nextProjectsUrl || isLoadingMore) return;
+
+    const projectsContainer = document.getElementById('projectsContainer');
+    if (!projectsContainer) return;
+
+    const controller = projectsController;
+    isLoadingMore = true;
+    try {
+        const data = await fetchAvailableProjects({}, nextProjectsUrl, controller?.signal);
+        if (controller !== projectsController) return;
+        renderProjectCards(data.results || [], projectsContainer, true);
+        nextProjectsUrl = data.next || null;
+    } catch (error) {
+        if (controller !== projectsController || error.name === 'AbortError') return;
+        showToast('Error loading more projects', 'error');
+    } finally {
+        // A new search has already reset the flag for its own pages
+        if (controller === projectsController) isLoadingMore = false;
+    }
+}
+
+/**
+ * Load the next page whenever the sentinel below the grid scrolls into view
+ */
+function setupInfiniteScroll() {
+    const sentinel = document.getElementById('projectsSentinel');
+    if (!sentinel || !('IntersectionObserver' in window)) return;
+
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadMoreProjects();
+        }
+    }, { rootMargin: '400px 0px' });
+    observer.observe(sentinel);
+}
+
 /**
  * Initialize marketplace page
  */
 function initializeMarketplace() {
     // Load projects on page load
     loadProjects();
+    setupInfiniteScroll();
 
     // Setup search form
     const searchForm = document.getElementById('projectSearchForm');
@@ -567,6 +730,12 @@ function initializeMarketplace() {
         searchForm.addEventListener('submit', handleSearch);
     }
 
+    // Search as you type - the API answers from the full-text index
+    const searchInput = document.getElementById('projectSearch');
+    if (searchInput) {
+        searchInput.addEventListener('input', debounce(() => handleSearch(), SEARCH_DEBOUNCE_MS));
+    }
+
     // Setup clear filters button
     const clearBtn = document.getElementById('clearFiltersBtn');
     if (clearBtn) {
@@ -0,0 +1,208 @@
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+from .models import Project
+
+STATUSES = [status for status, _ in Project.STATUS_CHOICES]
+ROLES = ('client', 'freelancer')
+
+# Upper bounds of the budget facet buckets; the last bucket is open-ended.
+BUDGET_BUCKET_EDGES = (1000, 5000, 10000, 25000, 50000, 100000)
+BUDGET_BUCKETS = range(len(BUDGET_BUCKET_EDGES) + 1)
+
+# Counts are cached per status so signals can adjust them with atomic
+# incr/decr. The timeout bounds any drift from writes that bypass signals
+# (queryset.update, raw SQL): the histogram is simply rebuilt on expiry.
+STATS_TIMEOUT = 60 * 60
+
+
+def _global_key(status):
+    return f'project_stats:global:{status}'
+
+
+def _user_key(user_id, role, status):
+    return f'project_stats:user:{user_id}:{role}:{status}'
+
+
+def _facet_key(status, bucket):
+    return f'project_stats:facet:{status}:{bucket}'
+
+
+def budget_bucket(budget):
+    return bisect_right(BUDGET_BUCKET_EDGES, Decimal(budget))
+
+
+def budget_bucket_bounds(bucket):
+    """Return the ``(min, max)`` budget range of ``bucket``; ``max`` is exclusive or ``None``."""
+    low = BUDGET_BUCKET_EDGES[bucket - 1] if bucket > 0 else 0
+    high = BUDGET_BUCKET_EDGES[bucket] if bucket < len(BUDGET_BUCKET_EDGES) else None
+    return low, high
+
+
+def budget_bucket_expression(field='budget'):
+    """Database expression mapping a budget column to its bucket number."""
+    return Case(
+        *[When(**{f'{field}__lt': edge}, then=Value(bucket))
+          for bucket, edge in enumerate(BUDGET_BUCKET_EDGES)],
+        default=Value(len(BUDGET_BUCKET_EDGES)),
+        output_field=IntegerField(),
+    )
+
+
+def get_status_counts():
+    """Return ``{status: count}`` over all projects."""
+    keys = {_global_key(status): status for status in STATUSES}
+    cached = cache.get_many(keys)
+    if len(cached) == len(keys):
+        return {keys[key]: value for key, value in cached.items()}
+
+    counts = dict.fromkeys(STATUSES, 0)
+    for row in Project.objects.order_by().values('status').annotate(total=Count('id')):
+        counts[row['status']] = row['total']
+    cache.set_many({_global_key(status): n for status, n in counts.items()}, STATS_TIMEOUT)
+    return counts
+
+
+def get_user_status_counts(user):
+    """Return ``{'client': {status: count}, 'freelancer': {status: count}}`` for ``user``."""
+    keys = {
+        _user_key(user.pk, role, status): (role, status)
+        for role in ROLES for status in STATUSES
+    }
+    cached = cache.get_many(keys)
+    if len(cached) == len(keys):
+        counts = {role: {} for role in ROLES}
+        for key, value in cached.items():
+            role, status = keys[key]
+            counts[role][status] = value
+        return counts
+
+    counts = {role: dict.fromkeys(STATUSES, 0) for role in ROLES}
+    rows = Project.objects.filter(
+        Q(client=user) | Q(freelancer=user)
+    ).order_by().values('status').annotate(
+        as_client=Count('id', filter=Q(client=user)),
+        as_freelancer=Count('id', filter=Q(freelancer=user)),
+    )
+    for row in rows:
+        counts['client'][row['status']] = row['as_client']
+        counts['freelancer'][row['status']] = row['as_freelancer']
+    cache.set_many({
+        _user_key(user.pk, role, status): n
+        for role in ROLES for status, n in counts[role].items()
+    }, STATS_TIMEOUT)
+    return counts
+
+
+def get_facet_counts():
+    """Return ``{(status, budget_bucket): count}`` over all projects."""
+    keys = {
+        _facet_key(status, bucket): (status, bucket)
+        for status in STATUSES for bucket in BUDGET_BUCKETS
+    }
+    cached = cache.get_many(keys)
+    if len(cached) == len(keys):
+        return {keys[key]: value for key, value in cached.items()}
+
+    counts = dict.fromkeys(keys.values(), 0)
+    rows = Project.objects.order_by().annotate(
+        bucket=budget_bucket_expression()
+    ).values('status', 'bucket').annotate(total=Count('id'))
+    for row in rows:
+        counts[(row['status'], row['bucket'])] = row['total']
+    cache.set_many({_facet_key(*cell): n for cell, n in counts.items()}, STATS_TIMEOUT)
+    return counts
+
+
+def get_facets(status=None, min_budget=None, max_budget=None, queryset=None):
+    """
+    Status and budget histograms for the marketplace filter sidebar.
+
+    As usual for faceted search, each histogram applies the other facet's
+    filter but not its own. Without a ``queryset`` (no search text) the budget
+    histogram, and the status histogram unless a budget range is set, are read
+    from the cached (status, bucket) counters. A search passes the matching
+    queryset, which is aggregated directly.
+    """
+    budget_filter = Q()
+    if min_budget is not None:
+        budget_filter &= Q(budget__gte=min_budget)
+    if max_budget is not None:
+        budget_filter &= Q(budget__lte=max_budget)
+
+    status_counts = dict.fromkeys(STATUSES, 0)
+    bucket_counts = dict.fromkeys(BUDGET_BUCKETS, 0)
+
+    if queryset is None:
+        cells = get_facet_counts()
+        for (cell_status, bucket), n in cells.items():
+            if status is None or cell_status == status:
+                bucket_counts[bucket] += n
+        if budget_filter:
+            # Arbitrary ranges don't line up with the buckets; count exactly
+            queryset = Project.objects.all()
+        else:
+            for (cell_status, bucket), n in cells.items():
+                status_counts[cell_status] += n
+    else:
+        bucket_queryset = queryset.filter(status=status) if status else queryset
+        rows = bucket_queryset.order_by().annotate(
+            bucket=budget_bucket_expression()
+        ).values('bucket').annotate(total=Count('id'))
+        for row in rows:
+            bucket_counts[row['bucket']] = row['total']
+
+    if queryset is not None:
+        rows = queryset.filter(budget_filter).order_by().values('status').annotate(total=Count('id'))
+        for row in rows:
+            status_counts[row['status']] = row['total']
+
+    return status_counts, bucket_counts
+
+
+def invalidate(user_ids=()):
+    """
+    Drop the global histograms and those of ``user_ids``. Other users'
+    entries expire on their own.
+    """
+    cache.delete_many(
+        [_global_key(status) for status in STATUSES]
+        + [_facet_key(status, bucket) for status in STATUSES for bucket in BUDGET_BUCKETS]
+        + [_user_key(user_id, role, status) for user_id in user_ids for role in ROLES for status in STATUSES]
+    )
+
+
+def _adjust(key, delta):
+    try:
+        if delta > 0:
+            cache.incr(key, delta)
+        else:
+            cache.decr(key, -delta)
+    except ValueError:
+        # Not cached yet; the next read computes it from the database
+        pass
+
+
+def record_transition(old, new):
+    """
+    Apply a project state change to the cached histograms.
+
+    ``old`` and ``new`` are ``(status, client_id, freelancer_id, budget)``
+    tuples, or ``None`` for a project being created or deleted.
+    """
+    if old == new:
+        return
+
+    for snapshot, delta in ((old, -1), (new, 1)):
+        if snapshot is None:
+            continue
+        status, client_id, freelancer_id, budget = snapshot
+        _adjust(_global_key(status), delta)
+        _adjust(_facet_key(status, budget_bucket(budget)), delta)
+        if client_id:
+            _adjust(_user_key(client_id, 'client', status), delta)
+        if freelancer_id:
+            _adjust(_user_key(freelancer_id, 'freelancer', status), delta)
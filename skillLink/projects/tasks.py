@@ -0,0 +1,74 @@
+from celery import shared_task
+from django.conf import settings
+from django.core.mail import send_mass_mail
+
+from .models import Bid
+from .gateways import GatewayUnavailable
+from . import auto_approval, ledger, payments, recommendations, settlement
+
+
+@shared_task
+def send_bid_rejection_emails_task(bid_ids):
+    """Tell the freelancers behind ``bid_ids`` that their bids were declined, over one connection."""
+    bids = Bid.objects.filter(pk__in=bid_ids).select_related('freelancer', 'project')
+    messages = [
+        (
+            f'Update on your bid for "{bid.project.title}"',
+            f'Hi {bid.freelancer.username}, the client has hired another freelancer for '
+            f'"{bid.project.title}". Thanks for your proposal, and good luck with your next bid!',
+            settings.DEFAULT_FROM_EMAIL,
+            [bid.freelancer.email],
+        )
+        for bid in bids if bid.freelancer.email
+    ]
+    return send_mass_mail(messages, fail_silently=False)
+
+
+@shared_task
+def update_recommendations_task(action, object_id):
+    """Apply one project or profile change to the recommendation index and feeds."""
+    recommendations.ACTIONS[action](object_id)
+
+
+@shared_task(bind=True)
+def auto_approve_stale_work_task(self):
+    """
+    Approve work left unreviewed past the auto-approval window. Scheduled by
+    Celery beat; a run stops after ``WORK_AUTO_APPROVE_MAX_BATCHES`` batches
+    and queues the next one, so a large backlog doesn't hold one worker.
+    """
+    result = auto_approval.run(max_batches=getattr(settings, 'WORK_AUTO_APPROVE_MAX_BATCHES', None))
+    if not result['done']:
+        self.apply_async()
+    return result
+
+
+@shared_task
+def take_ledger_snapshots_task():
+    """Fold new ledger entries into per-account balance snapshots."""
+    return ledger.take_snapshots()
+
+
+@shared_task(bind=True, max_retries=5)
+def process_payment_task(self, payment_id):
+    """Charge and settle a queued payment, retrying with backoff while the gateway is unreachable."""
+    try:
+        return payments.process(payment_id)
+    except GatewayUnavailable as e:
+        if self.request.retries >= self.max_retries:
+            payments.fail(payment_id, f'The payment provider is unavailable: {e}')
+            return 'failed'
+        raise self.retry(exc=e, countdown=2 ** self.request.retries)
+
+
+@shared_task
+def requeue_stale_payments_task():
+    return payments.requeue_stale()
+
+
+@shared_task
+def settle_payouts_task():
+    """Group yesterday's completed payments into payout batches. Scheduled daily by Celery beat."""
+    result = settlement.settle()
+    result['period'] = result['period'].isoformat()
+    return result
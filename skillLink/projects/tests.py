@@ -1,3 +1,1684 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import time as time_module
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from chat.models import ChatRoom, Message
+from skillLink import idempotency, ratelimit
+from skillLink.celery import app as celery_app
+from users.models import User
+from .models import (
+    BalanceSnapshot, Project, Bid, Escrow, LedgerEntry, Payment, PayoutBatch, PayoutLine, ProfileTerm,
+    ProjectRecommendation, ProjectTerm, SweepCheckpoint, WorkCompletion
+)
+from . import (
+    auto_approval, bid_membership, bid_stats, gateways, ledger, payments, recommendations, search, settlement, stats,
+    views, workflow,
+)
+
+
+def run_tasks_eagerly(test):
+    """Run Celery tasks queued during ``test`` in-process instead of sending them to the broker."""
+    eager = celery_app.conf.task_always_eager
+    celery_app.conf.task_always_eager = True
+    test.addCleanup(setattr, celery_app.conf, 'task_always_eager', eager)
+
+
+def create_user(username, role, **fields):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com', password='pass12345', role=role, **fields
+    )
+
+
+class MarketplaceTestCase(APITestCase):
+    """
+    Creates ``client_user`` and either one ``freelancer`` or, when
+    ``freelancer_count`` is set, that many numbered ``freelancers``.
+    """
+    freelancer_count = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = create_user('client', 'client')
+        if cls.freelancer_count is None:
+            cls.freelancer = create_user('freelancer', 'freelancer')
+        else:
+            cls.freelancers = [create_user(f'freelancer{i}', 'freelancer') for i in range(cls.freelancer_count)]
+
+    @classmethod
+    def create_project(cls, **fields):
+        return Project.objects.create(**{
+            'title': 'Logo', 'description': 'Design a logo', 'budget': 1000, 'client': cls.client_user, **fields
+        })
+
+    @classmethod
+    def create_hired_project(cls, freelancer=None, amount=800, work_status='not_started', **fields):
+        """A project with ``freelancer``'s accepted bid for ``amount``. Returns ``(project, bid)``."""
+        freelancer = freelancer or cls.freelancer
+        project = cls.create_project(freelancer=freelancer, **fields)
+        bid = Bid.objects.create(
+            project=project, freelancer=freelancer, amount=amount, delivery_days=5,
+            proposal='Pick me', status='accepted', work_status=work_status
+        )
+        return project, bid
+
+
+class ProjectSearchTests(MarketplaceTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('projects:api-available-projects')
+
+    def search(self, query):
+        response = self.client.get(self.url, {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [p['id'] for p in response.data['results']]
+
+    def test_index_follows_project_writes(self):
+        project = self.create_project(title='Django API', description='Build the backend')
+        self.assertEqual(self.search('django'), [project.pk])
+
+        project.title = 'Flask API'
+        project.save()
+        self.assertEqual(self.search('django'), [])
+        self.assertEqual(self.search('flask'), [project.pk])
+
+        project.delete()
+        self.assertEqual(self.search('flask'), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {search.FTS_TABLE}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_title_matches_rank_above_description_matches(self):
+        in_description = self.create_project(title='Online shop', description='Needs a Django backend')
+        in_title = self.create_project(title='Django API', description='Build the backend')
+        Project.objects.filter(pk=in_title.pk).update(created_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(self.search('django'), [in_title.pk, in_description.pk])
+
+    def test_recent_projects_rank_above_equally_relevant_older_ones(self):
+        older = self.create_project(title='Django API')
+        newer = self.create_project(title='Django API')
+        Project.objects.filter(pk=newer.pk).update(created_at=timezone.now() + timedelta(days=30))
+
+        self.assertEqual(self.search('django'), [newer.pk, older.pk])
+
+    def test_last_word_matches_as_a_prefix(self):
+        project = self.create_project(title='Django API')
+        self.assertEqual(self.search('api djan'), [project.pk])
+        self.assertEqual(self.search('djan api'), [])
+
+    def test_query_syntax_in_user_input_is_searched_as_words(self):
+        project = self.create_project(title='Logo and brand', description='Design a logo')
+
+        self.assertEqual(self.search('logo AND'), [project.pk])
+        self.assertEqual(self.search('"logo'), [project.pk])
+        self.assertEqual(self.search('logo*'), [project.pk])
+        self.assertEqual(self.search('brand:logo'), [project.pk])
+        self.assertEqual(self.search('NEAR(logo'), [])
+        # Nothing searchable left: the list is not filtered
+        self.assertEqual(self.search('" * ( -'), [project.pk])
+
+    def test_other_databases_fall_back_to_icontains(self):
+        project = self.create_project(title='Django API')
+
+        with mock.patch.object(search.connection, 'vendor', 'postgresql'):
+            self.assertIsInstance(search.get_search_backend(), search.DatabaseSearchBackend)
+            self.assertEqual(self.search('ango AP'), [project.pk])
+            self.assertEqual(self.search('"'), [])
+
+
+class KeysetPaginationTests(MarketplaceTestCase):
+    freelancer_count = 3
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('projects:api-available-projects')
+        # Budgets and bid counts repeat, so pages split inside runs of ties
+        self.projects = []
+        for i in range(7):
+            project = self.create_project(title=f'Django site {i}', budget=100 * (i % 3 + 1))
+            for freelancer in self.freelancers[:i % 3]:
+                Bid.objects.create(
+                    project=project, freelancer=freelancer, amount=50, delivery_days=3, proposal='Pick me'
+                )
+            self.projects.append(project)
+
+    def walk(self, url, params=None, user=None):
+        """Follow ``next`` links from the first page; returns the ids of every page."""
+        self.client.force_authenticate(user or self.freelancers[0])
+        pages = []
+        response = self.client.get(url, {'page_size': 3, **(params or {})})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append([item['id'] for item in response.data['results']])
+            if response.data['next'] is None:
+                return pages, response
+            response = self.client.get(response.data['next'])
+
+    def test_pages_cover_the_list_once_in_order(self):
+        pages, last = self.walk(self.url)
+
+        expected = list(Project.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), expected)
+        self.assertIsNone(self.client.get(self.url).data['previous'])
+
+        # Paging back from the last page returns the same pages in reverse
+        back = self.client.get(last.data['previous'])
+        self.assertEqual([item['id'] for item in back.data['results']], pages[1])
+        self.assertIsNotNone(back.data['next'])
+        first = self.client.get(back.data['previous'])
+        self.assertEqual([item['id'] for item in first.data['results']], pages[0])
+        self.assertIsNone(first.data['previous'])
+
+    def test_pages_follow_the_requested_ordering(self):
+        for ordering in ('budget', '-budget', 'bid_count', '-bid_count'):
+            pages, _ = self.walk(self.url, {'ordering': ordering})
+            direction = '-' if ordering.startswith('-') else ''
+            expected = list(Project.objects.order_by(ordering, f'{direction}id').values_list('pk', flat=True))
+            self.assertEqual(sum(pages, []), expected, ordering)
+
+    def test_pages_follow_the_search_rank(self):
+        Project.objects.filter(pk=self.projects[2].pk).update(title='Logo', description='Django logo')
+        search.get_search_backend().rebuild()
+        ranked = self.client.get(self.url, {'search': 'django', 'page_size': 100}).data['results']
+
+        pages, _ = self.walk(self.url, {'search': 'django'})
+
+        self.assertEqual(sum(pages, []), [item['id'] for item in ranked])
+        self.assertEqual(sum(pages, [])[-1], self.projects[2].pk)
+
+    def test_cursor_issued_for_another_ordering_is_refused(self):
+        self.client.force_authenticate(self.freelancers[0])
+        cursor = self.client.get(self.url, {'page_size': 3, 'ordering': 'budget'}).data['next']
+
+        response = self.client.get(cursor.replace('ordering=budget', 'ordering=-created_at'))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'not-a-cursor'}).status_code, 404)
+
+    def test_bid_lists_page_with_cursors(self):
+        project = self.projects[0]
+        bids = [
+            Bid.objects.create(
+                project=project, freelancer=freelancer, amount=50, delivery_days=3, proposal='Pick me'
+            )
+            for freelancer in self.freelancers
+        ]
+        pages, _ = self.walk(
+            reverse('projects:api-project-bids', args=[project.pk]), {'page_size': 2}, user=self.client_user
+        )
+        self.assertEqual(sum(pages, []), [bid.pk for bid in reversed(bids)])
+
+        freelancer = self.freelancers[0]
+        mine = Bid.objects.filter(freelancer=freelancer).order_by('-created_at', '-id')
+        pages, _ = self.walk(reverse('projects:api-my-bids'), {'page_size': 2}, user=freelancer)
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), list(mine.values_list('pk', flat=True)))
+
+
+class ProjectSerializerQueryBudgetTests(MarketplaceTestCase):
+    """Serializing projects must cost the same number of queries for any page size."""
+    freelancer_count = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.viewer = cls.freelancers[0]
+
+    def setUp(self):
+        cache.clear()
+        run_tasks_eagerly(self)
+
+    def create_projects(self, count, bids_per_project=2):
+        for i in range(count):
+            project = Project.objects.create(
+                title=f'Project {i}', description='Build something', budget=100 + i,
+                client=self.client_user
+            )
+            for freelancer in self.freelancers[:bids_per_project]:
+                Bid.objects.create(
+                    project=project, freelancer=freelancer, amount=50,
+                    delivery_days=3, proposal='I can do it'
+                )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_available_projects_query_count_is_independent_of_page_size(self):
+        self.client.force_authenticate(self.viewer)
+        url = reverse('projects:api-available-projects')
+        self.create_projects(3)
+        bid_membership.load(self.viewer.pk)
+
+        small_count, response = self.count_queries(f'{url}?page_size=3')
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertTrue(all(p['user_has_bid'] for p in response.data['results']))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_projects(20)
+        bid_membership.load(self.viewer.pk)
+        large_count, response = self.count_queries(f'{url}?page_size=20')
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(small_count, large_count)
+
+    def test_available_projects_page_is_a_single_query(self):
+        self.client.force_authenticate(self.viewer)
+        self.create_projects(10)
+        url = reverse('projects:api-available-projects')
+
+        # The viewer's bid membership is loaded once, then read from the cache
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertTrue(all(p['user_has_bid'] for p in response.data['results']))
+
+    def test_project_detail_with_bids_query_budget(self):
+        self.client.force_authenticate(self.viewer)
+        self.create_projects(1, bids_per_project=5)
+        project = Project.objects.get()
+        bid_membership.load(self.viewer.pk)
+
+        # version check + project row (with client and freelancer) +
+        # prefetched bids; user_has_bid comes from the cached membership
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('projects:api-project-detail', args=[project.pk]))
+        self.assertEqual(len(response.data['bids']), 5)
+        self.assertEqual(response.data['bid_count'], 5)
+
+    def test_bid_lists_query_count_is_independent_of_bid_count(self):
+        self.create_projects(1, bids_per_project=1)
+        project = Project.objects.get()
+
+        self.client.force_authenticate(self.client_user)
+        url = reverse('projects:api-project-bids', args=[project.pk])
+        small_count, _ = self.count_queries(url)
+
+        for freelancer in self.freelancers[1:]:
+            Bid.objects.create(
+                project=project, freelancer=freelancer, amount=50,
+                delivery_days=3, proposal='Me too'
+            )
+        large_count, response = self.count_queries(url)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(small_count, large_count)
+
+
+class ProjectDetailConditionalGetTests(MarketplaceTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.project = self.create_project(budget=100)
+        self.url = reverse('projects:api-project-detail', args=[self.project.pk])
+        self.client.force_authenticate(self.freelancer)
+
+    def test_unchanged_project_returns_304_after_version_query_only(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_new_bid_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Bid.objects.create(
+                project=self.project, freelancer=self.freelancer, amount=50,
+                delivery_days=3, proposal='I can do it'
+            )
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertTrue(response.data['user_has_bid'])
+
+
+class ProjectFacetsTests(MarketplaceTestCase):
+
+    def setUp(self):
+        cache.clear()
+        run_tasks_eagerly(self)
+        self.url = reverse('projects:api-project-facets')
+
+    def create_bucketed_project(self, budget, title='Project'):
+        """Create a project and run the on-commit updates of the facet counters."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.create_project(title=title, description='Build something', budget=budget)
+
+    def facets(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return (
+            {item['value']: item['count'] for item in response.data['status']},
+            [item['count'] for item in response.data['budget']],
+        )
+
+    def test_cached_histograms_follow_project_writes_without_queries(self):
+        self.create_bucketed_project(500)
+        project = self.create_bucketed_project(7000)
+        self.facets()  # warm the counters
+
+        with self.captureOnCommitCallbacks(execute=True):
+            project.status = 'in_progress'
+            project.budget = 30000
+            project.save()
+
+        with self.assertNumQueries(0):
+            status_counts, budget_counts = self.facets()
+        self.assertEqual(status_counts['open'], 1)
+        self.assertEqual(status_counts['in_progress'], 1)
+        self.assertEqual(budget_counts, [1, 0, 0, 0, 1, 0, 0])
+
+        _, budget_counts = self.facets(status='open')
+        self.assertEqual(budget_counts, [1, 0, 0, 0, 0, 0, 0])
+
+    def test_budget_range_and_search_narrow_the_counts(self):
+        self.create_bucketed_project(500, title='Logo design')
+        self.create_bucketed_project(7000, title='Logo animation')
+        self.create_bucketed_project(7500, title='Web shop')
+
+        status_counts, _ = self.facets(min_budget=1000, max_budget=8000)
+        self.assertEqual(status_counts['open'], 2)
+
+        status_counts, budget_counts = self.facets(search='logo')
+        self.assertEqual(status_counts['open'], 2)
+        self.assertEqual(budget_counts, [1, 0, 1, 0, 0, 0, 0])
+
+    def test_available_projects_filters_by_budget_range(self):
+        self.create_bucketed_project(500)
+        self.create_bucketed_project(7000)
+        response = self.client.get(
+            reverse('projects:api-available-projects'), {'min_budget': 1000, 'max_budget': 8000}
+        )
+        self.assertEqual([p['budget'] for p in response.data['results']], ['7000.00'])
+
+
+class RecommendedProjectsTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        run_tasks_eagerly(self)
+        self.client_user = create_user('client', 'client')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.freelancer = create_user(
+                'freelancer', 'freelancer', skills=['Django', 'Python'], category='developer'
+            )
+        self.url = reverse('projects:api-recommended-projects')
+
+    def post_project(self, title, description):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Project.objects.create(
+                title=title, description=description, budget=100, client=self.client_user
+            )
+
+    def test_new_projects_are_merged_into_matching_feeds(self):
+        backend = self.post_project('Django backend', 'Python REST API for a web app')
+        self.post_project('Wedding photos', 'Edit and retouch photos')
+
+        self.client.force_authenticate(self.freelancer)
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual([p['id'] for p in response.data], [backend.pk])
+
+    def test_closed_projects_leave_the_feed(self):
+        project = self.post_project('Django backend', 'Python REST API')
+        with self.captureOnCommitCallbacks(execute=True):
+            project.status = 'cancelled'
+            project.save()
+
+        self.assertFalse(ProjectRecommendation.objects.exists())
+
+    def test_profile_changes_recompute_the_feed(self):
+        design = self.post_project('Logo design', 'Figma logo and brand kit')
+        self.assertFalse(ProjectRecommendation.objects.filter(project=design).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.freelancer.skills = ['Figma', 'logo design']
+            self.freelancer.save()
+
+        self.client.force_authenticate(self.freelancer)
+        response = self.client.get(self.url)
+        self.assertEqual([p['id'] for p in response.data], [design.pk])
+
+    def test_users_who_stop_freelancing_leave_the_index(self):
+        self.post_project('Django backend', 'Python REST API for a web app')
+        self.assertTrue(ProjectRecommendation.objects.filter(freelancer=self.freelancer).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.freelancer.role = 'client'
+            self.freelancer.save(update_fields=['role'])
+
+        self.assertFalse(ProjectRecommendation.objects.filter(freelancer=self.freelancer).exists())
+        self.assertFalse(ProfileTerm.objects.filter(freelancer=self.freelancer).exists())
+
+    def test_index_is_kept_in_the_database(self):
+        backend = self.post_project('Django backend', 'Python REST API')
+        self.assertEqual(
+            dict(backend.recommendation_terms.values_list('term', 'count')),
+            {'django': 1, 'backend': 1, 'python': 1, 'rest': 1, 'api': 1},
+        )
+        self.assertEqual(
+            dict(self.freelancer.recommendation_terms.values_list('term', 'count')),
+            {'django': 3, 'python': 3, 'web': 1, 'mobile': 1, 'backend': 1, 'developer': 1},
+        )
+        # Another process, with nothing cached, scores against the same index
+        cache.clear()
+        self.assertEqual(
+            [project_id for project_id, _ in recommendations.refresh_freelancer(self.freelancer.pk)], [backend.pk]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            backend.status = 'cancelled'
+            backend.save()
+        self.assertFalse(ProjectTerm.objects.exists())
+
+    def test_project_count_is_kept_in_the_cache(self):
+        self.post_project('Django backend', 'Python REST API')
+        self.assertEqual(recommendations._project_count(), 1)
+
+        design = self.post_project('Logo design', 'Figma logo and brand kit')
+        self.assertEqual(cache.get(recommendations.PROJECT_COUNT_KEY), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            design.status = 'cancelled'
+            design.save()
+        self.assertEqual(cache.get(recommendations.PROJECT_COUNT_KEY), 1)
+
+        # Scoring counts the frequencies of its own terms only
+        with self.assertNumQueries(1):
+            recommendations._load_idf(['django', 'python'])
+
+    def test_rebuild_rewrites_the_index_and_the_feeds(self):
+        backend = self.post_project('Django backend', 'Python REST API')
+        ProjectTerm.objects.all().delete()
+        ProfileTerm.objects.all().delete()
+        ProjectRecommendation.objects.all().delete()
+
+        call_command('rebuild_recommendations', stdout=io.StringIO())
+
+        self.assertTrue(backend.recommendation_terms.exists())
+        self.assertTrue(self.freelancer.recommendation_terms.exists())
+        self.assertEqual(
+            list(ProjectRecommendation.objects.values_list('freelancer', 'project')),
+            [(self.freelancer.pk, backend.pk)],
+        )
+
+
+class BidAcceptTests(MarketplaceTestCase):
+    freelancer_count = 3
+
+    def setUp(self):
+        self.project = self.create_project(budget=100)
+        self.bids = [
+            Bid.objects.create(
+                project=self.project, freelancer=freelancer, amount=50, delivery_days=3, proposal='Pick me'
+            )
+            for freelancer in self.freelancers
+        ]
+        self.client.force_authenticate(self.client_user)
+
+    def accept(self, bid):
+        return self.client.patch(reverse('projects:api-bid-accept', args=[bid.pk]))
+
+    def test_accept_assigns_project_and_rejects_other_bids(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.accept(self.bids[0])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'accepted')
+
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.freelancer, self.bids[0].freelancer)
+        self.assertEqual(self.project.status, 'in_progress')
+        self.assertEqual(self.project.pending_bid_count, 0)
+        self.assertEqual(
+            list(self.project.bids.order_by('pk').values_list('status', flat=True)),
+            ['accepted', 'rejected', 'rejected'],
+        )
+        self.assertEqual(ChatRoom.objects.filter(project=self.project).count(), 1)
+        # One batch of rejection emails
+        self.assertEqual(
+            sum(callback.__qualname__.startswith('accept_bid') for callback in callbacks), 1
+        )
+
+    def test_accept_counts_only_the_bids_still_pending(self):
+        self.client.force_authenticate(self.bids[2].freelancer)
+        self.client.patch(reverse('projects:api-bid-withdraw', args=[self.bids[2].pk]))
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.bid_count, self.project.pending_bid_count), (3, 2))
+
+        self.client.force_authenticate(self.client_user)
+        self.accept(self.bids[0])
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.bid_count, self.project.pending_bid_count), (3, 0))
+        self.assertEqual(
+            list(self.project.bids.order_by('pk').values_list('status', flat=True)),
+            ['accepted', 'rejected', 'withdrawn'],
+        )
+
+    def test_second_accept_conflicts(self):
+        self.accept(self.bids[0])
+        response = self.accept(self.bids[1])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.project.bids.filter(status='accepted').count(), 1)
+
+    def test_only_the_owner_can_accept(self):
+        self.client.force_authenticate(self.bids[1].freelancer)
+        response = self.accept(self.bids[1])
+        self.assertEqual(response.status_code, 403)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.status, 'open')
+
+
+class BidBulkActionTests(MarketplaceTestCase):
+    freelancer_count = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_client = create_user('other', 'client')
+        cls.project = cls.create_project(budget=100)
+        cls.other_project = cls.create_project(
+            title='Site', description='Build a site', budget=100, client=cls.other_client
+        )
+        cls.bids = [
+            Bid.objects.create(
+                project=cls.project, freelancer=freelancer, amount=50,
+                delivery_days=3, proposal='Pick me'
+            )
+            for freelancer in cls.freelancers
+        ]
+        cls.foreign_bid = Bid.objects.create(
+            project=cls.other_project, freelancer=cls.freelancers[0], amount=50,
+            delivery_days=3, proposal='Pick me'
+        )
+        cls.url = reverse('projects:api-bid-bulk-action')
+
+    def post(self, user, ids, action):
+        self.client.force_authenticate(user)
+        return self.client.post(self.url, {'ids': ids, 'action': action}, format='json')
+
+    def test_bulk_reject_is_a_fixed_number_of_queries(self):
+        ids = [bid.pk for bid in self.bids]
+        # savepoint, locked read, bid UPDATE, counter UPDATE, release
+        with self.assertNumQueries(5):
+            response = self.post(self.client_user, ids, 'reject')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 20)
+        self.assertFalse(self.project.bids.exclude(status='rejected').exists())
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.pending_bid_count, 0)
+
+    def test_per_id_results(self):
+        self.post(self.client_user, [self.bids[1].pk], 'shortlist')
+        response = self.post(
+            self.client_user, [self.bids[0].pk, self.bids[1].pk, self.foreign_bid.pk, 999999], 'shortlist'
+        )
+        self.assertEqual(
+            [(r['id'], r['result']) for r in response.data['results']],
+            [
+                (self.bids[0].pk, 'shortlisted'),
+                (self.bids[1].pk, 'invalid_status'),
+                (self.foreign_bid.pk, 'forbidden'),
+                (999999, 'not_found'),
+            ],
+        )
+
+    def test_freelancers_withdraw_their_own_bids(self):
+        response = self.post(self.freelancers[0], [self.bids[0].pk, self.bids[1].pk], 'withdraw')
+        self.assertEqual(
+            [r['result'] for r in response.data['results']], ['withdrawn', 'forbidden']
+        )
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.pending_bid_count, 19)
+
+    def test_racing_withdraws_close_the_bid_once(self):
+        url = reverse('projects:api-bid-withdraw', args=[self.bids[0].pk])
+        # Both requests read the bid while it was still pending
+        stale = [Bid.objects.get(pk=self.bids[0].pk) for _ in range(2)]
+        self.client.force_authenticate(self.freelancers[0])
+        with mock.patch.object(views.BidWithdrawView, 'get_object', side_effect=stale):
+            first = self.client.patch(url)
+            second = self.client.patch(url)
+        self.assertEqual((first.status_code, first.data['status']), (200, 'withdrawn'))
+        self.assertEqual(second.status_code, 400)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.pending_bid_count, 19)
+
+    def test_withdrawing_a_shortlisted_bid_leaves_the_pending_count(self):
+        self.post(self.client_user, [self.bids[0].pk], 'shortlist')
+        self.client.force_authenticate(self.freelancers[0])
+        response = self.client.patch(reverse('projects:api-bid-withdraw', args=[self.bids[0].pk]))
+        self.assertEqual(response.data['status'], 'withdrawn')
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.bid_count, self.project.pending_bid_count), (20, 19))
+
+    def test_rebuild_bid_counters_command(self):
+        Project.objects.update(bid_count=99, pending_bid_count=99)
+        Bid.objects.filter(pk=self.bids[0].pk).update(status='rejected')
+
+        call_command('rebuild_bid_counters', project=[self.project.pk], stdout=io.StringIO())
+
+        self.project.refresh_from_db()
+        self.other_project.refresh_from_db()
+        self.assertEqual((self.project.bid_count, self.project.pending_bid_count), (20, 19))
+        self.assertEqual((self.other_project.bid_count, self.other_project.pending_bid_count), (99, 99))
+
+        call_command('rebuild_bid_counters', stdout=io.StringIO())
+        self.other_project.refresh_from_db()
+        self.assertEqual((self.other_project.bid_count, self.other_project.pending_bid_count), (1, 1))
+
+    def test_racing_rejects_close_the_bid_once(self):
+        url = reverse('projects:api-bid-reject', args=[self.bids[0].pk])
+        # Both requests read the bid while it was still pending
+        stale = [Bid.objects.get(pk=self.bids[0].pk) for _ in range(2)]
+        self.client.force_authenticate(self.client_user)
+        with mock.patch.object(views.BidRejectView, 'get_object', side_effect=stale):
+            first = self.client.patch(url)
+            second = self.client.patch(url)
+        self.assertEqual((first.status_code, first.data['status']), (200, 'rejected'))
+        self.assertEqual(second.status_code, 400)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.pending_bid_count, 19)
+
+    def test_only_open_bids_can_be_rejected(self):
+        self.post(self.client_user, [self.bids[0].pk], 'shortlist')
+        self.post(self.freelancers[1], [self.bids[1].pk], 'withdraw')
+        Bid.objects.filter(pk=self.bids[2].pk).update(status='accepted')
+        bid_stats.get_bid_stats(self.project.pk)
+
+        self.client.force_authenticate(self.client_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            responses = [
+                self.client.patch(reverse('projects:api-bid-reject', args=[bid.pk])) for bid in self.bids[:3]
+            ]
+        self.assertEqual([r.status_code for r in responses], [200, 400, 400])
+        self.assertEqual(
+            [Bid.objects.get(pk=bid.pk).status for bid in self.bids[:3]], ['rejected', 'withdrawn', 'accepted']
+        )
+        self.assertIsNone(cache.get(bid_stats._key(self.project.pk)))
+
+    def test_unknown_action_is_rejected(self):
+        response = self.post(self.client_user, [self.bids[0].pk], 'delete')
+        self.assertEqual(response.status_code, 400)
+
+
+class ProjectBidStatsTests(MarketplaceTestCase):
+    freelancer_count = 5
+
+    def setUp(self):
+        cache.clear()
+        self.project = self.create_project()
+        self.url = reverse('projects:api-project-bid-stats', args=[self.project.pk])
+        self.client.force_authenticate(self.client_user)
+
+    def place_bid(self, freelancer, amount, days):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Bid.objects.create(
+                project=self.project, freelancer=freelancer, amount=amount,
+                delivery_days=days, proposal='Pick me'
+            )
+
+    def test_distribution_and_positions(self):
+        bids = [
+            self.place_bid(freelancer, amount, days)
+            for freelancer, amount, days in zip(self.freelancers, [100, 200, 300, 400, 500], [5, 5, 10, 3, 7])
+        ]
+        data = self.client.get(self.url).data
+
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(data['amount']['median'], 300)
+        self.assertEqual((data['amount']['min'], data['amount']['max']), (100, 500))
+        self.assertEqual(data['delivery_days']['median'], 5)
+        positions = {bid['id']: bid for bid in data['bids']}
+        self.assertEqual(positions[bids[0].pk]['amount_percentile'], 10)
+        self.assertEqual(positions[bids[4].pk]['amount_percentile'], 90)
+        self.assertEqual(positions[bids[0].pk]['delivery_percentile'], 40)
+
+    def test_cached_until_a_bid_changes(self):
+        self.place_bid(self.freelancers[0], 100, 5)
+        self.client.get(self.url)
+
+        with self.assertNumQueries(1):  # the ownership check only
+            self.assertEqual(self.client.get(self.url).data['count'], 1)
+
+        self.place_bid(self.freelancers[1], 300, 5)
+        self.assertEqual(self.client.get(self.url).data['amount']['median'], 200)
+
+    def test_only_the_owner_sees_the_distribution(self):
+        self.client.force_authenticate(self.freelancers[0])
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class BidCreateTests(MarketplaceTestCase):
+
+    def setUp(self):
+        cache.clear()
+        ratelimit.get_backend().clear()
+        self.project = self.create_project()
+        self.url = reverse('projects:api-bid-create', args=[self.project.pk])
+        self.payload = {'amount': '250.00', 'delivery_days': 4, 'proposal': 'Pick me'}
+        self.client.force_authenticate(self.freelancer)
+
+    def test_bid_is_created_in_a_single_insert(self):
+        # Savepoint, INSERT ... SELECT ... RETURNING, the counter UPDATE, release
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(4):
+                response = self.client.post(self.url, self.payload)
+
+        self.assertEqual(response.status_code, 201)
+        bid = Bid.objects.get(pk=response.data['id'])
+        self.assertEqual((bid.freelancer, bid.status, bid.delivery_days), (self.freelancer, 'pending', 4))
+        self.assertEqual(response.data['freelancer_details']['id'], self.freelancer.pk)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.bid_count, self.project.pending_bid_count), (1, 1))
+
+    def test_bid_membership_follows_new_bids(self):
+        detail_url = reverse('projects:api-project-detail', args=[self.project.pk])
+        self.assertFalse(self.client.get(detail_url).data['user_has_bid'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, self.payload)
+
+        self.assertTrue(self.client.get(detail_url).data['user_has_bid'])
+        self.client.force_login(self.freelancer)
+        page = self.client.get(reverse('projects:project-detail', args=[self.project.pk]))
+        self.assertTrue(page.context['user_has_bid'])
+        self.assertFalse(page.context['can_bid'])
+
+    @override_settings(BID_MEMBERSHIP_TIMEOUT=60)
+    def test_bid_membership_written_elsewhere_shows_up_once_the_entry_expires(self):
+        self.assertEqual(bid_membership.load(self.freelancer.pk), frozenset())
+        # Another worker's bid: its invalidation never reaches this process
+        Bid.objects.bulk_create([Bid(
+            project=self.project, freelancer=self.freelancer, amount=250, delivery_days=4, proposal='Pick me'
+        )])
+        self.assertEqual(bid_membership.load(self.freelancer.pk), frozenset())
+
+        expired = time_module.time() + 61
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=expired):
+            self.assertEqual(bid_membership.load(self.freelancer.pk), {self.project.pk})
+
+    def test_deleting_a_bid_uncounts_it(self):
+        self.client.post(self.url, self.payload)
+        Bid.objects.get(project=self.project).delete()
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.bid_count, self.project.pending_bid_count), (0, 0))
+
+    def test_duplicate_bid_is_rejected(self):
+        self.client.post(self.url, self.payload)
+        response = self.client.post(self.url, self.payload)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], 'You have already placed a bid on this project.')
+        self.assertEqual(Bid.objects.filter(project=self.project).count(), 1)
+
+    def test_closed_and_missing_projects_are_refused(self):
+        Project.objects.filter(pk=self.project.pk).update(status='cancelled')
+        response = self.client.post(self.url, self.payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], 'This project is no longer accepting bids.')
+
+        missing = reverse('projects:api-bid-create', args=[self.project.pk + 100])
+        self.assertEqual(self.client.post(missing, self.payload).status_code, 404)
+        self.assertFalse(Bid.objects.exists())
+
+
+class IdempotencyKeyTests(MarketplaceTestCase):
+
+    def setUp(self):
+        cache.clear()
+        ratelimit.get_backend().clear()
+        self.project = self.create_project()
+        self.url = reverse('projects:api-bid-create', args=[self.project.pk])
+        self.payload = {'amount': '250.00', 'delivery_days': 4, 'proposal': 'Pick me'}
+        self.client.force_authenticate(self.freelancer)
+
+    def test_retried_bid_replays_the_first_response(self):
+        first = self.client.post(self.url, self.payload, HTTP_IDEMPOTENCY_KEY='bid-1')
+
+        with self.assertNumQueries(0):
+            retry = self.client.post(self.url, self.payload, HTTP_IDEMPOTENCY_KEY='bid-1')
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Bid.objects.filter(project=self.project).count(), 1)
+
+    def test_response_stored_while_waiting_for_the_lock_is_replayed(self):
+        first = self.client.post(self.url, self.payload, HTTP_IDEMPOTENCY_KEY='bid-1')
+        # The retry read the key just before the first attempt stored its response
+        get, missed = cache.get, []
+
+        def get_missing_once(key, *args, **kwargs):
+            if key.startswith('idempotency:') and not missed:
+                missed.append(key)
+                return None
+            return get(key, *args, **kwargs)
+
+        with mock.patch.object(idempotency.cache, 'get', side_effect=get_missing_once):
+            retry = self.client.post(self.url, self.payload, HTTP_IDEMPOTENCY_KEY='bid-1')
+
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Bid.objects.filter(project=self.project).count(), 1)
+
+    def test_key_reused_with_another_body_is_refused(self):
+        self.client.post(self.url, self.payload, HTTP_IDEMPOTENCY_KEY='bid-1')
+        response = self.client.post(self.url, {**self.payload, 'amount': '300.00'}, HTTP_IDEMPOTENCY_KEY='bid-1')
+        self.assertEqual(response.status_code, 422)
+
+    def test_failed_requests_are_not_stored(self):
+        Project.objects.filter(pk=self.project.pk).update(status='cancelled')
+        self.assertEqual(self.client.post(self.url, self.payload, HTTP_IDEMPOTENCY_KEY='bid-1').status_code, 400)
+
+        Project.objects.filter(pk=self.project.pk).update(status='open')
+        self.assertEqual(self.client.post(self.url, self.payload, HTTP_IDEMPOTENCY_KEY='bid-1').status_code, 201)
+
+    def test_retried_message_is_sent_once(self):
+        Project.objects.filter(pk=self.project.pk).update(freelancer=self.freelancer, status='in_progress')
+        url = reverse('chat:send-message', args=[self.project.pk])
+
+        for _ in range(3):
+            response = self.client.post(url, {'content': 'Hello'}, HTTP_IDEMPOTENCY_KEY='msg-1')
+            self.assertEqual(response.status_code, 201)
+        self.client.post(url, {'content': 'Hello'}, HTTP_IDEMPOTENCY_KEY='msg-2')
+
+        self.assertEqual(Message.objects.filter(room__project=self.project).count(), 2)
+
+    def test_refused_payment_redirect_is_not_stored(self):
+        self.project, _ = self.create_hired_project(work_status='completed', status='completed')
+        self.client.force_login(self.client_user)
+        url = reverse('projects:initiate-payment', args=[self.project.pk])
+        payload = {'payment_method': 'card', 'notes': '', 'version': 1}
+
+        # A stale version is refused with a redirect, and nothing is queued
+        refused = self.client.post(url, payload, HTTP_IDEMPOTENCY_KEY='pay-1')
+        self.assertEqual(refused.status_code, 302)
+        self.assertFalse(Payment.objects.exists())
+
+        Project.objects.filter(pk=self.project.pk).update(version=1)
+        with self.captureOnCommitCallbacks():
+            retry = self.client.post(url, payload, HTTP_IDEMPOTENCY_KEY='pay-1')
+        self.assertNotIn('Idempotent-Replayed', retry)
+        self.assertEqual(Payment.objects.get(project=self.project).status, 'pending')
+
+        with self.captureOnCommitCallbacks():
+            replayed = self.client.post(url, payload, HTTP_IDEMPOTENCY_KEY='pay-1')
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertEqual(Payment.objects.filter(project=self.project).count(), 1)
+
+    def test_only_the_client_claims_a_payment_key(self):
+        self.project, _ = self.create_hired_project(work_status='completed', status='completed')
+        url = reverse('projects:initiate-payment', args=[self.project.pk])
+        payload = {'payment_method': 'card', 'notes': '', 'version': 2}
+
+        self.client.force_login(self.freelancer)
+        with mock.patch.object(idempotency, '_cache_key', wraps=idempotency._cache_key) as claim:
+            response = self.client.post(url, payload, HTTP_IDEMPOTENCY_KEY='pay-1')
+        self.assertRedirects(response, reverse('projects:project-list'), fetch_redirect_response=False)
+        claim.assert_not_called()
+
+
+class RateLimitTests(MarketplaceTestCase):
+
+    def setUp(self):
+        ratelimit.get_backend().clear()
+
+    def test_sliding_window(self):
+        backend = ratelimit.LocalMemoryBackend()
+        self.assertEqual([backend.hit(['k'], 2, 60) for _ in range(2)], [0, 0])
+        self.assertGreater(backend.hit(['k'], 2, 60), 59)
+        self.assertEqual(backend.hit(['other'], 2, 60), 0)
+        self.assertEqual(ratelimit.parse_rate('5/10s'), (5, 10))
+
+    def test_refused_hit_counts_against_no_identity(self):
+        backend = ratelimit.LocalMemoryBackend()
+        backend.hit(['user'], 1, 60)
+
+        self.assertGreater(backend.hit(['user', 'ip'], 1, 60), 59)
+        # The refused request left the IP's window untouched
+        self.assertEqual(backend.hit(['ip'], 1, 60), 0)
+
+    @override_settings(RATELIMIT_MAX_IN_FLIGHT=1)
+    def test_requests_beyond_the_in_flight_limit_are_shed(self):
+        project = self.create_project()
+        self.client.force_authenticate(self.freelancer)
+        url = reverse('projects:api-bid-create', args=[project.pk])
+        payload = {'amount': '250.00', 'delivery_days': 4, 'proposal': 'Pick me'}
+
+        # Another request is being served
+        self.assertTrue(ratelimit.in_flight.acquire(1))
+        try:
+            with self.assertNumQueries(0):
+                response = self.client.post(url, payload)
+        finally:
+            ratelimit.in_flight.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+        self.assertEqual(self.client.post(url, payload).status_code, 201)
+        self.assertEqual(ratelimit.in_flight.count, 0)
+
+    @override_settings(RATELIMIT_RATES={'bid-create': '2/m'})
+    def test_bid_submissions_beyond_the_rate_get_429(self):
+        projects = [
+            self.create_project(title=f'Logo {i}')
+            for i in range(3)
+        ]
+        self.client.force_authenticate(self.freelancer)
+        payload = {'amount': '250.00', 'delivery_days': 4, 'proposal': 'Pick me'}
+
+        codes = [
+            self.client.post(reverse('projects:api-bid-create', args=[project.pk]), payload).status_code
+            for project in projects
+        ]
+        self.assertEqual(codes, [201, 201, 429])
+
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('projects:api-bid-create', args=[projects[2].pk]), payload)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+
+class ProjectDetailPageTests(MarketplaceTestCase):
+    freelancer_count = 6
+
+    def setUp(self):
+        cache.clear()
+        self.project = self.create_project()
+        self.url = reverse('projects:project-detail', args=[self.project.pk])
+        self.client.force_login(self.client_user)
+
+    def place_bids(self, freelancers):
+        with self.captureOnCommitCallbacks(execute=True):
+            for freelancer in freelancers:
+                Bid.objects.create(
+                    project=self.project, freelancer=freelancer, amount=100,
+                    delivery_days=3, proposal='Pick me'
+                )
+
+    def render(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_is_independent_of_bid_count(self):
+        self.place_bids(self.freelancers[:1])
+        few, _ = self.render()
+
+        cache.clear()
+        self.place_bids(self.freelancers[1:])
+        Bid.objects.filter(freelancer=self.freelancers[1]).update(status='rejected')
+        Bid.objects.filter(freelancer=self.freelancers[2]).update(status='shortlisted')
+        many, response = self.render()
+
+        self.assertEqual(few, many)
+        self.assertEqual(len(response.context['bids']), 5)
+        self.assertEqual(len(response.context['declined_bids']), 1)
+        self.assertContains(response, self.freelancers[5].username)
+
+    def test_bid_lists_are_served_from_the_fragment_cache(self):
+        self.place_bids(self.freelancers[:3])
+        self.render()
+
+        # session, user and the project row; bids and bid membership are cached
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'freelancer2')
+
+        self.place_bids(self.freelancers[3:4])
+        _, response = self.render()
+        self.assertContains(response, 'freelancer3')
+
+
+class WorkflowTransitionTests(MarketplaceTestCase):
+
+    def setUp(self):
+        cache.clear()
+        run_tasks_eagerly(self)
+        self.project, self.bid = self.create_hired_project(status='in_progress')
+        self.events = []
+        handler = lambda transition, **kwargs: self.events.append(transition)
+        workflow.transition_applied.connect(handler, weak=False, dispatch_uid='workflow-test')
+        self.addCleanup(workflow.transition_applied.disconnect, dispatch_uid='workflow-test')
+
+    def submit_work(self, version=0):
+        self.client.force_login(self.freelancer)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('projects:submit-work', args=[self.project.pk]), {
+                'submission_notes': 'All done', 'submission_files_link': '', 'version': version,
+            })
+
+    def review_work(self, action, version):
+        self.client.force_login(self.client_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('projects:review-work', args=[self.project.pk]), {
+                'action': action, 'review_notes': 'Thanks', 'version': version,
+            })
+
+    def test_submit_revise_and_approve(self):
+        self.submit_work()
+        self.review_work('revision_requested', version=1)
+        self.submit_work(version=2)
+        self.review_work('approved', version=3)
+
+        self.project.refresh_from_db()
+        self.bid.refresh_from_db()
+        work = WorkCompletion.objects.get()
+        self.assertEqual(
+            (self.project.status, self.project.payment_status, self.project.version),
+            ('completed', 'escrowed', 4)
+        )
+        self.assertIsNotNone(self.project.completed_at)
+        self.assertEqual((self.bid.work_status, self.bid.status), ('completed', 'accepted'))
+        self.assertEqual((work.status, work.revision_count, work.review_notes), ('approved', 1, 'Thanks'))
+        self.assertEqual(self.events, ['submit_work', 'request_revision', 'submit_work', 'approve_work'])
+
+    def test_stale_version_is_refused(self):
+        self.submit_work()
+        response = self.review_work('approved', version=0)
+
+        self.assertRedirects(response, reverse('projects:project-detail', args=[self.project.pk]))
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.status, self.project.version), ('work_submitted', 1))
+        self.assertEqual(self.events, ['submit_work'])
+
+    def test_transition_writes_only_changed_columns(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            workflow.apply_transition('submit_work', self.project.pk, self.freelancer, work_fields={
+                'submission_notes': 'All done',
+            })
+        with CaptureQueriesContext(connection) as ctx:
+            workflow.apply_transition('approve_work', self.project.pk, self.client_user, expected_version=1)
+
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        project_update = next(sql for sql in updates if sql.startswith('UPDATE "projects_project" SET "status"'))
+        self.assertNotIn('"title"', project_update)
+        self.assertNotIn('"description"', project_update)
+
+    def test_workflow_pages_resolve_their_lookups_once(self):
+        self.client.force_login(self.freelancer)
+        # session, user, project (with client, freelancer and work), accepted bid
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('projects:submit-work', args=[self.project.pk]))
+        self.assertEqual(response.context['bid'], self.bid)
+
+        self.submit_work()
+        self.client.force_login(self.client_user)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('projects:review-work', args=[self.project.pk]))
+        self.assertEqual(response.context['work'].submission_notes, 'All done')
+
+        response = self.client.get(reverse('projects:submit-work', args=[self.project.pk]))
+        self.assertRedirects(response, reverse('projects:project-list'), fetch_redirect_response=False)
+
+    def test_only_the_right_party_can_transition(self):
+        with self.assertRaises(workflow.TransitionError) as raised:
+            workflow.apply_transition('submit_work', self.project.pk, self.client_user)
+        self.assertEqual(raised.exception.status_code, 403)
+
+
+@override_settings(WORK_AUTO_APPROVE_DAYS=14)
+class AutoApprovalTests(MarketplaceTestCase):
+
+    def submitted_project(self, days_ago, status='work_submitted'):
+        project, bid = self.create_hired_project(status=status, work_status='submitted')
+        work = WorkCompletion.objects.create(bid=bid, project=project, submission_notes='Done')
+        WorkCompletion.objects.filter(pk=work.pk).update(submitted_at=timezone.now() - timedelta(days=days_ago))
+        return project
+
+    def test_stale_work_is_approved_and_its_escrow_released(self):
+        stale = self.submitted_project(days_ago=20)
+        fresh = self.submitted_project(days_ago=2)
+        Escrow.objects.create(project=stale, bid=stale.bids.get(), amount=800, status='held')
+        approved = []
+        workflow.transition_applied.connect(
+            lambda **kwargs: approved.append((kwargs['project'].pk, kwargs['transition'], kwargs['user'])),
+            weak=False, dispatch_uid='auto-approval-test',
+        )
+        self.addCleanup(workflow.transition_applied.disconnect, dispatch_uid='auto-approval-test')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = auto_approval.run()
+
+        self.assertEqual((result['approved'], result['done']), (1, True))
+        self.assertEqual(
+            approved,
+            [(stale.pk, 'approve_work', self.client_user), (stale.pk, 'release_payment', self.client_user)],
+        )
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.payment_status, stale.version), ('completed', 'released', 1))
+        self.assertEqual(stale.work_completion.status, 'approved')
+        self.assertEqual(stale.bids.get().work_status, 'completed')
+        self.assertEqual(stale.escrow.status, 'released')
+        self.assertIsNotNone(stale.escrow.released_at)
+        self.assertEqual(ledger.balance(self.freelancer.pk).credits, Decimal('720.00'))
+        self.assertEqual(ledger.balance(self.client_user.pk).debits, Decimal('800.00'))
+        self.assertEqual(ledger.balance(None, account='escrow').balance, 0)
+
+        fresh.refresh_from_db()
+        self.assertEqual((fresh.status, fresh.work_completion.status), ('work_submitted', 'pending'))
+
+    def test_released_escrow_is_paid_out_by_settlement(self):
+        stale = self.submitted_project(days_ago=20)
+        Escrow.objects.create(
+            project=stale, bid=stale.bids.get(), amount=800, status='held', transaction_id='TXN-ESCROW'
+        )
+
+        auto_approval.run()
+
+        payment = Payment.objects.get(project=stale)
+        self.assertEqual(
+            (payment.status, payment.payer, payment.payee, payment.net_amount, payment.transaction_id),
+            ('completed', self.client_user, self.freelancer, Decimal('720.00'), 'TXN-ESCROW'),
+        )
+        self.assertEqual(
+            set(LedgerEntry.objects.filter(project=stale).values_list('payment_id', flat=True)), {payment.pk}
+        )
+
+        settlement.settle(timezone.localdate())
+
+        batch = PayoutBatch.objects.get(payee=self.freelancer)
+        self.assertEqual((batch.total_amount, batch.payment_count), (Decimal('720.00'), 1))
+        self.assertEqual(batch.lines.get().payment, payment)
+
+    def test_work_without_collected_funds_is_approved_and_left_for_payment(self):
+        stale = self.submitted_project(days_ago=20)
+
+        auto_approval.run()
+
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.payment_status), ('completed', 'escrowed'))
+        # Nothing was collected, so nothing moves until the client pays
+        self.assertFalse(Escrow.objects.exists())
+        self.assertFalse(LedgerEntry.objects.exists())
+        self.assertFalse(Payment.objects.exists())
+
+    def test_projects_that_moved_on_are_skipped(self):
+        cancelled = self.submitted_project(days_ago=20, status='cancelled')
+
+        result = auto_approval.run()
+
+        self.assertEqual((result['scanned'], result['approved']), (1, 0))
+        self.assertEqual(WorkCompletion.objects.get(project=cancelled).status, 'pending')
+        self.assertFalse(Escrow.objects.exists())
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        projects = [self.submitted_project(days_ago=30 - i) for i in range(5)]
+
+        first = auto_approval.run(max_batches=1, batch_size=2)
+        self.assertEqual((first['approved'], first['done']), (2, False))
+        checkpoint = SweepCheckpoint.objects.get(name=auto_approval.CHECKPOINT)
+        self.assertEqual(checkpoint.position_id, projects[1].work_completion.pk)
+
+        # Rows behind the checkpoint are not read again
+        WorkCompletion.objects.filter(project=projects[0]).update(status='pending')
+        rest = auto_approval.run(batch_size=2)
+        self.assertEqual((rest['scanned'], rest['approved'], rest['done']), (3, 3, True))
+        self.assertEqual(Project.objects.filter(status='completed').count(), 5)
+        checkpoint.refresh_from_db()
+        self.assertEqual(checkpoint.position_id, projects[4].work_completion.pk)
+
+    def test_approval_refreshes_the_parties_status_counts(self):
+        cache.clear()
+        self.submitted_project(days_ago=20)
+        self.assertEqual(stats.get_user_status_counts(self.client_user)['client']['work_submitted'], 1)
+        self.assertEqual(stats.get_user_status_counts(self.freelancer)['freelancer']['work_submitted'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            auto_approval.run()
+
+        for user, role in ((self.client_user, 'client'), (self.freelancer, 'freelancer')):
+            counts = stats.get_user_status_counts(user)[role]
+            self.assertEqual((counts['work_submitted'], counts['completed']), (0, 1))
+
+    def test_narrowed_run_keeps_to_its_rows_and_checkpoint(self):
+        mine, other = self.submitted_project(days_ago=20), self.submitted_project(days_ago=25)
+
+        result = auto_approval.run(
+            checkpoint_name='narrowed', work=WorkCompletion.objects.filter(project=mine)
+        )
+
+        self.assertEqual((result['scanned'], result['approved']), (1, 1))
+        self.assertEqual(Project.objects.get(pk=mine.pk).status, 'completed')
+        self.assertEqual(Project.objects.get(pk=other.pk).status, 'work_submitted')
+        self.assertEqual(list(SweepCheckpoint.objects.values_list('name', flat=True)), ['narrowed'])
+
+
+class LedgerTests(MarketplaceTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def completed_project(self, amount=800):
+        project, _ = self.create_hired_project(
+            amount=amount, work_status='completed', status='completed', payment_status='escrowed', version=3
+        )
+        return project
+
+    def test_release_posts_balanced_journals(self):
+        project = self.completed_project(amount=Decimal('799.95'))
+        ledger.record_release(project.pk, self.client_user.pk, self.freelancer.pk, project.bids.get().amount)
+
+        entries = LedgerEntry.objects.filter(project=project)
+        self.assertEqual(sorted(set(entries.values_list('kind', flat=True))), ['escrow_funded', 'fee', 'payout'])
+        for journal_id in set(entries.values_list('journal_id', flat=True)):
+            self.assertEqual(sum(entries.filter(journal_id=journal_id).values_list('amount', flat=True)), 0)
+
+        self.assertEqual(ledger.balance(self.client_user.pk).balance, Decimal('-799.95'))
+        self.assertEqual(ledger.balance(self.freelancer.pk).credits, Decimal('719.95'))
+        self.assertEqual(ledger.balance(None, account='platform').balance, Decimal('80.00'))
+        self.assertEqual(ledger.balance(None, account='escrow').balance, 0)
+
+    def test_balance_is_latest_snapshot_plus_later_entries(self):
+        first, second, third = (self.completed_project() for _ in range(3))
+        ledger.record_release(first.pk, self.client_user.pk, self.freelancer.pk, 100)
+        ledger.record_release(second.pk, self.client_user.pk, self.freelancer.pk, 200)
+        # client, freelancer, escrow and platform
+        self.assertEqual(ledger.take_snapshots(), 4)
+        self.assertEqual(ledger.take_snapshots(), 0)
+        ledger.record_release(third.pk, self.client_user.pk, self.freelancer.pk, 50)
+        ledger.record_refund(third.pk, self.client_user.pk, 20)
+
+        # checkpoint, latest snapshots, entries since the checkpoint
+        with self.assertNumQueries(3):
+            balances = ledger.balances([self.client_user.pk, self.freelancer.pk])
+        self.assertEqual(balances[self.client_user.pk], ledger.Balance(Decimal('20'), Decimal('370')))
+        self.assertEqual(balances[self.freelancer.pk].credits, Decimal('315'))
+
+        ledger.take_snapshots()
+        self.assertEqual(ledger.balances([self.client_user.pk, self.freelancer.pk]), balances)
+        self.assertEqual(ledger.balance(None, account='platform').balance, Decimal('35'))
+
+    def test_earnings_count_payouts_only(self):
+        paid, refunded = self.completed_project(), self.completed_project()
+        ledger.record_release(paid.pk, self.client_user.pk, self.freelancer.pk, 100)
+        # The freelancer also hires, and has a charge refunded to them as a client
+        ledger.record_refund(refunded.pk, self.freelancer.pk, 40)
+
+        self.assertEqual(ledger.balance(self.freelancer.pk).credits, Decimal('130.00'))
+        self.assertEqual(ledger.earnings(self.freelancer.pk), Decimal('90.00'))
+        self.assertEqual(ledger.earnings(self.client_user.pk), 0)
+
+        # Read from the latest snapshot plus the payouts since
+        ledger.take_snapshots()
+        ledger.record_release(self.completed_project().pk, self.client_user.pk, self.freelancer.pk, 50)
+        with self.assertNumQueries(3):
+            self.assertEqual(ledger.earnings(self.freelancer.pk), Decimal('135.00'))
+        self.assertEqual(
+            BalanceSnapshot.objects.get(account='user', user=self.freelancer).earnings, Decimal('90.00')
+        )
+
+    def test_entries_are_append_only(self):
+        entry = ledger.record_refund(None, self.client_user.pk, 20)[0]
+        entry.amount = 30
+        with self.assertRaises(TypeError):
+            entry.save()
+        with self.assertRaises(TypeError):
+            LedgerEntry.objects.filter(pk=entry.pk).update(amount=30)
+        with self.assertRaises(ValueError):
+            ledger.journal('refund', [('escrow', None, Decimal('-1')), ('user', self.client_user.pk, 2)])
+
+    def test_dashboard_reads_earnings_from_the_ledger(self):
+        ledger.record_release(self.completed_project().pk, self.client_user.pk, self.freelancer.pk, 500)
+        self.client.force_login(self.freelancer)
+        response = self.client.get(reverse('freelancer-dashboard'))
+        self.assertEqual(response.context['total_earnings'], Decimal('450.00'))
+
+
+    def test_client_dashboard_leaves_earnings_out_of_spending(self):
+        paid, refunded = self.completed_project(amount=500), self.completed_project()
+        ledger.record_release(paid.pk, self.client_user.pk, self.freelancer.pk, 500)
+        ledger.record_refund(refunded.pk, self.client_user.pk, 40)
+        # The client also takes on work and gets paid for it
+        hired_by = create_user('other_client', 'client')
+        ledger.record_release(self.completed_project().pk, hired_by.pk, self.client_user.pk, 200)
+
+        self.client.force_login(self.client_user)
+        response = self.client.get(reverse('client-dashboard'))
+        self.assertEqual(response.context['total_spending'], Decimal('500.00'))
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class PaymentPipelineTests(MarketplaceTestCase):
+
+    def setUp(self):
+        cache.clear()
+        gateways.get_gateway().clear()
+        run_tasks_eagerly(self)
+
+        self.project, _ = self.create_hired_project(
+            amount=Decimal('799.95'), work_status='completed', status='completed', payment_status='escrowed',
+            version=3,
+        )
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(payments.group_name(self.project.pk), self.channel)
+
+    def pushed_statuses(self):
+        statuses = []
+        while True:
+            try:
+                event = async_to_sync(asyncio.wait_for)(self.layer.receive(self.channel), 0.01)
+            except asyncio.TimeoutError:
+                return statuses
+            statuses.append(event['status'])
+
+    def pay(self, version=3, execute=True):
+        self.client.force_login(self.client_user)
+        with self.captureOnCommitCallbacks(execute=execute) as callbacks:
+            response = self.client.post(reverse('projects:initiate-payment', args=[self.project.pk]), {
+                'payment_method': 'card', 'notes': '', 'version': version,
+            })
+        return response, callbacks
+
+    def test_payment_is_queued_then_settled(self):
+        response, _ = self.pay()
+        self.assertRedirects(response, reverse('projects:project-detail', args=[self.project.pk]), fetch_redirect_response=False)
+
+        payment = Payment.objects.get(project=self.project)
+        self.assertEqual(payment.status, 'completed')
+        self.assertTrue(payment.transaction_id.startswith('LOCAL-'))
+        self.assertEqual((payment.platform_fee, payment.net_amount), (Decimal('80.00'), Decimal('719.95')))
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.payment_status, self.project.version), ('released', 5))
+        self.assertEqual(ledger.balance(self.freelancer.pk).credits, Decimal('719.95'))
+        self.assertEqual(self.pushed_statuses(), ['pending', 'processing', 'completed'])
+
+    def test_repeated_processing_settles_once(self):
+        self.pay()
+        payment = Payment.objects.get(project=self.project)
+        self.assertEqual(payments.process(payment.pk), 'completed')
+        self.assertEqual(LedgerEntry.objects.filter(payment=payment).count(), 6)
+        self.assertEqual(gateways.get_gateway().refunded, set())
+
+    def test_declined_payment_is_reported_and_can_be_retried(self):
+        # The request returns before the worker runs
+        _, callbacks = self.pay(execute=False)
+        payment = Payment.objects.get(project=self.project)
+        self.assertEqual(payment.status, 'pending')
+        gateways.get_gateway().decline(payment.reference_number)
+        with self.captureOnCommitCallbacks(execute=True):
+            for callback in callbacks:
+                callback()
+
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.error_message), ('failed', 'Card declined.'))
+        self.assertFalse(LedgerEntry.objects.exists())
+        self.assertEqual(self.pushed_statuses(), ['pending', 'processing', 'failed'])
+
+        self.pay(version=4)
+        retried = Payment.objects.get(project=self.project)
+        self.assertEqual(retried.status, 'completed')
+        self.assertNotEqual(retried.reference_number, payment.reference_number)
+
+    def test_charge_for_a_project_that_moved_on_is_refunded(self):
+        _, callbacks = self.pay(execute=False)
+        Project.objects.filter(pk=self.project.pk).update(status='cancelled')
+        with self.captureOnCommitCallbacks(execute=True):
+            for callback in callbacks:
+                callback()
+
+        payment = Payment.objects.get(project=self.project)
+        self.assertEqual(payment.status, 'failed')
+        self.assertEqual(gateways.get_gateway().refunded, {payment.transaction_id})
+        self.assertEqual(
+            sorted(LedgerEntry.objects.filter(payment=payment).values_list('kind', flat=True)),
+            ['escrow_funded', 'escrow_funded', 'refund', 'refund'],
+        )
+        self.assertEqual(
+            ledger.balance(self.client_user.pk), ledger.Balance(Decimal('799.95'), Decimal('799.95'))
+        )
+        self.assertEqual(ledger.balance(None, account='escrow').balance, 0)
+
+    def test_payment_in_flight_cannot_be_started_twice(self):
+        self.pay(execute=False)
+        response, _ = self.pay(version=4)
+        self.assertRedirects(response, reverse('projects:project-detail', args=[self.project.pk]), fetch_redirect_response=False)
+        self.assertEqual(Payment.objects.get(project=self.project).status, 'pending')
+        self.assertEqual(Project.objects.get(pk=self.project.pk).version, 4)
+
+    def test_payment_left_processing_by_a_dead_worker_is_requeued(self):
+        self.pay(execute=False)
+        payment = Payment.objects.get(project=self.project)
+        # The worker dies between marking the payment processing and charging it
+        with mock.patch.object(gateways.LocalGateway, 'charge', side_effect=SystemExit):
+            with self.assertRaises(SystemExit):
+                payments.process(payment.pk)
+        self.assertEqual(Payment.objects.get(pk=payment.pk).status, 'processing')
+
+        self.assertEqual(payments.requeue_stale(), 0)
+        Payment.objects.filter(pk=payment.pk).update(
+            initiated_at=timezone.now() - payments.REQUEUE_AFTER - timedelta(seconds=1)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(payments.requeue_stale(), 1)
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'completed')
+        self.assertEqual(Project.objects.get(pk=self.project.pk).payment_status, 'released')
+
+
+class SettlementTests(MarketplaceTestCase):
+    freelancer_count = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.period = timezone.localdate() - timedelta(days=1)
+
+    def payment(self, freelancer, amount, completed_at, status='completed', currency='USD'):
+        project, bid = self.create_hired_project(
+            freelancer, amount, work_status='completed', status='completed', payment_status='released'
+        )
+        payment = Payment(
+            project=project, bid=bid, payer=self.client_user, payee=freelancer, amount=amount,
+            payment_method='card', status=status, completed_at=completed_at, currency=currency,
+            reference_number=f'SKL-{project.pk:08d}', transaction_id=f'TXN-{project.pk:012d}',
+        )
+        payment.calculate_net_amount()
+        payment.save()
+        return payment
+
+    def settled_day(self, hour):
+        return timezone.make_aware(datetime.combine(self.period, time(hour)))
+
+    def test_payments_are_grouped_per_payee(self):
+        first, second = self.freelancers
+        self.payment(first, Decimal('100.00'), self.settled_day(9))
+        self.payment(first, Decimal('55.55'), self.settled_day(23))
+        self.payment(second, Decimal('200.00'), self.settled_day(12))
+        self.payment(second, Decimal('300.00'), self.settled_day(12), status='failed')
+        self.payment(second, Decimal('400.00'), settlement.get_cutoff(self.period))
+
+        result = settlement.settle(self.period)
+
+        self.assertEqual((result['payments'], result['batches'], result['done']), (3, 2, True))
+        batches = {batch.payee_id: batch for batch in PayoutBatch.objects.filter(period=self.period)}
+        self.assertEqual(
+            (batches[first.pk].total_amount, batches[first.pk].payment_count), (Decimal('139.99'), 2)
+        )
+        self.assertEqual(
+            (batches[second.pk].total_amount, batches[second.pk].payment_count), (Decimal('180.00'), 1)
+        )
+        self.assertEqual(
+            sum(line.amount for line in batches[first.pk].lines.all()), batches[first.pk].total_amount
+        )
+
+        # Running the same day again settles nothing new
+        again = settlement.settle(self.period)
+        self.assertEqual((again['payments'], again['done']), (0, True))
+        self.assertEqual(PayoutLine.objects.count(), 3)
+
+    def test_interrupted_run_resumes_into_the_same_batches(self):
+        first, second = self.freelancers
+        for hour in range(6):
+            self.payment(self.freelancers[hour % 2], Decimal('10.00'), self.settled_day(hour))
+
+        partial = settlement.settle(self.period, chunk_size=2, max_chunks=2)
+        self.assertEqual((partial['payments'], partial['done']), (4, False))
+
+        with self.assertNumQueries(8):
+            # Checkpoint lock, rows, existing batches, lines, totals,
+            # checkpoint save and the savepoint pair
+            settlement.settle_chunk(self.period, settlement.get_cutoff(self.period), 2)
+        rest = settlement.settle(self.period, chunk_size=2)
+        self.assertEqual((rest['payments'], rest['done']), (0, True))
+
+        batches = PayoutBatch.objects.filter(period=self.period)
+        self.assertEqual(batches.count(), 2)
+        self.assertEqual(
+            sorted(batches.values_list('payment_count', 'total_amount')),
+            [(3, Decimal('27.00')), (3, Decimal('27.00'))],
+        )
+        self.assertEqual(PayoutLine.objects.values('payment').distinct().count(), 6)
+
+    def test_narrowed_run_keeps_to_its_payments_and_checkpoint(self):
+        first, second = self.freelancers
+        mine = self.payment(first, Decimal('100.00'), self.settled_day(9))
+        self.payment(second, Decimal('200.00'), self.settled_day(10))
+
+        result = settlement.settle(
+            self.period, checkpoint_name='narrowed', payments=Payment.objects.filter(pk=mine.pk)
+        )
+
+        self.assertEqual((result['payments'], result['batches']), (1, 1))
+        self.assertEqual(list(PayoutLine.objects.values_list('payment_id', flat=True)), [mine.pk])
+        self.assertEqual(list(SweepCheckpoint.objects.values_list('name', flat=True)), ['narrowed'])
+
+    def test_payee_paid_in_two_currencies_gets_a_batch_per_currency(self):
+        first, second = self.freelancers
+        self.payment(first, Decimal('100.00'), self.settled_day(9), currency='EUR')
+        self.payment(first, Decimal('50.00'), self.settled_day(10))
+        self.payment(second, Decimal('20.00'), self.settled_day(11), currency='EUR')
+
+        # One payment per chunk, so each chunk touches one of the payee's batches
+        result = settlement.settle(self.period, chunk_size=1)
+
+        self.assertEqual((result['payments'], result['batches'], result['done']), (3, 3, True))
+        self.assertEqual(
+            sorted(PayoutBatch.objects.values_list('payee_id', 'currency', 'payment_count', 'total_amount')),
+            sorted([
+                (first.pk, 'EUR', 1, Decimal('90.00')), (first.pk, 'USD', 1, Decimal('45.00')),
+                (second.pk, 'EUR', 1, Decimal('18.00')),
+            ]),
+        )
+
+    def test_run_that_died_keeps_its_totals_when_the_next_day_settles(self):
+        first, second = self.freelancers
+        for hour in range(4):
+            self.payment(self.freelancers[hour % 2], Decimal('10.00'), self.settled_day(hour))
+
+        # The run for the period stops after one chunk and never comes back
+        settlement.settle(self.period, chunk_size=2, max_chunks=1)
+        next_period = self.period + timedelta(days=1)
+        self.payment(first, Decimal('20.00'), settlement.get_cutoff(self.period) + timedelta(hours=1))
+        result = settlement.settle(next_period, chunk_size=2)
+        self.assertEqual((result['payments'], result['done']), (3, True))
+
+        for batch in PayoutBatch.objects.annotate(lines_total=Sum('lines__amount'), line_count=Count('lines')):
+            self.assertEqual((batch.total_amount, batch.payment_count), (batch.lines_total, batch.line_count))
+        self.assertEqual(
+            sorted(PayoutBatch.objects.values_list('period', 'payee_id', 'payment_count', 'total_amount')),
+            sorted([
+                (self.period, first.pk, 1, Decimal('9.00')), (self.period, second.pk, 1, Decimal('9.00')),
+                (next_period, first.pk, 2, Decimal('27.00')), (next_period, second.pk, 1, Decimal('9.00')),
+            ]),
+        )
+
+
+class ExportTests(MarketplaceTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.staff = create_user('finance', 'client', is_staff=True)
+        cls.payments = []
+        for i, (status, days_ago) in enumerate([('completed', 3), ('completed', 1), ('failed', 1)]):
+            project, bid = cls.create_hired_project(
+                work_status='completed', title=f'Logo {i}', status='completed'
+            )
+            payment = Payment(
+                project=project, bid=bid, payer=cls.client_user, payee=cls.freelancer, amount=800,
+                payment_method='card', status=status, reference_number=f'SKL-{i}', transaction_id=f'TXN-{i}',
+            )
+            payment.calculate_net_amount()
+            payment.save()
+            Payment.objects.filter(pk=payment.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+            cls.payments.append(payment)
+
+    def export(self, dataset, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('projects:export', args=[dataset]), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_csv_export_is_filtered_by_date_and_status(self):
+        since = timezone.localdate() - timedelta(days=2)
+        response = self.export('payments', since=since.isoformat(), status='completed')
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="payments-', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['reference_number'] for row in rows], ['SKL-1'])
+        self.assertEqual(
+            (rows[0]['payer_username'], rows[0]['net_amount'], rows[0]['status']), ('client', '720.00', 'completed')
+        )
+
+    def test_jsonl_export_can_be_gzipped(self):
+        response = self.export('payments', format='jsonl', gzip='1')
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertTrue(response['Content-Disposition'].endswith('.jsonl.gz"'))
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([json.loads(line)['reference_number'] for line in lines], ['SKL-0', 'SKL-1', 'SKL-2'])
+
+    def test_export_is_staff_only(self):
+        self.client.force_login(self.client_user)
+        response = self.client.get(reverse('projects:export', args=['payments']))
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(reverse('projects:export', args=['users'])).status_code, 404)
+        response = self.client.get(reverse('projects:export', args=['reviews']), {'status': 'completed'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_management_command_writes_the_same_export(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'escrows.csv')
+        Escrow.objects.create(
+            project=self.payments[0].project, bid=self.payments[0].bid, amount=800, status='held'
+        )
+
+        call_command('export_data', 'escrows', '--status', 'held', '-o', path, stderr=io.StringIO())
+
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(
+            [(row['project_client_username'], row['bid_freelancer_username'], row['amount']) for row in rows],
+            [('client', 'freelancer', '800.00')],
+        )
+        with self.assertRaises(CommandError):
+            call_command('export_data', 'escrows', '--status', 'completed', '-o', path)
@@ -17,14 +17,21 @@ urlpatterns = [
     path('<int:project_id>/review-work/', views.ReviewWorkView.as_view(), name='review-work'),
     path('<int:project_id>/initiate-payment/', views.InitiatePaymentView.as_view(), name='initiate-payment'),
     path('<int:project_id>/write-review/', views.WriteReviewView.as_view(), name='write-review'),
+
+    path('exports/<slug:dataset>/', views.ExportView.as_view(), name='export'),
     
     path('api/create/', views.ProjectCreateAPIView.as_view(), name='api-project-create'),
     path('api/available/', views.AvailableProjectsListView.as_view(), name='api-available-projects'),
+    path('api/available/facets/', views.ProjectFacetsView.as_view(), name='api-project-facets'),
+    path('api/recommended/', views.RecommendedProjectsView.as_view(), name='api-recommended-projects'),
     path('api/<int:pk>/', views.ProjectDetailAPIView.as_view(), name='api-project-detail'),
     
     path('api/<int:project_id>/bid/create/', views.BidCreateView.as_view(), name='api-bid-create'),
     path('api/<int:project_id>/bids/', views.BidListView.as_view(), name='api-project-bids'),
+    path('api/<int:project_id>/bids/stats/', views.ProjectBidStatsView.as_view(), name='api-project-bid-stats'),
     path('api/my-bids/', views.UserBidsListView.as_view(), name='api-my-bids'),
+    path('api/bids/bulk/', views.BidBulkActionView.as_view(), name='api-bid-bulk-action'),
     path('api/bids/<int:pk>/accept/', views.BidAcceptView.as_view(), name='api-bid-accept'),
     path('api/bids/<int:pk>/reject/', views.BidRejectView.as_view(), name='api-bid-reject'),
+    path('api/bids/<int:pk>/withdraw/', views.BidWithdrawView.as_view(), name='api-bid-withdraw'),
 ]
\ No newline at end of file
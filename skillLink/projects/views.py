@@ -1,22 +1,36 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView, View
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Count, Q, Avg
+from django.db.models import Q, Max
 from django.urls import reverse_lazy
 from django.contrib import messages
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, Http404, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.utils.functional import SimpleLazyObject, cached_property
 from django.utils import timezone
-from uuid import uuid4
-from rest_framework import generics, permissions, serializers, status
+from django.db import transaction
+from rest_framework import generics, permissions, status
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Project, Bid, Escrow, WorkCompletion, Review, Payment
-from .serializers import ProjectSerializer, BidSerializer
+from .serializers import ProjectSerializer, BidSerializer, BulkBidActionSerializer
 from .permissions import IsFreelancer
-from .forms import WorkSubmissionForm, WorkReviewForm, ReviewForm, PaymentForm, QuickApproveForm
-from chat.models import ChatRoom
+from .filters import ProjectFilter, ProjectSearchFilter
+from .pagination import KeysetPagination
+from .search import get_search_backend
+from . import bid_membership, bid_stats, bidding, counters, exports, payments, recommendations, stats, workflow
+from .forms import WorkSubmissionForm, WorkReviewForm, ReviewForm, PaymentForm, QuickApproveForm, ExportForm
+from skillLink.conditional import make_etag, not_modified_response, set_validators
+from skillLink.idempotency import idempotent, mark_refused
+from skillLink.ratelimit import ratelimit
+
+# Bid-list fragments are keyed by the project's bid version, so the timeout
+# only bounds how long a freelancer's changed name or title can stay stale.
+BID_FRAGMENT_TIMEOUT = 60 * 10
 
 
 class MarketplaceView(LoginRequiredMixin, ListView):
@@ -29,8 +43,9 @@ class MarketplaceView(LoginRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['total_projects'] = Project.objects.count()
-        context['open_projects'] = Project.objects.filter(status='open').count()
+        counts = stats.get_status_counts()
+        context['total_projects'] = sum(counts.values())
+        context['open_projects'] = counts['open']
         return context
 
 
@@ -41,9 +56,7 @@ class ProjectListView(ListView):
     paginate_by = 12
 
     def get_queryset(self):
-        queryset = Project.objects.all().order_by('-created_at').annotate(
-            bid_count=Count('bids')
-        )
+        queryset = Project.objects.all().order_by('-created_at')
         
         status_filter = self.request.GET.get('status')
         if status_filter in ['open', 'in_progress', 'completed']:
@@ -51,9 +64,7 @@ class ProjectListView(ListView):
         
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(description__icontains=search)
-            )
+            queryset = get_search_backend().search(queryset, search)
         
         min_budget = self.request.GET.get('min_budget')
         max_budget = self.request.GET.get('max_budget')
@@ -66,9 +77,10 @@ class ProjectListView(ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['total_projects'] = Project.objects.count()
-        context['open_projects'] = Project.objects.filter(status='open').count()
-        context['active_projects'] = Project.objects.filter(status='in_progress').count()
+        counts = stats.get_status_counts()
+        context['total_projects'] = sum(counts.values())
+        context['open_projects'] = counts['open']
+        context['active_projects'] = counts['in_progress']
         return context
 
 
@@ -77,21 +89,52 @@ class ProjectDetailView(DetailView):
     template_name = 'projects/project_detail.html'
     context_object_name = 'project'
 
+    def get_queryset(self):
+        # The newest bid change versions the cached bid-list fragments
+        return Project.objects.select_related('client', 'freelancer').annotate(
+            bids_updated_at=Max('bids__updated_at')
+        )
+
+    @cached_property
+    def bids_by_status(self):
+        """
+        The project's bids with their freelancers, newest first, from one
+        query and grouped in Python. Only read when the cached bid-list
+        fragments have to be rendered again.
+        """
+        groups = {'open': [], 'accepted': [], 'rejected': []}
+        for bid in self.object.bids.select_related('freelancer').order_by('-created_at'):
+            group = 'open' if bid.status in Bid.OPEN_STATUSES else bid.status
+            if group in groups:
+                groups[group].append(bid)
+        return groups
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        project = self.get_object()
-        context['bids'] = project.bids.filter(status='pending').order_by('-created_at')
-        context['accepted_bids'] = project.bids.filter(status='accepted').order_by('-created_at')
-        context['declined_bids'] = project.bids.filter(status='rejected').order_by('-created_at')
+        project = self.object
+        user = self.request.user
+        context['bids'] = SimpleLazyObject(lambda: self.bids_by_status['open'])
+        context['accepted_bids'] = SimpleLazyObject(lambda: self.bids_by_status['accepted'])
+        context['declined_bids'] = SimpleLazyObject(lambda: self.bids_by_status['rejected'])
+        context['bid_version'] = (
+            project.bid_count, project.pending_bid_count,
+            project.bids_updated_at.isoformat() if project.bids_updated_at else '',
+        )
+        # The fragments show owner-only actions and the hired freelancer's chat link
+        if user.pk == project.client_id:
+            context['bid_viewer'] = 'client'
+        elif user.is_authenticated and user.pk == project.freelancer_id:
+            context['bid_viewer'] = 'freelancer'
+        else:
+            context['bid_viewer'] = 'other'
+        context['bid_fragment_timeout'] = BID_FRAGMENT_TIMEOUT
         context['user_has_bid'] = False
         context['can_bid'] = False
         
-        if self.request.user.is_authenticated:
-            context['user_has_bid'] = project.bids.filter(
-                freelancer=self.request.user
-            ).exists()
+        if user.is_authenticated:
+            context['user_has_bid'] = project.pk in bid_membership.get_project_ids(self.request)
             context['can_bid'] = (
-                self.request.user != project.client and 
+                user != project.client and 
                 project.status == 'open' and 
                 not context['user_has_bid']
             )
@@ -156,9 +199,7 @@ class MyProjectsView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         if self.request.user.role == 'client':
-            return Project.objects.filter(client=self.request.user).annotate(
-                bid_count=Count('bids')
-            ).order_by('-created_at')
+            return Project.objects.filter(client=self.request.user).order_by('-created_at')
         else:
             return Project.objects.filter(
                 Q(client=self.request.user) | Q(freelancer=self.request.user)
@@ -167,31 +208,17 @@ class MyProjectsView(LoginRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['role'] = self.request.user.role
+        counts = stats.get_user_status_counts(self.request.user)
+        as_client, as_freelancer = counts['client'], counts['freelancer']
         if self.request.user.role == 'client':
-            context['open'] = Project.objects.filter(
-                client=self.request.user, status='open'
-            ).count()
-            context['active'] = Project.objects.filter(
-                client=self.request.user, status='in_progress'
-            ).count()
-            context['completed'] = Project.objects.filter(
-                client=self.request.user, status='completed'
-            ).count()
+            context['open'] = as_client['open']
+            context['active'] = as_client['in_progress']
+            context['completed'] = as_client['completed']
         else:
-            context['posted'] = Project.objects.filter(
-                client=self.request.user
-            ).count()
-            context['accepted'] = Project.objects.filter(
-                freelancer=self.request.user
-            ).count()
-            context['active'] = Project.objects.filter(
-                Q(client=self.request.user) | Q(freelancer=self.request.user), 
-                status='in_progress'
-            ).count()
-            context['completed'] = Project.objects.filter(
-                Q(client=self.request.user) | Q(freelancer=self.request.user), 
-                status='completed'
-            ).count()
+            context['posted'] = sum(as_client.values())
+            context['accepted'] = sum(as_freelancer.values())
+            context['active'] = as_client['in_progress'] + as_freelancer['in_progress']
+            context['completed'] = as_client['completed'] + as_freelancer['completed']
         return context
 
 
@@ -202,24 +229,17 @@ class BidCreateFormView(LoginRequiredMixin, CreateView):
     success_url = reverse_lazy('projects:my-projects')
 
     def form_valid(self, form):
-        project = get_object_or_404(Project, pk=self.kwargs.get('project_pk'))
-        
-        if project.status != 'open':
-            messages.error(self.request, "This project is no longer accepting bids.")
-            return redirect('projects:project-detail', pk=project.pk)
-        
-        if project.client == self.request.user:
-            messages.error(self.request, "You cannot bid on your own project.")
-            return redirect('projects:project-detail', pk=project.pk)
-        
-        if Bid.objects.filter(project=project, freelancer=self.request.user).exists():
-            messages.error(self.request, "You have already placed a bid on this project.")
-            return redirect('projects:project-detail', pk=project.pk)
+        project_pk = self.kwargs.get('project_pk')
+        try:
+            self.object = bidding.place_bid(project_pk, self.request.user, **form.cleaned_data)
+        except bidding.BidActionError as e:
+            if e.status_code == status.HTTP_404_NOT_FOUND:
+                raise Http404(e.detail)
+            messages.error(self.request, e.detail)
+            return redirect('projects:project-detail', pk=project_pk)
         
-        form.instance.project = project
-        form.instance.freelancer = self.request.user
         messages.success(self.request, "Your bid has been submitted successfully!")
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
 
     def form_invalid(self, form):
         messages.error(self.request, "Please correct the errors below.")
@@ -237,21 +257,20 @@ class ProjectCreateAPIView(generics.CreateAPIView):
 class AvailableProjectsListView(generics.ListAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['status', 'budget']
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter, ProjectSearchFilter]
+    filterset_class = ProjectFilter
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'budget', 'bid_count']
     ordering = ['-created_at']
 
     def get_queryset(self):
-        queryset = Project.objects.filter(status='open').annotate(
-            bid_count=Count('bids')
-        ).order_by('-created_at')
+        queryset = Project.objects.filter(status='open').order_by('-created_at')
         
         if self.request.user.is_authenticated:
             queryset = queryset.exclude(client=self.request.user)
         
-        return queryset
+        return ProjectSerializer.setup_eager_loading(queryset)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -259,11 +278,95 @@ class AvailableProjectsListView(generics.ListAPIView):
         return context
 
 
+class RecommendedProjectsView(generics.ListAPIView):
+    """The freelancer's precomputed recommendation feed, minus projects they already bid on."""
+    serializer_class = ProjectSerializer
+    permission_classes = [IsFreelancer]
+    pagination_class = None
+
+    def get_queryset(self):
+        queryset = ProjectSerializer.setup_eager_loading(recommendations.get_feed(self.request.user))
+        return queryset.exclude(
+            pk__in=bid_membership.get_project_ids(self.request)
+        )[:recommendations.FEED_SIZE]
+
+
+class ProjectFacetsView(APIView):
+    """
+    Status and budget-bucket histograms for the marketplace filter sidebar.
+
+    Takes the same ``search``, ``status``, ``min_budget`` and ``max_budget``
+    parameters as the available projects list. Without search text the counts
+    come from the cached histograms in ``stats``; text searches are aggregated
+    over the matching rows of the full-text index.
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        filterset = ProjectFilter(request.query_params, queryset=Project.objects.all())
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = filterset.form.cleaned_data
+
+        queryset = None
+        query = request.query_params.get('search', '').strip()
+        if query:
+            queryset = get_search_backend().search(Project.objects.all(), query)
+
+        status_counts, bucket_counts = stats.get_facets(
+            status=params.get('status') or None,
+            min_budget=params.get('min_budget'),
+            max_budget=params.get('max_budget'),
+            queryset=queryset,
+        )
+
+        labels = dict(Project.STATUS_CHOICES)
+        budget = []
+        for bucket, count in bucket_counts.items():
+            low, high = stats.budget_bucket_bounds(bucket)
+            budget.append({'min': low, 'max': high, 'count': count})
+
+        return Response({
+            'status': [
+                {'value': value, 'label': labels[value], 'count': count}
+                for value, count in status_counts.items()
+            ],
+            'budget': budget,
+        })
+
+
 class ProjectDetailAPIView(generics.RetrieveAPIView):
-    queryset = Project.objects.all().annotate(bid_count=Count('bids'))
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_queryset(self):
+        return ProjectSerializer.setup_eager_loading(
+            Project.objects.all(), include_bids=True
+        )
+
+    def get_version(self):
+        # Cheap single-row query: the project's own timestamp and counters
+        # plus the newest bid change cover everything the payload shows.
+        version = Project.objects.filter(pk=self.kwargs['pk']).annotate(
+            bids_updated_at=Max('bids__updated_at')
+        ).values_list('updated_at', 'bid_count', 'pending_bid_count', 'bids_updated_at').first()
+        if version is None:
+            raise Http404
+        return version
+
+    def retrieve(self, request, *args, **kwargs):
+        updated_at, bid_count, pending_bid_count, bids_updated_at = self.get_version()
+        last_modified = max(filter(None, [updated_at, bids_updated_at]))
+        etag = make_etag(
+            self.kwargs['pk'], updated_at.isoformat(), bid_count, pending_bid_count,
+            bids_updated_at.isoformat() if bids_updated_at else '', request.user.pk
+        )
+
+        response = not_modified_response(request, etag, last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['include_bids'] = True
@@ -277,34 +380,25 @@ class BidCreateView(generics.CreateAPIView):
     def get_queryset(self):
         return Bid.objects.none()
 
-    def perform_create(self, serializer):
-        project_id = self.kwargs.get('project_id')
-        project = get_object_or_404(Project, id=project_id)
-
-        if project.status != 'open':
-            raise serializers.ValidationError("This project is no longer accepting bids.")
-
-        if project.client == self.request.user:
-            raise serializers.ValidationError("You cannot bid on your own project.")
-
-        if Bid.objects.filter(project=project, freelancer=self.request.user).exists():
-            raise serializers.ValidationError("You have already placed a bid on this project.")
-
-        serializer.save(freelancer=self.request.user, project=project)
-
+    @method_decorator(ratelimit('bid-create', '20/m'))
+    @idempotent
     def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
         try:
-            return super().create(request, *args, **kwargs)
-        except serializers.ValidationError as e:
-            return Response(
-                {'detail': str(e.detail[0]) if e.detail else 'Validation error'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            bid = bidding.place_bid(self.kwargs.get('project_id'), request.user, **serializer.validated_data)
+        except bidding.BidActionError as e:
+            return Response({'detail': e.detail}, status=e.status_code)
+        
+        serializer.instance = bid
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 class BidListView(generics.ListAPIView):
     serializer_class = BidSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         project_id = self.kwargs.get('project_id')
@@ -313,15 +407,41 @@ class BidListView(generics.ListAPIView):
         if self.request.user != project.client:
             return Bid.objects.none()
         
-        return Bid.objects.filter(project=project).order_by('-created_at')
+        return BidSerializer.setup_eager_loading(
+            Bid.objects.filter(project=project).order_by('-created_at')
+        )
+
+
+class ProjectBidStatsView(APIView):
+    """Bid price and delivery-time distribution for the project owner."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, project_id):
+        project = get_object_or_404(Project.objects.only('client_id'), pk=project_id)
+        if project.client_id != request.user.pk:
+            return Response(
+                {'detail': 'Only the project owner can view bid statistics.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        distribution = bid_stats.get_bid_stats(project_id)
+        return Response({
+            'count': distribution['count'],
+            'amount': distribution['amount'],
+            'delivery_days': distribution['delivery_days'],
+            'bids': [{'id': pk, **position} for pk, position in distribution['bids'].items()],
+        })
 
 
 class UserBidsListView(generics.ListAPIView):
     serializer_class = BidSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return Bid.objects.filter(freelancer=self.request.user).order_by('-created_at')
+        return BidSerializer.setup_eager_loading(
+            Bid.objects.filter(freelancer=self.request.user).order_by('-created_at')
+        )
 
 
 class BidAcceptView(generics.UpdateAPIView):
@@ -332,25 +452,10 @@ class BidAcceptView(generics.UpdateAPIView):
         return Bid.objects.all()
     
     def update(self, request, *args, **kwargs):
-        bid = self.get_object()
-        project = bid.project
-        
-        if project.client != request.user:
-            return Response(
-                {'detail': 'Only the project owner can accept bids.'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        project.freelancer = bid.freelancer
-        project.status = 'in_progress'
-        project.save()
-        
-        ChatRoom.objects.get_or_create(project=project)
-        
-        Bid.objects.filter(project=project).exclude(id=bid.id).update(status='rejected')
-        
-        bid.status = 'accepted'
-        bid.save()
+        try:
+            bid = bidding.accept_bid(self.get_object(), request.user)
+        except bidding.BidActionError as e:
+            return Response({'detail': e.detail}, status=e.status_code)
         
         serializer = self.get_serializer(bid)
         return Response(serializer.data)
@@ -373,251 +478,316 @@ class BidRejectView(generics.UpdateAPIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        bid.status = 'rejected'
-        bid.save()
+        # Only the request whose UPDATE moves the bid out of pending closes
+        # it in the counter, however many rejects race for the same bid
+        with transaction.atomic():
+            bids = Bid.objects.filter(pk=bid.pk)
+            closed = bids.filter(status='pending').update(status='rejected', updated_at=timezone.now())
+            if closed:
+                counters.pending_bids_closed(project.id, closed)
+            elif not bids.filter(status__in=Bid.OPEN_STATUSES).update(
+                status='rejected', updated_at=timezone.now()
+            ):
+                return Response(
+                    {'detail': 'Only pending or shortlisted bids can be rejected.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            project_id = project.id
+            transaction.on_commit(lambda: bid_stats.invalidate(project_id))
+        bid.refresh_from_db()
         
         serializer = self.get_serializer(bid)
         return Response(serializer.data)
 
 
-class SubmitWorkView(LoginRequiredMixin, FormView):
-    form_class = WorkSubmissionForm
-    template_name = 'projects/submit_work.html'
+class BidWithdrawView(generics.UpdateAPIView):
+    serializer_class = BidSerializer
+    permission_classes = [permissions.IsAuthenticated, IsFreelancer]
     
-    def get_project_and_bid(self):
-        project_id = self.kwargs.get('project_id')
-        project = get_object_or_404(Project, id=project_id)
-        bid = get_object_or_404(Bid, project=project, status='accepted')
-        return project, bid
+    def get_queryset(self):
+        return Bid.objects.filter(freelancer=self.request.user)
+    
+    def update(self, request, *args, **kwargs):
+        bid = self.get_object()
+        
+        # The status is checked by the UPDATEs themselves, so of two racing
+        # withdraws only one changes the bid and closes it in the counter
+        with transaction.atomic():
+            bids = Bid.objects.filter(pk=bid.pk)
+            closed = bids.filter(status='pending').update(status='withdrawn', updated_at=timezone.now())
+            if closed:
+                counters.pending_bids_closed(bid.project_id, closed)
+            elif not bids.filter(status__in=Bid.OPEN_STATUSES).update(
+                status='withdrawn', updated_at=timezone.now()
+            ):
+                return Response(
+                    {'detail': 'Only pending or shortlisted bids can be withdrawn.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # Withdrawn bids leave the price distribution
+            project_id = bid.project_id
+            transaction.on_commit(lambda: bid_stats.invalidate(project_id))
+        bid.refresh_from_db()
+        
+        serializer = self.get_serializer(bid)
+        return Response(serializer.data)
+
+
+class BidBulkActionView(generics.GenericAPIView):
+    """
+    Reject, shortlist or withdraw many bids in one request.
+
+    Body: ``{"ids": [1, 2, 3], "action": "reject"}``. Clients may reject and
+    shortlist bids on their projects, freelancers may withdraw their own.
+    Responds with a result per bid id.
+    """
+    serializer_class = BulkBidActionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        results = bidding.moderate_bids(
+            serializer.validated_data['ids'], serializer.validated_data['action'], request.user
+        )
+        return Response({
+            'action': serializer.validated_data['action'],
+            'results': [{'id': pk, 'result': result} for pk, result in results.items()],
+            'updated': sum(result in dict(Bid.BID_STATUS_CHOICES) for result in results.values()),
+        })
+
+
+def posted_version(request):
+    """The project version a workflow form was rendered with, when it sent one."""
+    try:
+        return int(request.POST['version'])
+    except (KeyError, ValueError):
+        return None
+
+
+class ProjectWorkflowMixin:
+    """
+    Shared lookups for the views of a project's delivery workflow.
+
+    The project (with client, freelancer and work submission), its accepted
+    bid and the requesting user's part in it are each resolved once per
+    request, however many times dispatch, get_context_data and form_valid
+    ask for them. ``dispatch`` turns away users who are not the
+    ``workflow_party`` (``'client'``, ``'freelancer'`` or ``'either'``) and
+    projects for which ``workflow_state_error()`` returns a message.
+    """
+    workflow_party = 'client'
+    workflow_denied_message = "You don't have permission to access this project."
+    
+    @cached_property
+    def project(self):
+        return get_object_or_404(
+            Project.objects.select_related('client', 'freelancer', 'work_completion'),
+            pk=self.kwargs.get('project_id'),
+        )
+    
+    @cached_property
+    def accepted_bid(self):
+        return Bid.objects.select_related('freelancer').filter(
+            project_id=self.project.pk, status='accepted'
+        ).first()
+    
+    @cached_property
+    def work_completion(self):
+        try:
+            return self.project.work_completion
+        except WorkCompletion.DoesNotExist:
+            return None
     
-    def test_freelancer_permission(self):
-        project, bid = self.get_project_and_bid()
-        return self.request.user == bid.freelancer
+    @cached_property
+    def is_client(self):
+        return self.request.user.pk == self.project.client_id
+    
+    @cached_property
+    def is_freelancer(self):
+        return self.project.freelancer_id is not None and self.request.user.pk == self.project.freelancer_id
+    
+    def has_workflow_permission(self):
+        if self.workflow_party == 'client':
+            return self.is_client
+        if self.workflow_party == 'freelancer':
+            return self.is_freelancer
+        return self.is_client or self.is_freelancer
+    
+    def workflow_state_error(self):
+        return None
     
     def dispatch(self, request, *args, **kwargs):
-        if not self.test_freelancer_permission():
-            messages.error(request, "You don't have permission to submit work on this project.")
+        if not self.has_workflow_permission():
+            messages.error(request, self.workflow_denied_message)
             return redirect('projects:project-list')
         
-        project, _ = self.get_project_and_bid()
-        if project.status not in ['in_progress']:
-            messages.error(request, "This project is not in progress.")
-            return redirect('projects:project-detail', pk=project.id)
+        error = self.workflow_state_error()
+        if error:
+            messages.error(request, error)
+            return redirect('projects:project-detail', pk=self.project.pk)
         
         return super().dispatch(request, *args, **kwargs)
+
+
+class SubmitWorkView(LoginRequiredMixin, ProjectWorkflowMixin, FormView):
+    form_class = WorkSubmissionForm
+    template_name = 'projects/submit_work.html'
+    workflow_party = 'freelancer'
+    workflow_denied_message = "You don't have permission to submit work on this project."
+    
+    def workflow_state_error(self):
+        if self.project.status != 'in_progress':
+            return "This project is not in progress."
+        return None
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        project, bid = self.get_project_and_bid()
-        context['project'] = project
-        context['bid'] = bid
-        
-        try:
-            context['existing_work'] = WorkCompletion.objects.get(bid=bid)
-        except WorkCompletion.DoesNotExist:
-            context['existing_work'] = None
-        
+        context['project'] = self.project
+        context['bid'] = self.accepted_bid
+        context['existing_work'] = self.work_completion
         return context
     
     def form_valid(self, form):
-        project, bid = self.get_project_and_bid()
-        
-        work_completion, created = WorkCompletion.objects.get_or_create(
-            bid=bid,
-            defaults={'project': project}
-        )
-        
-        work_completion.submission_notes = form.cleaned_data['submission_notes']
-        work_completion.submission_files_link = form.cleaned_data['submission_files_link']
-        work_completion.status = 'pending'
-        work_completion.save()
-        
-        bid.work_status = 'submitted'
-        bid.submitted_at = timezone.now()
-        bid.save()
-        
-        project.status = 'work_submitted'
-        project.save()
+        project_id = self.kwargs.get('project_id')
+        try:
+            project, _, _ = workflow.apply_transition(
+                'submit_work', project_id, self.request.user,
+                expected_version=posted_version(self.request),
+                work_fields={
+                    'submission_notes': form.cleaned_data['submission_notes'],
+                    'submission_files_link': form.cleaned_data['submission_files_link'],
+                },
+            )
+        except workflow.TransitionError as e:
+            messages.error(self.request, e.detail)
+            return redirect('projects:project-detail', pk=project_id)
         
         messages.success(self.request, 'Your work has been submitted! The client will review it shortly.')
         return redirect('projects:project-detail', pk=project.id)
 
 
-class ReviewWorkView(LoginRequiredMixin, FormView):
+class ReviewWorkView(LoginRequiredMixin, ProjectWorkflowMixin, FormView):
     form_class = WorkReviewForm
     template_name = 'projects/review_work.html'
+    workflow_denied_message = "You don't have permission to review this work."
     
-    def get_work_completion(self):
-        project_id = self.kwargs.get('project_id')
-        project = get_object_or_404(Project, id=project_id)
-        work_completion = get_object_or_404(WorkCompletion, project=project)
-        return project, work_completion
-    
-    def test_client_permission(self):
-        project, _ = self.get_work_completion()
-        return self.request.user == project.client
-    
-    def dispatch(self, request, *args, **kwargs):
-        if not self.test_client_permission():
-            messages.error(request, "You don't have permission to review this work.")
-            return redirect('projects:project-list')
-        
-        project, work = self.get_work_completion()
-        if project.status != 'work_submitted':
-            messages.error(request, "No submitted work to review for this project.")
-            return redirect('projects:project-detail', pk=project.id)
-        
-        return super().dispatch(request, *args, **kwargs)
+    def workflow_state_error(self):
+        if self.work_completion is None:
+            raise Http404
+        if self.project.status != 'work_submitted':
+            return "No submitted work to review for this project."
+        return None
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        project, work_completion = self.get_work_completion()
-        context['project'] = project
-        context['work'] = work_completion
+        context['project'] = self.project
+        context['work'] = self.work_completion
         return context
     
     def form_valid(self, form):
-        project, work_completion = self.get_work_completion()
+        project_id = self.kwargs.get('project_id')
         action = form.cleaned_data['action']
-        review_notes = form.cleaned_data.get('review_notes', '')
+        transition = {'approved': 'approve_work', 'revision_requested': 'request_revision'}[action]
+        try:
+            project, _, _ = workflow.apply_transition(
+                transition, project_id, self.request.user,
+                expected_version=posted_version(self.request),
+                work_fields={'review_notes': form.cleaned_data.get('review_notes', '')},
+            )
+        except workflow.TransitionError as e:
+            messages.error(self.request, e.detail)
+            return redirect('projects:project-detail', pk=project_id)
         
         if action == 'approved':
-            work_completion.status = 'approved'
-            work_completion.approved_at = timezone.now()
-            work_completion.reviewed_at = timezone.now()
-            work_completion.review_notes = review_notes
-            work_completion.save()
-            
-            bid = work_completion.bid
-            bid.work_status = 'completed'
-            bid.accepted_at = timezone.now()
-            bid.save()
-            
-            project.status = 'completed'
-            project.completed_at = timezone.now()
-            project.payment_status = 'escrowed'
-            project.save()
-            
             messages.success(self.request, 'Work approved! You can now proceed with payment.')
             return redirect('projects:initiate-payment', project_id=project.id)
         
-        elif action == 'revision_requested':
-            work_completion.status = 'revision_requested'
-            work_completion.reviewed_at = timezone.now()
-            work_completion.review_notes = review_notes
-            work_completion.revision_count += 1
-            work_completion.save()
-            
-            bid = work_completion.bid
-            bid.work_status = 'revision_requested'
-            bid.save()
-            
-            project.status = 'in_progress'
-            project.save()
-            
-            messages.success(self.request, 'Revision request sent to the freelancer.')
-            return redirect('projects:project-detail', pk=project.id)
-
-
-class InitiatePaymentView(LoginRequiredMixin, FormView):
+        messages.success(self.request, 'Revision request sent to the freelancer.')
+        return redirect('projects:project-detail', pk=project.id)
+
+
+class InitiatePaymentView(LoginRequiredMixin, ProjectWorkflowMixin, FormView):
     form_class = PaymentForm
     template_name = 'projects/initiate_payment.html'
+    workflow_denied_message = "You don't have permission to process payment for this project."
+    queued_payment = None
     
-    def get_project(self):
-        project_id = self.kwargs.get('project_id')
-        return get_object_or_404(Project, id=project_id)
+    def workflow_state_error(self):
+        if self.project.status != 'completed':
+            return "This project is not ready for payment."
+        return None
     
-    def test_client_permission(self):
-        project = self.get_project()
-        return self.request.user == project.client
-    
-    def dispatch(self, request, *args, **kwargs):
-        if not self.test_client_permission():
-            messages.error(request, "You don't have permission to process payment for this project.")
-            return redirect('projects:project-list')
-        
-        project = self.get_project()
-        if project.status != 'completed':
-            messages.error(request, "This project is not ready for payment.")
-            return redirect('projects:project-detail', pk=project.id)
-        
-        return super().dispatch(request, *args, **kwargs)
+    # On post rather than dispatch, so only requests that passed the login
+    # and workflow checks claim the key
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        # Refusals redirect too; only a queued payment is worth replaying
+        if self.queued_payment is None:
+            mark_refused(response)
+        return response
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        project = self.get_project()
-        bid = project.bids.filter(status='accepted').first()
+        project = self.project
+        bid = self.accepted_bid
         
         context['project'] = project
         context['bid'] = bid
         context['amount'] = bid.amount if bid else 0
-        context['platform_fee'] = bid.amount * 0.10 if bid else 0
-        context['net_amount'] = bid.amount * 0.90 if bid else 0
+        context['platform_fee'], context['net_amount'] = Payment.split_fee(bid.amount) if bid else (0, 0)
         
         return context
     
     def form_valid(self, form):
-        project = self.get_project()
-        bid = project.bids.filter(status='accepted').first()
-        
-        payment = Payment.objects.create(
-            project=project,
-            bid=bid,
-            payer=self.request.user,
-            payee=project.freelancer,
-            amount=bid.amount,
-            payment_method=form.cleaned_data['payment_method'],
-            notes=form.cleaned_data.get('notes', '')
-        )
-        
-        payment.calculate_net_amount()
-        payment.reference_number = f"SKL-{uuid4().hex[:8].upper()}"
-        payment.status = 'processing'
-        payment.initiated_at = timezone.now()
-        payment.save()
-        
-        payment.status = 'completed'
-        payment.completed_at = timezone.now()
-        payment.transaction_id = f"TXN-{uuid4().hex[:12].upper()}"
-        payment.save()
+        project_id = self.kwargs.get('project_id')
+        queued = []
         
-        project.payment_status = 'released'
-        project.save()
+        def queue(project, bid):
+            queued.append(payments.queue_payment(
+                project, bid, self.request.user,
+                payment_method=form.cleaned_data['payment_method'],
+                notes=form.cleaned_data.get('notes', ''),
+            ))
         
-        messages.success(self.request, f'Payment of ${payment.amount} successfully processed! The freelancer has been notified.')
-        return redirect('projects:write-review', project_id=project.id)
+        try:
+            workflow.apply_transition(
+                'initiate_payment', project_id, self.request.user,
+                expected_version=posted_version(self.request), effect=queue,
+            )
+        except workflow.TransitionError as e:
+            messages.error(self.request, e.detail)
+            return redirect('projects:project-detail', pk=project_id)
+        
+        payment = self.queued_payment = queued[0]
+        messages.success(
+            self.request,
+            f'Payment of ${payment.amount} is being processed. This page updates as soon as it completes.'
+        )
+        return redirect('projects:project-detail', pk=project_id)
 
 
-class WriteReviewView(LoginRequiredMixin, FormView):
+class WriteReviewView(LoginRequiredMixin, ProjectWorkflowMixin, FormView):
     form_class = ReviewForm
     template_name = 'projects/write_review.html'
+    workflow_party = 'either'
+    workflow_denied_message = "You don't have permission to review this project."
     
-    def get_project(self):
-        project_id = self.kwargs.get('project_id')
-        return get_object_or_404(Project, id=project_id)
-    
-    def dispatch(self, request, *args, **kwargs):
-        project = self.get_project()
-        
-        if request.user not in [project.client, project.freelancer]:
-            messages.error(request, "You don't have permission to review this project.")
-            return redirect('projects:project-list')
-        
-        if project.status != 'completed' or project.payment_status != 'released':
-            messages.error(request, "Payment must be completed before writing a review.")
-            return redirect('projects:project-detail', pk=project.id)
-        
-        return super().dispatch(request, *args, **kwargs)
+    def workflow_state_error(self):
+        if self.project.status != 'completed' or self.project.payment_status != 'released':
+            return "Payment must be completed before writing a review."
+        return None
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        project = self.get_project()
-        bid = project.bids.filter(status='accepted').first()
+        project = self.project
         
         context['project'] = project
-        context['bid'] = bid
+        context['bid'] = self.accepted_bid
         
-        if self.request.user == project.client:
+        if self.is_client:
             context['review_type'] = 'client_to_freelancer'
             context['reviewee'] = project.freelancer
             context['title_hint'] = f"Review of {project.freelancer.first_name}"
@@ -636,10 +806,10 @@ class WriteReviewView(LoginRequiredMixin, FormView):
         return context
     
     def form_valid(self, form):
-        project = self.get_project()
-        bid = project.bids.filter(status='accepted').first()
+        project = self.project
+        bid = self.accepted_bid
         
-        if self.request.user == project.client:
+        if self.is_client:
             reviewee = project.freelancer
             review_type = 'client_to_freelancer'
         else:
@@ -675,4 +845,38 @@ class WriteReviewView(LoginRequiredMixin, FormView):
             review.save()
         
         messages.success(self.request, 'Thank you for your review! It helps our community.')
-        return redirect('projects:project-detail', pk=project.id)
\ No newline at end of file
+        return redirect('projects:project-detail', pk=project.id)
+
+
+class ExportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Staff-only download of a finance dataset (``payments``, ``escrows`` or
+    ``reviews``) as CSV or JSON Lines, streamed straight from the database.
+
+    Takes ``format`` (``csv`` or ``jsonl``), ``since`` and ``until`` dates
+    (inclusive, on ``created_at``), ``status`` and ``gzip=1``.
+    """
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, dataset):
+        if dataset not in exports.DATASETS:
+            raise Http404('No such export.')
+        form = ExportForm(request.GET, statuses=exports.DATASETS[dataset].statuses)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        params = form.cleaned_data
+
+        fmt, gzip = params['format'], params['gzip']
+        chunks = exports.stream(
+            dataset, fmt, gzip, since=params['since'], until=params['until'], status=params['status'] or None,
+        )
+        if isinstance(request, ASGIRequest):
+            chunks = exports.aiter_chunks(chunks)
+        response = StreamingHttpResponse(
+            chunks, content_type='application/gzip' if gzip else exports.FORMATS[fmt][0]
+        )
+        response['Content-Disposition'] = f'attachment; filename="{exports.filename(dataset, fmt, gzip)}"'
+        response['Cache-Control'] = 'no-store'
+        return response
@@ -0,0 +1,150 @@
+"""
+Project delivery workflow: submitting work, reviewing it and paying for it.
+
+Every step is a ``Transition`` declared once in ``TRANSITIONS``: which
+project states it leaves from, the state it moves to, who may perform it and
+what it sets on the accepted bid, the work submission and the payment status.
+``apply_transition`` performs one in a single transaction: the project row is
+locked, the caller's ``expected_version`` (the version the user was shown) is
+compared with the stored one so that concurrent edits are refused instead of
+overwriting each other, each row is saved once with ``update_fields`` and
+``transition_applied`` is sent once the transaction commits.
+"""
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from rest_framework import status
+
+from .models import Project, Bid, WorkCompletion
+
+# Sent once per committed transition with ``project``, ``transition`` (its
+# name), ``user`` and ``bid``.
+transition_applied = Signal()
+
+
+class TransitionError(Exception):
+    def __init__(self, detail, status_code=status.HTTP_409_CONFLICT):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+@dataclass(frozen=True)
+class Transition:
+    source: tuple
+    target: str
+    actor: str
+    label: str
+    # Field values applied to the accepted bid, the WorkCompletion and the project
+    bid_work_status: str = None
+    work_status: str = None
+    payment_status: str = None
+    # Allowed payment states to leave from, when the transition moves money
+    payment_source: tuple = None
+    # Per row ('project', 'bid' or 'work'): timestamp fields set to the
+    # transition time and counters incremented by one
+    stamps: dict = field(default_factory=dict)
+    increments: dict = field(default_factory=dict)
+    # Creates the WorkCompletion when there is none yet
+    creates_work: bool = False
+
+
+TRANSITIONS = {
+    'submit_work': Transition(
+        source=('in_progress',), target='work_submitted', actor='freelancer', label='submit work for',
+        bid_work_status='submitted', work_status='pending', creates_work=True,
+        stamps={'bid': ('submitted_at',), 'work': ('submitted_at',)},
+    ),
+    'approve_work': Transition(
+        source=('work_submitted',), target='completed', actor='client', label='approve work on',
+        bid_work_status='completed', work_status='approved', payment_status='escrowed',
+        stamps={'project': ('completed_at',), 'work': ('reviewed_at', 'approved_at')},
+    ),
+    'request_revision': Transition(
+        source=('work_submitted',), target='in_progress', actor='client', label='request a revision on',
+        bid_work_status='revision_requested', work_status='revision_requested',
+        stamps={'work': ('reviewed_at',)}, increments={'work': ('revision_count',)},
+    ),
+    'initiate_payment': Transition(
+        source=('completed',), target='completed', actor='client', label='pay for',
+        payment_source=('not_started', 'escrowed'),
+    ),
+    'release_payment': Transition(
+        source=('completed',), target='completed', actor='client', label='pay for',
+        payment_status='released', payment_source=('not_started', 'escrowed'),
+    ),
+}
+
+
+def _check(project, transition, user, expected_version):
+    owner_id = project.client_id if transition.actor == 'client' else project.freelancer_id
+    if owner_id != user.pk:
+        raise TransitionError(
+            f"You don't have permission to {transition.label} this project.", status.HTTP_403_FORBIDDEN
+        )
+    if expected_version is not None and project.version != expected_version:
+        raise TransitionError('This project was changed in the meantime. Reload the page and try again.')
+    if project.status not in transition.source:
+        raise TransitionError(
+            f'You cannot {transition.label} a project that is {project.get_status_display().lower()}.'
+        )
+    if transition.payment_source and project.payment_status not in transition.payment_source:
+        raise TransitionError(f'You cannot {transition.label} a project that is already paid.')
+
+
+def apply_transition(name, project_id, user, expected_version=None, work_fields=None, effect=None):
+    """
+    Perform the ``TRANSITIONS[name]`` step on a project on behalf of ``user``.
+
+    ``work_fields`` are extra WorkCompletion values (submission or review
+    notes). ``effect(project, bid)`` runs inside the transaction before
+    anything is saved, for writes specific to the step. Returns
+    ``(project, bid, work_completion)``; raises ``TransitionError``.
+    """
+    transition = TRANSITIONS[name]
+    with transaction.atomic():
+        project = Project.objects.select_for_update().get(pk=project_id)
+        _check(project, transition, user, expected_version)
+        now = timezone.now()
+
+        bid = Bid.objects.select_related('freelancer').get(project=project, status='accepted')
+        work = None
+        if transition.work_status:
+            if transition.creates_work:
+                work, _ = WorkCompletion.objects.get_or_create(bid=bid, defaults={'project': project})
+            else:
+                work = WorkCompletion.objects.get(project=project)
+
+        if effect is not None:
+            effect(project, bid)
+
+        if transition.bid_work_status:
+            _save(transition, 'bid', bid, {'work_status': transition.bid_work_status}, now)
+
+        if work is not None:
+            _save(transition, 'work', work, {'status': transition.work_status, **(work_fields or {})}, now)
+
+        changes = {'status': transition.target, 'version': project.version + 1}
+        if transition.payment_status:
+            changes['payment_status'] = transition.payment_status
+        _save(transition, 'project', project, changes, now)
+
+        transaction.on_commit(lambda: transition_applied.send(
+            sender=Project, project=project, transition=name, user=user, bid=bid
+        ))
+    return project, bid, work
+
+
+def _save(transition, row, instance, changes, now):
+    """Apply one row's changes and write only those columns."""
+    for stamp in transition.stamps.get(row, ()):
+        changes[stamp] = now
+    for counter in transition.increments.get(row, ()):
+        changes[counter] = getattr(instance, counter) + 1
+    for field_name, value in changes.items():
+        setattr(instance, field_name, value)
+    # auto_now columns are only refreshed when listed
+    auto_now = [f.name for f in instance._meta.concrete_fields if getattr(f, 'auto_now', False)]
+    instance.save(update_fields=[*changes, *auto_now])
@@ -0,0 +1,27 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def not_modified_response(request, etag, last_modified=None):
+    """Return a 304 response when the client's If-None-Match / If-Modified-Since match, else None."""
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Payloads include per-user fields, so caches must key on the credentials
+    patch_vary_headers(response, ('Authorization', 'Cookie'))
+    return response
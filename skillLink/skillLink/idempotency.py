@@ -0,0 +1,135 @@
+"""
+``Idempotency-Key`` support for write endpoints.
+
+A client that may retry a POST sends the same ``Idempotency-Key`` header on
+every attempt. The first attempt runs normally and its response is kept in
+the cache for ``IDEMPOTENCY_KEY_TTL`` seconds; later attempts get the stored
+response back (marked with ``Idempotent-Replayed: true``) without touching
+the write path. Keys are scoped to the user and the URL, and reusing a key
+with a different request body is refused.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+DEFAULT_TTL = 60 * 60 * 24
+# Bounds how long a crashed attempt blocks retries of the same key
+LOCK_TIMEOUT = 60
+
+# Stored alongside content so replays look like the original
+REPLAYED_HEADERS = ('Content-Type', 'Location')
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+def _cache_key(request, key):
+    scope = f'{request.user.pk}:{request.method}:{request.path}:{key}'
+    return f'idempotency:{_digest(scope)}'
+
+
+def _fingerprint(request):
+    data = getattr(request, 'data', None)
+    if data is None:
+        data = request.POST
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    return _digest(json.dumps(data, sort_keys=True, default=str))
+
+
+def _freeze(response):
+    if isinstance(response, Response):
+        return {'data': response.data, 'status': response.status_code}
+    if not getattr(response, 'is_rendered', True):
+        response.render()
+    return {
+        'content': response.content,
+        'status': response.status_code,
+        'headers': {name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)},
+    }
+
+
+def _thaw(stored):
+    if 'data' in stored:
+        response = Response(stored['data'], status=stored['status'])
+    else:
+        response = HttpResponse(stored['content'], status=stored['status'])
+        for name, value in stored['headers'].items():
+            response[name] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def mark_refused(response):
+    """
+    Flag a response below 400 as a refusal so it is not stored, for form
+    views that report a refused request with a redirect or a re-rendered form.
+    """
+    response.idempotent_refused = True
+    return response
+
+
+def _succeeded(response):
+    return response.status_code < 400 and not getattr(response, 'idempotent_refused', False)
+
+
+def idempotent(view_method):
+    """
+    Make a view's ``post`` (or DRF ``create``) method replay responses for
+    repeated ``Idempotency-Key`` headers. Decorate a method that runs after
+    authentication and permission checks, so only requests allowed to act
+    claim a key.
+
+    Requests without the header, and non-POST requests, run unchanged. Only
+    successful responses are stored: a refused or failed request (a status of
+    400 or more, or one passed through ``mark_refused``) wrote nothing, so a
+    retry simply runs it again.
+    """
+    @wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if request.method != 'POST' or not key or not request.user.is_authenticated:
+            return view_method(view, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return JsonResponse({'detail': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters.'}, status=400)
+
+        cache_key = _cache_key(request, key)
+        lock_key = f'{cache_key}:lock'
+        fingerprint = _fingerprint(request)
+
+        stored = cache.get(cache_key)
+        if stored is None:
+            if not cache.add(lock_key, fingerprint, LOCK_TIMEOUT):
+                return JsonResponse(
+                    {'detail': f'A request with this {HEADER} is already in progress.'}, status=409
+                )
+            try:
+                # The attempt that held the lock may have stored its response
+                # and let go between the read above and taking the lock
+                stored = cache.get(cache_key)
+                if stored is None:
+                    response = view_method(view, request, *args, **kwargs)
+                    if _succeeded(response):
+                        stored = {'fingerprint': fingerprint, 'response': _freeze(response)}
+                        ttl = getattr(settings, 'IDEMPOTENCY_KEY_TTL', DEFAULT_TTL)
+                        cache.set(cache_key, stored, ttl)
+                    return response
+            finally:
+                cache.delete(lock_key)
+
+        if stored['fingerprint'] != fingerprint:
+            return JsonResponse(
+                {'detail': f'This {HEADER} was already used with a different request.'}, status=422
+            )
+        return _thaw(stored['response'])
+
+    return wrapper
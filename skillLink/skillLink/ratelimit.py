@@ -0,0 +1,278 @@
+"""
+Sliding-window rate limiting for views and WebSocket consumers.
+
+Each limited endpoint has a scope (``'bid-create'``) and a rate such as
+``'30/m'`` or ``'5/10s'``. Every request records a hit against one counter
+per identity (the user and/or the client IP); once a counter holds ``limit``
+hits within the trailing window the request is refused straight away with
+429 and a ``Retry-After`` header, so a flood costs a counter check instead of
+a worker busy with the write path. A refused request is not counted against
+any of its identities.
+
+On top of the per-identity rates, limited views shed load: once
+``RATELIMIT_MAX_IN_FLIGHT`` requests to limited views are being served by
+this process, further ones are refused with 503 and a ``Retry-After`` header
+instead of queueing behind them until they time out.
+
+Counters live in the backend named by ``RATELIMIT_BACKEND``: the default
+``LocalMemoryBackend`` counts per process, ``RedisBackend`` shares the
+counters between processes. ``RATELIMIT_RATES`` overrides a scope's rate
+(``None`` switches the scope off) and ``RATELIMIT_ENABLED`` switches
+limiting and load shedding off altogether.
+"""
+import logging
+import math
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'skillLink.ratelimit.LocalMemoryBackend'
+
+RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+# Seconds a shed request is told to wait before retrying
+SHED_RETRY_AFTER = 1
+
+
+def parse_rate(rate):
+    """Return ``(limit, window_seconds)`` for a rate such as ``'30/m'`` or ``'5/10s'``."""
+    match = RATE_RE.match(rate)
+    if not match:
+        raise ValueError(f'Invalid rate {rate!r}; expected e.g. "30/m" or "5/10s".')
+    limit, multiplier, unit = match.groups()
+    return int(limit), int(multiplier or 1) * UNIT_SECONDS[unit]
+
+
+class LocalMemoryBackend:
+    """Per-process sliding-window log of hit timestamps."""
+
+    # Forget idle counters every this many hits so memory stays bounded
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._since_sweep = 0
+
+    def hit(self, keys, limit, window):
+        """
+        Record a hit against each of ``keys`` unless one of them is at its
+        limit; return the seconds to wait (0 when allowed). A refused hit is
+        recorded against none of them.
+        """
+        now = time.monotonic()
+        with self._lock:
+            logs = []
+            for key in keys:
+                hits, _ = self._hits.get(key) or (deque(), window)
+                while hits and hits[0] <= now - window:
+                    hits.popleft()
+                if len(hits) >= limit:
+                    return hits[0] + window - now
+                logs.append((key, hits))
+            for key, hits in logs:
+                hits.append(now)
+                self._hits[key] = (hits, window)
+
+            self._since_sweep += 1
+            if self._since_sweep >= self.SWEEP_EVERY:
+                self._sweep(now)
+            return 0
+
+    def _sweep(self, now):
+        self._hits = {
+            key: (hits, window) for key, (hits, window) in self._hits.items()
+            if hits and hits[-1] > now - window
+        }
+        self._since_sweep = 0
+
+    def clear(self):
+        with self._lock:
+            self._hits.clear()
+
+
+class RedisBackend:
+    """Sliding-window log kept in a Redis sorted set per key, shared by every process."""
+
+    # Prune, count and record in one round trip and atomically, so parallel
+    # workers cannot both take the last slot. Nothing is recorded until every
+    # key has room.
+    SCRIPT = """
+        local now, window, limit = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+        for _, key in ipairs(KEYS) do
+            redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+            if redis.call('ZCARD', key) >= limit then
+                local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+                return tostring(tonumber(oldest[2]) + window - now)
+            end
+        end
+        for _, key in ipairs(KEYS) do
+            redis.call('ZADD', key, now, ARGV[4])
+            redis.call('PEXPIRE', key, math.ceil(window * 1000))
+        end
+        return '0'
+    """
+
+    def __init__(self):
+        import redis
+
+        self._redis = redis.Redis.from_url(settings.RATELIMIT_REDIS_URL)
+        self._script = self._redis.register_script(self.SCRIPT)
+
+    def hit(self, keys, limit, window):
+        wait = self._script(
+            keys=[f'ratelimit:{key}' for key in keys], args=[time.time(), window, limit, uuid.uuid4().hex]
+        )
+        return max(float(wait), 0)
+
+    def clear(self):
+        for key in self._redis.scan_iter('ratelimit:*'):
+            self._redis.delete(key)
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    return _load_backend(getattr(settings, 'RATELIMIT_BACKEND', DEFAULT_BACKEND))
+
+
+def get_rate(scope, default):
+    return getattr(settings, 'RATELIMIT_RATES', {}).get(scope, default)
+
+
+def check(scope, rate, identities):
+    """
+    Record a hit for each of ``identities`` under ``scope``, or for none of
+    them when one is already at its limit.
+
+    Returns the number of seconds to wait before retrying, or 0 when the hit
+    is allowed. Backend failures let the request through.
+    """
+    rate = get_rate(scope, rate)
+    if not rate or not identities or not getattr(settings, 'RATELIMIT_ENABLED', True):
+        return 0
+    limit, window = parse_rate(rate)
+    try:
+        return get_backend().hit([f'{scope}:{identity}' for identity in identities], limit, window)
+    except Exception as e:
+        logger.error(f"Rate limit backend failed for {scope}: {e}")
+        return 0
+
+
+class InFlightCounter:
+    """Requests to limited views being served by this process, across every scope."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def acquire(self, limit):
+        """Take a slot unless ``limit`` are taken; return whether one was taken."""
+        with self._lock:
+            if self.count >= limit:
+                return False
+            self.count += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.count -= 1
+
+
+in_flight = InFlightCounter()
+
+
+def max_in_flight():
+    """The in-flight limit, or ``None`` when load shedding is off."""
+    if not getattr(settings, 'RATELIMIT_ENABLED', True):
+        return None
+    return getattr(settings, 'RATELIMIT_MAX_IN_FLIGHT', None) or None
+
+
+def client_ip(meta):
+    forwarded = meta.get('HTTP_X_FORWARDED_FOR')
+    if forwarded and getattr(settings, 'RATELIMIT_TRUST_FORWARDED_FOR', False):
+        return forwarded.split(',')[0].strip()
+    return meta.get('REMOTE_ADDR')
+
+
+def request_identities(request, keys):
+    identities = []
+    for key in keys:
+        if key == 'user' and request.user.is_authenticated:
+            identities.append(f'user:{request.user.pk}')
+        elif key == 'ip':
+            identities.append(f'ip:{client_ip(request.META)}')
+    return identities
+
+
+def scope_identities(scope, keys):
+    """``request_identities`` for a Channels connection scope."""
+    user = scope.get('user')
+    identities = []
+    for key in keys:
+        if key == 'user' and user is not None and user.is_authenticated:
+            identities.append(f'user:{user.pk}')
+        elif key == 'ip':
+            identities.append(f'ip:{(scope.get("client") or ("unknown",))[0]}')
+    return identities
+
+
+def too_many_requests(wait):
+    retry_after = max(math.ceil(wait), 1)
+    response = JsonResponse(
+        {'detail': f'Too many requests. Try again in {retry_after} seconds.'}, status=429
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def overloaded():
+    response = JsonResponse(
+        {'detail': f'The server is busy. Try again in {SHED_RETRY_AFTER} seconds.'}, status=503
+    )
+    response['Retry-After'] = str(SHED_RETRY_AFTER)
+    return response
+
+
+def ratelimit(scope, rate, keys=('user',), methods=('POST',)):
+    """
+    Limit a view function to ``rate`` requests per identity, and shed its
+    requests while the process is at ``RATELIMIT_MAX_IN_FLIGHT``.
+
+    ``keys`` lists the identities counted: ``'user'`` (authenticated users
+    only) and ``'ip'``. Only requests using one of ``methods`` are counted.
+    Wrap class-based view methods with ``method_decorator``.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return view_func(request, *args, **kwargs)
+            # Shed before counting, so a shed request uses up no one's rate
+            limit = max_in_flight()
+            if limit is not None and not in_flight.acquire(limit):
+                return overloaded()
+            try:
+                wait = check(scope, rate, request_identities(request, keys))
+                if wait:
+                    return too_many_requests(wait)
+                return view_func(request, *args, **kwargs)
+            finally:
+                if limit is not None:
+                    in_flight.release()
+        return wrapper
+    return decorator
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 from pathlib import Path
+from celery.schedules import crontab
 from decouple import config
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -85,6 +86,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock at BEGIN so concurrent write transactions
+            # queue up (for up to `timeout` seconds) instead of failing with
+            # "database is locked" when a read lock can't be upgraded.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -144,6 +152,76 @@ CELERY_BROKER_URL = config('CELERY_BROKER_URL', default="redis://localhost:6379/
 CELERY_RESULT_BACKEND = 'django-db'  # Requires django_celery_results
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = {
+    'auto-approve-stale-work': {
+        'task': 'projects.tasks.auto_approve_stale_work_task',
+        'schedule': config('WORK_AUTO_APPROVE_INTERVAL', default=15 * 60, cast=int),
+    },
+    'requeue-stale-payments': {
+        'task': 'projects.tasks.requeue_stale_payments_task',
+        'schedule': 5 * 60,
+    },
+    'take-ledger-snapshots': {
+        'task': 'projects.tasks.take_ledger_snapshots_task',
+        'schedule': config('LEDGER_SNAPSHOT_INTERVAL', default=60 * 60, cast=int),
+    },
+    'settle-payouts': {
+        'task': 'projects.tasks.settle_payouts_task',
+        'schedule': crontab(hour=config('PAYOUT_SETTLEMENT_HOUR', default=1, cast=int), minute=0),
+    },
+}
+
+# Submitted work the client hasn't reviewed after this many days is approved
+# (its held escrow released, or left for the client to pay) by
+# projects.auto_approval, in batches of
+# WORK_AUTO_APPROVE_BATCH_SIZE rows; one task run handles at most
+# WORK_AUTO_APPROVE_MAX_BATCHES batches before handing over to the next.
+WORK_AUTO_APPROVE_DAYS = config('WORK_AUTO_APPROVE_DAYS', default=14, cast=int)
+WORK_AUTO_APPROVE_BATCH_SIZE = config('WORK_AUTO_APPROVE_BATCH_SIZE', default=500, cast=int)
+WORK_AUTO_APPROVE_MAX_BATCHES = config('WORK_AUTO_APPROVE_MAX_BATCHES', default=200, cast=int)
+
+# Completed payments are grouped into daily payout batches by
+# projects.settlement, PAYOUT_SETTLEMENT_CHUNK payments per transaction.
+PAYOUT_SETTLEMENT_CHUNK = config('PAYOUT_SETTLEMENT_CHUNK', default=10000, cast=int)
+
+# Rows fetched per database round trip by the streaming finance exports
+# (projects.exports).
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Cache used for marketplace statistics. Point this at a shared backend
+# (e.g. django.core.cache.backends.redis.RedisCache) when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='skilllink'),
+    }
+}
+
+# Seconds a freelancer's "has bid on" project set (projects.bid_membership)
+# is cached. A bid invalidates it only in the process that wrote it, so with a
+# per-process cache this is how long other workers may answer from a stale set.
+BID_MEMBERSHIP_TIMEOUT = config('BID_MEMBERSHIP_TIMEOUT', default=60, cast=int)
+
+# Gateway charging queued payments (projects.gateways). The local gateway
+# settles in memory, after PAYMENT_GATEWAY_LATENCY seconds per charge.
+PAYMENT_GATEWAY = config('PAYMENT_GATEWAY', default='projects.gateways.LocalGateway')
+PAYMENT_GATEWAY_LATENCY = config('PAYMENT_GATEWAY_LATENCY', default=0, cast=float)
+
+# How long responses to requests carrying an Idempotency-Key are replayed
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=60 * 60 * 24, cast=int)
+
+# Rate limiting (skillLink.ratelimit). The local-memory backend counts per
+# process; use skillLink.ratelimit.RedisBackend to share the limits between
+# workers. RATELIMIT_RATES overrides the rate of a scope, e.g.
+# {'bid-create': '10/m', 'login': None}.
+RATELIMIT_ENABLED = config('RATELIMIT_ENABLED', default=True, cast=bool)
+RATELIMIT_BACKEND = config('RATELIMIT_BACKEND', default='skillLink.ratelimit.LocalMemoryBackend')
+RATELIMIT_REDIS_URL = config('RATELIMIT_REDIS_URL', default=CELERY_BROKER_URL)
+RATELIMIT_RATES = {}
+# Requests to rate-limited views one process serves at once before it answers
+# 503 to the rest; 0 switches load shedding off
+RATELIMIT_MAX_IN_FLIGHT = config('RATELIMIT_MAX_IN_FLIGHT', default=64, cast=int)
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'support@skilllink.com'
@@ -164,4 +242,8 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ],
-}
\ No newline at end of file
+}
+
+# Project search backend. Defaults to the SQLite FTS5 index when running on
+# SQLite and to plain icontains lookups on other databases.
+# PROJECT_SEARCH_BACKEND = 'projects.search.DatabaseSearchBackend'
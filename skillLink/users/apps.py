@@ -3,4 +3,6 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = 'users'
-    
+
+    def ready(self):
+        from . import directory_signals  # noqa: F401
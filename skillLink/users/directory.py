@@ -0,0 +1,103 @@
+"""
+Freelancer directory search.
+
+Skills are looked up through the ``FreelancerSkill`` inverted index (one row
+per normalized skill and user) and ratings through the denormalized
+``User.rating_average``/``rating_count`` columns, so a search is a handful of
+index lookups rather than a scan over every user's JSON and reviews.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.db.models import Avg, Count, FloatField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import FreelancerSkill
+
+User = get_user_model()
+
+SKILL_MAX_LENGTH = FreelancerSkill._meta.get_field('skill').max_length
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_skill(skill):
+    return WHITESPACE_RE.sub(' ', str(skill)).strip().lower()[:SKILL_MAX_LENGTH]
+
+
+def normalize_skills(skills):
+    """Return the distinct normalized skills of a ``User.skills`` value, in order."""
+    if isinstance(skills, str):
+        skills = skills.split(',')
+    seen = []
+    for skill in skills or ():
+        skill = normalize_skill(skill)
+        if skill and skill not in seen:
+            seen.append(skill)
+    return seen
+
+
+def sync_skill_index(user, created=False):
+    """Bring ``user``'s postings in the skill index in line with ``user.skills``."""
+    wanted = set(normalize_skills(user.skills)) if user.role == User.IS_FREELANCER else set()
+    if created:
+        existing = set()
+    else:
+        existing = set(FreelancerSkill.objects.filter(user=user).values_list('skill', flat=True))
+
+    if existing - wanted:
+        FreelancerSkill.objects.filter(user=user, skill__in=existing - wanted).delete()
+    if wanted - existing:
+        FreelancerSkill.objects.bulk_create(
+            [FreelancerSkill(user=user, skill=skill) for skill in wanted - existing],
+            ignore_conflicts=True,
+        )
+
+
+def rebuild_skill_index():
+    """Recreate the whole skill index from ``User.skills``."""
+    FreelancerSkill.objects.all().delete()
+    postings = []
+    for pk, skills in User.objects.filter(role=User.IS_FREELANCER).values_list('pk', 'skills').iterator():
+        postings.extend(FreelancerSkill(user_id=pk, skill=skill) for skill in normalize_skills(skills))
+    FreelancerSkill.objects.bulk_create(postings, batch_size=1000)
+    return len(postings)
+
+
+def _rating_subquery(aggregate, output_field):
+    from projects.models import Review
+
+    ratings = Review.objects.filter(
+        reviewee=OuterRef('pk'), review_type='client_to_freelancer'
+    ).order_by().values('reviewee').annotate(value=aggregate).values('value')
+    return Coalesce(Subquery(ratings, output_field=output_field), Value(0), output_field=output_field)
+
+
+def update_ratings(queryset=None):
+    """Recompute ``rating_average`` and ``rating_count`` in a single UPDATE."""
+    if queryset is None:
+        queryset = User.objects.all()
+    return queryset.update(
+        rating_average=_rating_subquery(Avg('rating'), FloatField()),
+        rating_count=_rating_subquery(Count('id'), IntegerField()),
+    )
+
+
+def search_freelancers(skills=(), match_all=True, category=None, min_rating=None):
+    """
+    Freelancers having all (or, with ``match_all=False``, any) of ``skills``,
+    best rated first.
+    """
+    queryset = User.objects.filter(role=User.IS_FREELANCER)
+    if category:
+        queryset = queryset.filter(category=category)
+    if min_rating is not None:
+        queryset = queryset.filter(rating_count__gt=0, rating_average__gte=min_rating)
+
+    skills = normalize_skills(skills)
+    if skills:
+        postings = FreelancerSkill.objects.filter(skill__in=skills).order_by().values('user_id')
+        if match_all and len(skills) > 1:
+            postings = postings.annotate(matched=Count('id')).filter(matched=len(skills)).values('user_id')
+        queryset = queryset.filter(pk__in=postings)
+
+    return queryset.order_by('-rating_average', '-id')
@@ -0,0 +1,29 @@
+"""
+Receivers keeping the freelancer directory (``users.directory``) in step with
+profile edits and reviews. ``UsersConfig.ready`` connects them.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from projects.models import Review
+
+from . import directory
+
+User = get_user_model()
+
+SKILL_FIELDS = {'role', 'skills'}
+
+
+@receiver(post_save, sender=User)
+def index_freelancer_skills(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields and not SKILL_FIELDS.intersection(update_fields):
+        return
+    directory.sync_skill_index(instance, created=created)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def update_freelancer_rating(sender, instance, **kwargs):
+    if instance.review_type == 'client_to_freelancer':
+        directory.update_ratings(User.objects.filter(pk=instance.reviewee_id))
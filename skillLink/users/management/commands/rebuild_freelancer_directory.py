@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users import directory
+
+
+class Command(BaseCommand):
+    help = "Rebuild the freelancer skill index and the denormalized freelancer ratings"
+
+    def handle(self, *args, **options):
+        postings = directory.rebuild_skill_index()
+        updated = directory.update_ratings()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {postings} skill posting(s) and refreshed ratings for {updated} user(s)."
+        ))
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg, Count, FloatField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_directory(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    FreelancerSkill = apps.get_model('users', 'FreelancerSkill')
+    Review = apps.get_model('projects', 'Review')
+
+    postings = []
+    for pk, skills in User.objects.filter(role='freelancer').values_list('pk', 'skills'):
+        if isinstance(skills, str):
+            skills = skills.split(',')
+        normalized = {' '.join(str(skill).split()).lower()[:100] for skill in skills or ()}
+        postings.extend(FreelancerSkill(user_id=pk, skill=skill) for skill in normalized if skill)
+    FreelancerSkill.objects.bulk_create(postings, batch_size=1000)
+
+    def rating(aggregate, output_field):
+        ratings = Review.objects.filter(
+            reviewee=OuterRef('pk'), review_type='client_to_freelancer'
+        ).order_by().values('reviewee').annotate(value=aggregate).values('value')
+        return Coalesce(Subquery(ratings, output_field=output_field), Value(0), output_field=output_field)
+
+    User.objects.update(
+        rating_average=rating(Avg('rating'), FloatField()),
+        rating_count=rating(Count('id'), IntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0003_user_updated_at'),
+        ('projects', '0008_project_recommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FreelancerSkill',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('skill', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='rating_average',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', '-rating_average', '-id'], name='user_role_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'category', '-rating_average', '-id'], name='user_role_category_rating_idx'),
+        ),
+        migrations.AddField(
+            model_name='freelancerskill',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_index', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='freelancerskill',
+            unique_together={('skill', 'user')},
+        ),
+        migrations.RunPython(populate_directory, migrations.RunPython.noop),
+    ]
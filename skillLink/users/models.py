@@ -26,6 +26,33 @@ class User(AbstractUser):
     bio = models.TextField(blank=True, null=True)
     skills = models.JSONField(default=list, blank=True)
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized from client-to-freelancer reviews, maintained by users.directory
+    rating_average = models.FloatField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
-        return f"{self.username} ({self.role})"
\ No newline at end of file
+        return f"{self.username} ({self.role})"
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Freelancer directory: best rated first, optionally within a category
+            models.Index(fields=['role', '-rating_average', '-id'], name='user_role_rating_idx'),
+            models.Index(fields=['role', 'category', '-rating_average', '-id'], name='user_role_category_rating_idx'),
+        ]
+
+
+class FreelancerSkill(models.Model):
+    """
+    Inverted index over ``User.skills``: one row per (normalized skill, user),
+    kept in sync by users.directory. Lets the directory look freelancers up by
+    skill through an index instead of parsing every user's JSON.
+    """
+    skill = models.CharField(max_length=100)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='skill_index')
+
+    class Meta:
+        unique_together = ('skill', 'user')
+
+    def __str__(self):
+        return f"{self.skill}: {self.user_id}"
\ No newline at end of file
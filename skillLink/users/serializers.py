@@ -35,6 +35,20 @@ class UserSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+class FreelancerDirectorySerializer(serializers.ModelSerializer):
+    profile_picture_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = (
+            'id', 'username', 'first_name', 'last_name', 'title', 'category',
+            'bio', 'skills', 'profile_picture_url', 'rating_average', 'rating_count'
+        )
+        read_only_fields = fields
+
+    get_profile_picture_url = UserSerializer.get_profile_picture_url
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
     confirm_password = serializers.CharField(write_only=True)
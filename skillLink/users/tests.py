@@ -1,3 +1,85 @@
-from django.test import TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from projects.models import Project, Bid, Review
+from skillLink import ratelimit
+from .models import User, FreelancerSkill
+
+
+class FreelancerSearchTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(
+            username='client', email='client@example.com', password='pass12345', role='client'
+        )
+        cls.full_stack = cls.create_freelancer('full_stack', ['Python', 'Django', 'React'], 'developer')
+        cls.backend = cls.create_freelancer('backend', ['python ', 'Django'], 'developer')
+        cls.designer = cls.create_freelancer('designer', ['Figma'], 'designer')
+
+        project = Project.objects.create(title='API', description='Build it', budget=100, client=cls.client_user)
+        bid = Bid.objects.create(
+            project=project, freelancer=cls.backend, amount=50, delivery_days=3, proposal='Hire me'
+        )
+        Review.objects.create(
+            project=project, bid=bid, reviewer=cls.client_user, reviewee=cls.backend,
+            review_type='client_to_freelancer', rating=5, title='Great', comment='Great work'
+        )
+
+    @classmethod
+    def create_freelancer(cls, username, skills, category):
+        return User.objects.create_user(
+            username=username, email=f'{username}@example.com', password='pass12345',
+            role='freelancer', skills=skills, category=category
+        )
+
+    def search(self, **params):
+        self.client.force_authenticate(self.client_user)
+        response = self.client.get(reverse('api-freelancer-search'), params)
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.data['results']]
+
+    def test_skill_index_follows_profile_changes(self):
+        self.assertEqual(
+            set(FreelancerSkill.objects.filter(user=self.backend).values_list('skill', flat=True)),
+            {'python', 'django'},
+        )
+        self.designer.skills = ['Figma', 'Illustrator']
+        self.designer.save()
+        self.assertEqual(self.search(skills='illustrator'), ['designer'])
+
+    def test_skills_match_all_or_any(self):
+        self.assertEqual(self.search(skills='python,react'), ['full_stack'])
+        self.assertEqual(self.search(skills='react,figma', match='any'), ['designer', 'full_stack'])
+
+    def test_category_and_minimum_rating(self):
+        self.assertEqual(self.search(category='developer'), ['backend', 'full_stack'])
+        self.assertEqual(self.search(skills='django', min_rating=4), ['backend'])
+
+    def test_results_are_cursor_paginated(self):
+        self.client.force_authenticate(self.client_user)
+        first = self.client.get(reverse('api-freelancer-search'), {'page_size': 2}).data
+        second = self.client.get(first['next']).data
+        self.assertEqual(
+            [u['username'] for u in first['results'] + second['results']],
+            ['backend', 'designer', 'full_stack'],
+        )
+
+
+class LoginRateLimitTests(APITestCase):
+
+    def setUp(self):
+        ratelimit.get_backend().clear()
+
+    @override_settings(RATELIMIT_RATES={'login': '3/m'})
+    def test_login_attempts_are_limited_per_ip(self):
+        url = reverse('login')
+        data = {'email': 'nobody@example.com', 'password': 'wrong'}
+
+        codes = [self.client.post(url, data).status_code for _ in range(4)]
+        self.assertNotIn(429, codes[:3])
+        self.assertEqual(codes[3], 429)
+        # Other addresses and page views are unaffected
+        self.assertEqual(self.client.post(url, data, REMOTE_ADDR='10.0.0.2').status_code, codes[0])
+        self.assertEqual(self.client.get(url).status_code, 200)
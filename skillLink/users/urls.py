@@ -8,6 +8,7 @@ urlpatterns = [
     
     path('profile/', views.profile_view, name='profile'),
     path('<int:pk>/', views.user_detail_view, name='user-detail'),
+    path('api/freelancers/', views.FreelancerSearchView.as_view(), name='api-freelancer-search'),
     
     path('dashboard/', views.DashboardRedirectView.as_view(), name='dashboard'),
     path('dashboard/freelancer/', views.FreelancerDashboardView.as_view(), name='freelancer-dashboard'),
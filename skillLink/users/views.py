@@ -4,19 +4,24 @@ from django.views.decorators.http import require_http_methods
 from django.http import JsonResponse
 from django.views.generic import TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
-from rest_framework import permissions, status
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.contrib.auth import get_user_model, login, logout
-from django.db.models import Sum
 import json
-from .serializers import RegisterSerializer, UserSerializer, LoginSerializer
+from projects.pagination import KeysetPagination
+from .directory import search_freelancers
+from .serializers import RegisterSerializer, UserSerializer, LoginSerializer, FreelancerDirectorySerializer
+from skillLink.conditional import make_etag, not_modified_response, set_validators
+from skillLink.ratelimit import ratelimit
 
 User = get_user_model()
 
 
+@ratelimit('register', '10/h', keys=('ip',))
 @csrf_protect
 @require_http_methods(["GET", "POST"])
 def register_view(request):
@@ -57,6 +62,7 @@ def register_view(request):
         return JsonResponse({'detail': str(e)}, status=400)
 
 
+@ratelimit('login', '10/m', keys=('ip',))
 @csrf_protect
 @require_http_methods(["GET", "POST"])
 def login_view(request):
@@ -121,8 +127,13 @@ def profile_view(request):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        serializer = UserSerializer(request.user, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # request.user is already loaded, so checking validators costs no query
+        etag = make_etag(request.user.pk, request.user.updated_at.isoformat())
+        response = not_modified_response(request, etag, request.user.updated_at)
+        if response is None:
+            serializer = UserSerializer(request.user, context={'request': request})
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+        return set_validators(response, etag, request.user.updated_at)
 
     if not request.user.is_authenticated:
         return Response(
@@ -178,6 +189,42 @@ def user_detail_view(request, pk):
     )
 
 
+class FreelancerSearchView(generics.ListAPIView):
+    """
+    Freelancer directory, best rated first.
+
+    ``?skills=python,django`` matches freelancers having all of the skills
+    (``&match=any`` for any of them); ``?category=`` and ``?min_rating=``
+    narrow the results further. Pages are cursor based.
+    """
+    serializer_class = FreelancerDirectorySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        skills = [skill for value in params.getlist('skills') for skill in value.split(',')]
+
+        match = params.get('match', 'all')
+        if match not in ('all', 'any'):
+            raise ValidationError({'match': "Must be 'all' or 'any'."})
+
+        category = params.get('category') or None
+        if category and category not in dict(User.CATEGORY_CHOICES):
+            raise ValidationError({'category': 'Unknown category.'})
+
+        min_rating = params.get('min_rating') or None
+        if min_rating is not None:
+            try:
+                min_rating = float(min_rating)
+            except ValueError:
+                raise ValidationError({'min_rating': 'Must be a number.'})
+
+        return search_freelancers(
+            skills=skills, match_all=match == 'all', category=category, min_rating=min_rating
+        )
+
+
 class DashboardRedirectView(LoginRequiredMixin, View):
     login_url = 'login'
     
@@ -202,6 +249,8 @@ class FreelancerDashboardView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         from projects.models import Project, Bid
+        from projects import bid_membership, ledger
+        from projects.recommendations import get_feed
         
         user = self.request.user
         
@@ -221,10 +270,7 @@ class FreelancerDashboardView(LoginRequiredMixin, TemplateView):
         
         pending_bids = all_bids.filter(project__freelancer__isnull=True)
         
-        total_earnings = Project.objects.filter(
-            freelancer=user,
-            status='completed'
-        ).aggregate(total=Sum('budget'))['total'] or 123000
+        total_earnings = ledger.earnings(user.pk)
         
         total_projects = active_projects.count() + completed_projects.count()
         
@@ -237,6 +283,9 @@ class FreelancerDashboardView(LoginRequiredMixin, TemplateView):
             'accepted_bids_count': accepted_bids.count(),
             'total_earnings': total_earnings,
             'total_bids': all_bids.count(),
+            'recommended_projects': get_feed(user).select_related('client').exclude(
+                pk__in=bid_membership.get_project_ids(self.request)
+            )[:5],
         })
         
         return context
@@ -255,6 +304,7 @@ class ClientDashboardView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         from projects.models import Project, Bid
+        from projects import ledger
         
         user = self.request.user
         
@@ -272,16 +322,16 @@ class ClientDashboardView(LoginRequiredMixin, TemplateView):
             project__client=user
         ).count()
         
-        total_spending = all_projects.filter(
-            status='completed'
-        ).aggregate(total=Sum('budget'))['total'] or 123000
+        # Paid into escrow, less refunds; payouts for the user's own work are
+        # credits too, but not part of what they spent
+        client_balance = ledger.balance(user.pk)
+        total_spending = client_balance.debits - (client_balance.credits - client_balance.earnings)
         
         projects_with_bids = []
         for project in open_projects:
-            bids_count = project.bids.count()
             projects_with_bids.append({
                 'project': project,
-                'bids_count': bids_count
+                'bids_count': project.bid_count
             })
         
         context.update({